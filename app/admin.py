@@ -6,7 +6,7 @@ from app.models.orders import Purchase, PurchaseMovie, Notification, Payment, Or
 from app.models.users import User, UserDevice
 
 admin.site.register(
-    [Countries, Language, MovieComment, Genre, Category, Chat, Message, AdminAnswer, Season, UserDevice,
+    [Countries, Language, MovieComment, Genre, Category, Chat, Message, AdminAnswer, UserDevice,
      News, FavouriteMovies, OrderSubscription, TranslateMovies, PaymentTranslateMovie, PaymentSubscription])
 
 
@@ -71,15 +71,28 @@ class Notification(ModelAdmin):
 #     list_editable = ('status', 'subscription',)
 
 
+@register(Season)
+class SeasonAdmin(ModelAdmin):
+    list_display = ('__str__', 'movie', 'season_number')
+    # Season.__str__ reads movie.title.
+    list_select_related = ('movie',)
+
+
 class EpisodeInline(nested_admin.NestedStackedInline):
     model = Episode
     extra = 1
 
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('season__movie')
+
 class SeasonInline(nested_admin.NestedStackedInline):
     model = Season
     inlines = [EpisodeInline]
     extra = 1
 
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('movie')
+
 
 @admin.register(Movie)
 class MovieAdmin(nested_admin.NestedModelAdmin):
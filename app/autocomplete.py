@@ -0,0 +1,200 @@
+import bisect
+import heapq
+import logging
+import re
+import threading
+import time
+import unicodedata
+
+from django.db import DatabaseError, connection
+from django_redis import get_redis_connection
+from redis.exceptions import RedisError
+
+from app.models.movie import Movie
+
+logger = logging.getLogger(__name__)
+
+CHANGE_LOG_KEY = 'autocomplete:changes'
+CHANGE_SEQ_KEY = 'autocomplete:seq'
+CHANGE_LOG_SIZE = 1000
+
+SYNC_INTERVAL = 1.0
+RELOAD_INTERVAL = 600.0
+
+SEPARATOR_RE = re.compile(r'[\W_]+', re.UNICODE)
+
+
+def normalize(text):
+    """Casefold, strip accents and collapse punctuation so 'Amélie!' and 'amelie' share a key."""
+    text = unicodedata.normalize('NFKD', text)
+    text = ''.join(char for char in text if not unicodedata.combining(char))
+    return ' '.join(SEPARATOR_RE.split(text.casefold())).strip()
+
+
+def _keys_for(title, slug):
+    words = normalize(title).split()
+    keys = {' '.join(words[i:]) for i in range(len(words))}
+    keys.add(normalize(slug))
+    keys.discard('')
+    return keys
+
+
+def publish_change(*movie_ids):
+    """
+    Tell every worker's index that these movies were created, changed or
+    deleted. Called after commit, so a Redis error is logged, not raised;
+    workers pick the change up with their next full reload.
+    """
+    try:
+        pipe = get_redis_connection('default').pipeline(transaction=True)
+        pipe.rpush(CHANGE_LOG_KEY, *movie_ids)
+        pipe.ltrim(CHANGE_LOG_KEY, -CHANGE_LOG_SIZE, -1)
+        pipe.incrby(CHANGE_SEQ_KEY, len(movie_ids))
+        pipe.execute()
+    except RedisError:
+        logger.error('Could not publish autocomplete change of movies %s; it shows after the next reload (%ss)',
+                     movie_ids, RELOAD_INTERVAL, exc_info=True)
+
+
+def publish_reload():
+    """Make every worker rebuild its index from scratch, e.g. after a bulk import."""
+    get_redis_connection('default').incrby(CHANGE_SEQ_KEY, CHANGE_LOG_SIZE + 1)
+
+
+class TitleIndex:
+    """
+    Per-process prefix index over normalized movie titles and slugs.
+
+    Keys are kept in one sorted list of (key, movie_id), so a prefix is a
+    contiguous slice found with two binary searches. Every word suffix of the
+    title is a key too, so 'matrix' finds 'The Matrix'. Writers publish changed
+    ids to a short Redis log; readers poll it at most once per SYNC_INTERVAL and
+    swap in updated copies, so lookups never lock and never touch the database.
+    Full reloads (every RELOAD_INTERVAL, or when the log has moved on too far)
+    are built in a background thread while lookups keep using the current copy.
+    """
+
+    def __init__(self):
+        self._sync_lock = threading.Lock()
+        self._state = ([], {})
+        self._seq = None
+        self._synced_at = 0.0
+        self._loaded_at = 0.0
+        self._reloading = False
+
+    def _build(self):
+        # Read the sequence first: changes racing with the scan are replayed from the log afterwards.
+        seq = int(get_redis_connection('default').get(CHANGE_SEQ_KEY) or 0)
+        movies, keys = {}, []
+        for movie_id, title, slug, views in Movie.objects.order_by().values_list('id', 'title', 'slug', 'views'):
+            movies[movie_id] = (title, slug, views)
+            keys.extend((key, movie_id) for key in _keys_for(title, slug))
+        keys.sort()
+        return (keys, movies), seq
+
+    def _install(self, state, seq):
+        self._state, self._seq = state, seq
+        self._synced_at = self._loaded_at = time.monotonic()
+
+    def load(self):
+        state, seq = self._build()
+        with self._sync_lock:
+            self._install(state, seq)
+
+    def warm(self):
+        try:
+            self.load()
+        except (DatabaseError, RedisError):
+            logger.warning('Autocomplete index not loaded at startup, will load on first request', exc_info=True)
+
+    def _reload_in_background(self):
+        if self._reloading:
+            return
+        self._reloading = True
+        threading.Thread(target=self._background_load, name='autocomplete-reload', daemon=True).start()
+
+    def _background_load(self):
+        try:
+            self.load()
+        except (DatabaseError, RedisError):
+            logger.warning('Autocomplete reload failed, keeping the current index', exc_info=True)
+            self._loaded_at = time.monotonic()
+        finally:
+            self._reloading = False
+            connection.close()
+
+    def _apply(self, movie_ids):
+        """Swap in a copy with `movie_ids` re-read: one pass over the keys and one merge, whatever the batch size."""
+        rows = Movie.objects.filter(id__in=movie_ids).values_list('id', 'title', 'slug', 'views')
+        keys, movies = self._state
+        movies = {movie_id: movie for movie_id, movie in movies.items() if movie_id not in movie_ids}
+        added = []
+        for movie_id, title, slug, views in rows:
+            movies[movie_id] = (title, slug, views)
+            added.extend((key, movie_id) for key in _keys_for(title, slug))
+        added.sort()
+
+        kept = [entry for entry in keys if entry[1] not in movie_ids]
+        self._state = list(heapq.merge(kept, added)), movies
+
+    def sync(self):
+        now = time.monotonic()
+        if self._seq is not None and now - self._synced_at < SYNC_INTERVAL:
+            return
+
+        # Only the very first load makes other requests wait; after that they serve the current copy.
+        if not self._sync_lock.acquire(blocking=self._seq is None):
+            return
+        try:
+            if self._seq is not None and now - self._synced_at < SYNC_INTERVAL:
+                return
+            self._sync(now)
+        except (DatabaseError, RedisError):
+            # Keep serving what we have; the change feed is retried after SYNC_INTERVAL.
+            logger.warning('Autocomplete sync failed, serving the current index', exc_info=True)
+            self._synced_at = now
+        finally:
+            self._sync_lock.release()
+
+    def _sync(self, now):
+        if self._seq is None:
+            # Nothing to serve yet (warm() failed), so this one load has to happen inline.
+            self._install(*self._build())
+            return
+        if now - self._loaded_at > RELOAD_INTERVAL:
+            self._reload_in_background()
+
+        pipe = get_redis_connection('default').pipeline(transaction=True)
+        pipe.get(CHANGE_SEQ_KEY)
+        pipe.lrange(CHANGE_LOG_KEY, 0, -1)
+        seq, log = pipe.execute()
+        seq = int(seq or 0)
+
+        missed = seq - self._seq
+        if missed < 0 or missed > len(log):
+            self._reload_in_background()
+            self._synced_at = now
+            return
+        if missed:
+            self._apply({int(movie_id) for movie_id in log[-missed:]})
+        self._seq, self._synced_at = seq, now
+
+    def search(self, query, limit=10):
+        self.sync()
+        prefix = normalize(query)
+        if not prefix:
+            return []
+
+        keys, movies = self._state
+        start = bisect.bisect_left(keys, (prefix,))
+        end = bisect.bisect_left(keys, (prefix + '\U0010ffff',), start)
+        matches = {movie_id for _, movie_id in keys[start:end]}
+
+        best = heapq.nlargest(limit, matches, key=lambda movie_id: (movies[movie_id][2], movie_id))
+        return [
+            {'id': movie_id, 'title': movies[movie_id][0], 'slug': movies[movie_id][1], 'views': movies[movie_id][2]}
+            for movie_id in best
+        ]
+
+
+title_index = TitleIndex()
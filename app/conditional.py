@@ -0,0 +1,80 @@
+import hashlib
+from calendar import timegm
+
+from django.db.models import Max
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date, quote_etag
+
+from app.response_cache import tag_versions
+
+
+def make_etag(parts, weak=False):
+    etag = quote_etag(hashlib.md5(repr(parts).encode()).hexdigest())
+    return f'W/{etag}' if weak else etag
+
+
+class ConditionalGetMixin:
+    """
+    Answer `If-None-Match` / `If-Modified-Since` with 304 before the view serializes anything.
+
+    List ETags come from the response-cache versions of `fingerprint_tags`
+    (the view's `cache_tags` by default): one Redis MGET, no query, and every
+    write or delete that invalidates the cached list changes them too. Lists
+    without tags fall back to `Max('updated_at')`. Detail routes use the
+    object's `updated_at`. Views whose payload also carries values that change
+    without touching `updated_at` (view counters) set `weak_etag`.
+    """
+    weak_etag = False
+    fingerprint_tags = None
+
+    def get_fingerprint_tags(self):
+        return self.fingerprint_tags or getattr(self, 'cache_tags', None)
+
+    def get_list_fingerprint(self, request):
+        tags = self.get_fingerprint_tags()
+        if tags:
+            return tuple(tag_versions(tags)), None
+        last_modified = self.filter_queryset(self.get_queryset()).order_by().aggregate(
+            last_modified=Max('updated_at'),
+        )['last_modified']
+        return (), last_modified
+
+    def get_object_fingerprint(self, request):
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        last_modified = self.get_queryset().filter(
+            **{self.lookup_field: self.kwargs[lookup_url_kwarg]}
+        ).values_list('updated_at', flat=True).first()
+        return None if last_modified is None else ((), last_modified)
+
+    def on_not_modified(self, request):
+        """Hook for side effects a full response would have had."""
+
+    def conditional(self, fingerprint, handler, request, *args, **kwargs):
+        fingerprint = fingerprint(request)
+        if fingerprint is None:
+            return handler(request, *args, **kwargs)
+
+        parts, last_modified = fingerprint
+        etag = make_etag((request.build_absolute_uri(), parts, last_modified), self.weak_etag)
+        timestamp = timegm(last_modified.utctimetuple()) if last_modified else None
+
+        response = get_conditional_response(request, etag=etag, last_modified=timestamp)
+        if response is not None:
+            if response.status_code == 304:
+                self.on_not_modified(request)
+        else:
+            response = handler(request, *args, **kwargs)
+            if response.status_code != 200:
+                return response
+
+        response['ETag'] = etag
+        if timestamp is not None:
+            response['Last-Modified'] = http_date(timestamp)
+        patch_vary_headers(response, ['Authorization'])
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self.conditional(self.get_list_fingerprint, super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.conditional(self.get_object_fingerprint, super().retrieve, request, *args, **kwargs)
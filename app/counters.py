@@ -0,0 +1,145 @@
+import random
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.db.models import Case, F, Value, When, Count, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+from django_redis import get_redis_connection
+from redis.exceptions import ResponseError
+
+from app.models.movie import Movie, MovieComment, TranslateMovies, CollectedMoneyShard
+from app.utils import redis_lock
+
+PENDING_VIEWS_KEY = 'movie:views:pending'
+FLUSHING_VIEWS_KEY = 'movie:views:flushing'
+FLUSH_VIEWS_LOCK_KEY = 'movie:views:flush-lock'
+FLUSH_VIEWS_LOCK_TIMEOUT = 5 * 60
+COLLECTED_MONEY_KEY = 'translate:collected:{}'
+
+
+def incr_movie_views(movie_id, amount=1):
+    """Buffer a view in Redis and return the delta not yet written to the database."""
+    pipe = get_redis_connection('default').pipeline(transaction=False)
+    pipe.hincrby(PENDING_VIEWS_KEY, movie_id, amount)
+    pipe.hget(FLUSHING_VIEWS_KEY, movie_id)
+    pending, flushing = pipe.execute()
+    return int(pending) + int(flushing or 0)
+
+
+def pending_movie_views(movie_id):
+    pipe = get_redis_connection('default').pipeline(transaction=False)
+    pipe.hget(PENDING_VIEWS_KEY, movie_id)
+    pipe.hget(FLUSHING_VIEWS_KEY, movie_id)
+    return sum(int(value or 0) for value in pipe.execute())
+
+
+def flush_movie_views(batch_size=500):
+    """
+    Move buffered views into the database.
+
+    The pending hash is renamed away first, so increments that arrive while we
+    flush land in a fresh hash and are picked up by the next run. One run at a
+    time holds the flush lock, so overlapping beat runs cannot apply the same
+    hash twice; a run that finds the lock taken returns 0. RENAMENX leaves a
+    flushing hash that an earlier run did not finish untouched, and this run
+    applies it first.
+    """
+    redis = get_redis_connection('default')
+
+    with redis_lock(FLUSH_VIEWS_LOCK_KEY, FLUSH_VIEWS_LOCK_TIMEOUT) as acquired:
+        if not acquired:
+            return 0
+        try:
+            redis.renamenx(PENDING_VIEWS_KEY, FLUSHING_VIEWS_KEY)
+        except ResponseError:
+            # Nothing pending.
+            pass
+
+        items = [(int(movie_id), int(delta)) for movie_id, delta in redis.hgetall(FLUSHING_VIEWS_KEY).items()]
+
+        for start in range(0, len(items), batch_size):
+            batch = items[start:start + batch_size]
+            Movie.objects.filter(id__in=[movie_id for movie_id, _ in batch]).update(
+                views=F('views') + Case(
+                    *[When(id=movie_id, then=Value(delta)) for movie_id, delta in batch],
+                    default=Value(0),
+                )
+            )
+            redis.hdel(FLUSHING_VIEWS_KEY, *[movie_id for movie_id, _ in batch])
+
+        return len(items)
+
+
+def _actual_comment_count():
+    comments = (
+        MovieComment.objects.filter(movie=OuterRef('pk'))
+        .order_by().values('movie').annotate(total=Count('id')).values('total')
+    )
+    return Coalesce(Subquery(comments), 0)
+
+
+def drifted_comment_counts():
+    return Movie.objects.annotate(actual=_actual_comment_count()).exclude(comment_count=F('actual'))
+
+
+def reconcile_comment_counts():
+    """Rewrite `Movie.comment_count` wherever it disagrees with the comments table, in one UPDATE."""
+    return Movie.objects.filter(pk__in=drifted_comment_counts().values('pk')).update(
+        comment_count=_actual_comment_count()
+    )
+
+
+def add_collected_money(translate_movie_id, amount):
+    """
+    Add a donation to a random shard of the campaign in the caller's
+    transaction, and check for completion once it commits.
+    """
+    shard = random.randrange(settings.COLLECTED_MONEY_SHARDS)
+    rows = CollectedMoneyShard.objects.filter(translate_movie_id=translate_movie_id, shard=shard)
+    if not rows.update(amount=F('amount') + amount):
+        try:
+            with transaction.atomic():
+                CollectedMoneyShard.objects.create(translate_movie_id=translate_movie_id, shard=shard, amount=amount)
+        except IntegrityError:
+            rows.update(amount=F('amount') + amount)
+    transaction.on_commit(lambda: finish_if_funded(translate_movie_id))
+
+
+def _shard_total():
+    shards = (
+        CollectedMoneyShard.objects.filter(translate_movie=OuterRef('pk'))
+        .order_by().values('translate_movie').annotate(total=Sum('amount')).values('total')
+    )
+    return Coalesce(Subquery(shards), 0)
+
+
+def finish_if_funded(translate_movie_id):
+    """
+    Flip `is_finish` once the committed shards reach the fund. The condition is
+    part of the UPDATE, so exactly one caller wins however many race here.
+    """
+    return bool(TranslateMovies.objects.annotate(actual=_shard_total()).filter(
+        pk=translate_movie_id, is_finish=False, movie_fund__gt=0, movie_fund__lte=F('actual'),
+    ).update(is_finish=True, collected_money=_shard_total()))
+
+
+def collected_money_totals(translate_movie_ids):
+    """Collected money per campaign, summed from the shards and cached for COLLECTED_MONEY_CACHE_TIMEOUT."""
+    keys = {COLLECTED_MONEY_KEY.format(pk): pk for pk in translate_movie_ids}
+    totals = {keys[key]: value for key, value in cache.get_many(keys).items()}
+    missing = [pk for pk in keys.values() if pk not in totals]
+    if missing:
+        fresh = dict.fromkeys(missing, 0)
+        fresh.update(CollectedMoneyShard.objects.filter(translate_movie_id__in=missing).order_by()
+                     .values_list('translate_movie').annotate(Sum('amount')))
+        cache.set_many({COLLECTED_MONEY_KEY.format(pk): total for pk, total in fresh.items()},
+                       timeout=settings.COLLECTED_MONEY_CACHE_TIMEOUT)
+        totals.update(fresh)
+    return totals
+
+
+def sync_collected_money():
+    """Copy shard sums into `TranslateMovies.collected_money` for admin and reports, touching only drifted rows."""
+    drifted = TranslateMovies.objects.annotate(actual=_shard_total()).exclude(collected_money=F('actual'))
+    return TranslateMovies.objects.filter(pk__in=drifted.values('pk')).update(collected_money=_shard_total())
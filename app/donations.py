@@ -0,0 +1,156 @@
+import json
+import logging
+
+from django.db import IntegrityError, connection, transaction
+from django.db.models import F, Sum
+from django_redis import get_redis_connection
+from redis.exceptions import RedisError, WatchError
+
+from app.models.orders import DonorTotal, PaymentTranslateMovie
+from app.serializer import LastDonatesModelSerializer
+
+logger = logging.getLogger(__name__)
+
+LEADERBOARD_SIZE = 10
+
+RECENT_DONATIONS_SIZE = 10
+RECENT_DONATIONS_KEY = 'donations:recent:{}'
+RECENT_DONATIONS_LOADED_KEY = 'donations:recent:{}:loaded'
+# Buffers are reloaded from the database this often, which also heals any missed push.
+RECENT_DONATIONS_TTL = 24 * 60 * 60
+RECENT_DONATIONS_LOAD_ATTEMPTS = 3
+
+
+def add_to_totals(user_id, translate_movie_id, amount):
+    """
+    Move the user's overall and per-campaign totals by `amount` (negative
+    when a donation is removed). Runs in the caller's transaction, so the
+    leaderboard commits or rolls back together with the donation.
+    """
+    for campaign_id in (None, translate_movie_id):
+        rows = DonorTotal.objects.filter(user_id=user_id, translate_movie_id=campaign_id)
+        if rows.update(total=F('total') + amount) or amount <= 0:
+            continue
+        try:
+            with transaction.atomic():
+                DonorTotal.objects.create(user_id=user_id, translate_movie_id=campaign_id, total=amount)
+        except IntegrityError:
+            # A concurrent first donation created the row between our update and insert.
+            rows.update(total=F('total') + amount)
+
+
+def leaderboard(translate_movie_id=None, limit=LEADERBOARD_SIZE):
+    """Top donors overall or for one campaign: an index range scan of `limit` rows."""
+    return (
+        DonorTotal.objects.filter(translate_movie_id=translate_movie_id, total__gt=0)
+        .order_by('-total', 'id')
+        .values('user', 'user__username', donat=F('total'))[:limit]
+    )
+
+
+def rebuild_totals():
+    """
+    Recompute every total from PaymentTranslateMovie. On PostgreSQL the table
+    lock makes donations that are in flight wait and apply on top of the rebuilt
+    rows, so none are lost or counted twice.
+    """
+    with transaction.atomic():
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute(f'LOCK TABLE {DonorTotal._meta.db_table} IN SHARE ROW EXCLUSIVE MODE')
+        DonorTotal.objects.all().delete()
+
+        donations = PaymentTranslateMovie.objects.order_by()
+        rows = [
+            DonorTotal(user_id=user_id, total=total)
+            for user_id, total in donations.values_list('user').annotate(Sum('amount')).iterator()
+        ]
+        rows += [
+            DonorTotal(user_id=user_id, translate_movie_id=campaign_id, total=total)
+            for user_id, campaign_id, total in
+            donations.values_list('user', 'translate_movie').annotate(Sum('amount')).iterator()
+        ]
+        DonorTotal.objects.bulk_create(rows, batch_size=1000)
+    return len(rows)
+
+
+def _recent_scopes(translate_movie_id):
+    return 'all', translate_movie_id
+
+
+def push_recent(donation):
+    """
+    Prepend a committed donation, already serialized, to the overall and the
+    campaign buffer. Buffers that were never loaded are left alone; their
+    first read picks the donation up from the database.
+
+    Runs after the donation committed, so a Redis failure is logged rather
+    than raised: the donor has been charged and must not see an error.
+    """
+    item = json.dumps(LastDonatesModelSerializer(donation).data)
+    try:
+        redis = get_redis_connection('default')
+        for scope in _recent_scopes(donation.translate_movie_id):
+            if redis.exists(RECENT_DONATIONS_LOADED_KEY.format(scope)):
+                pipe = redis.pipeline()
+                pipe.lpush(RECENT_DONATIONS_KEY.format(scope), item)
+                pipe.ltrim(RECENT_DONATIONS_KEY.format(scope), 0, RECENT_DONATIONS_SIZE - 1)
+                pipe.execute()
+    except RedisError:
+        logger.warning('Could not push donation %s to the recent donations buffer', donation.pk, exc_info=True)
+
+
+def _load_recent(redis, scope, translate_movie_id):
+    """
+    Fill a buffer from the database. The loaded flag goes up before the read,
+    so pushes for donations committing during the read land in the list; the
+    list is WATCHed, and such a push aborts the write and the read is redone.
+    """
+    key = RECENT_DONATIONS_KEY.format(scope)
+    loaded_key = RECENT_DONATIONS_LOADED_KEY.format(scope)
+    donations = PaymentTranslateMovie.objects.order_by('-created_at', '-id')
+    if translate_movie_id:
+        donations = donations.filter(translate_movie_id=translate_movie_id)
+
+    for _ in range(RECENT_DONATIONS_LOAD_ATTEMPTS):
+        with redis.pipeline() as pipe:
+            pipe.watch(key)
+            pipe.set(loaded_key, 1, ex=RECENT_DONATIONS_TTL)
+            items = [json.dumps(item) for item in
+                     LastDonatesModelSerializer(donations[:RECENT_DONATIONS_SIZE], many=True).data]
+            pipe.multi()
+            pipe.delete(key)
+            if items:
+                pipe.rpush(key, *items)
+                pipe.expire(key, RECENT_DONATIONS_TTL)
+            try:
+                pipe.execute()
+                return items
+            except WatchError:
+                continue
+    # Still racing with pushes: serve this read and let the next request load again.
+    redis.delete(loaded_key)
+    return items
+
+
+def recent_donations(translate_movie_id=None):
+    """The latest donations, newest first, overall or for one campaign; served from Redis once loaded."""
+    scope = translate_movie_id or 'all'
+    redis = get_redis_connection('default')
+
+    if not redis.exists(RECENT_DONATIONS_LOADED_KEY.format(scope)):
+        return [json.loads(item) for item in _load_recent(redis, scope, translate_movie_id)]
+
+    return [json.loads(item) for item in redis.lrange(RECENT_DONATIONS_KEY.format(scope), 0, RECENT_DONATIONS_SIZE - 1)]
+
+
+def forget_recent(translate_movie_id):
+    """Drop the buffers a changed or deleted donation may sit in; the next read reloads them."""
+    keys = []
+    for scope in _recent_scopes(translate_movie_id):
+        keys += [RECENT_DONATIONS_KEY.format(scope), RECENT_DONATIONS_LOADED_KEY.format(scope)]
+    try:
+        get_redis_connection('default').delete(*keys)
+    except RedisError:
+        logger.error('Could not drop recent donation buffers %s; they refresh within %ss',
+                     keys, RECENT_DONATIONS_TTL, exc_info=True)
@@ -0,0 +1,172 @@
+import logging
+from datetime import timedelta
+
+from django.utils import timezone
+from django_redis import get_redis_connection
+from redis.exceptions import RedisError, WatchError
+
+from app.models.movie import Movie, Subscriptions, Subscribers
+from app.models.orders import PurchaseMovie, OrderSubscriptionItem
+from app.models.users import User
+
+ENTITLEMENTS_KEY = 'entitlements:user:{}'
+ENTITLEMENTS_TTL = 60 * 60
+# Bumped by every invalidation; a rebuild is only stored if neither generation moved while it ran.
+ENTITLEMENTS_GENERATION_KEY = 'entitlements:generation:{}'
+ALL_USERS = 'all'
+# Global generation a set was built under; a set stamped with an older one is a miss.
+ENTITLEMENTS_STAMP_KEY = 'entitlements:stamp:{}'
+READY = 'ready'
+
+logger = logging.getLogger(__name__)
+
+TIER_RANKS = {
+    User.UserSubsription.LITE: 1,
+    User.UserSubsription.PRO: 2,
+    User.UserSubsription.PREMIUM: 3,
+}
+
+
+def tier_rank(name):
+    return TIER_RANKS.get((name or '').upper(), 0)
+
+
+def _active_subscriptions(user_id, now):
+    """(subscriptions id, expires at) for every subscription the user currently holds."""
+    held = [
+        (subscription_id, valid_at + timedelta(days=days))
+        for subscription_id, valid_at, days in Subscribers.objects.filter(user_id=user_id, is_active=True).values_list(
+            'subscribe_item__subscribe_id', 'valid_at', 'subscribe_item__valid_until_days')
+    ]
+    # A paid subscription order grants the subscription from the moment it completed.
+    held += [
+        (subscription_id, completed_at + timedelta(days=days))
+        for subscription_id, completed_at, days in OrderSubscriptionItem.objects.filter(
+            order__user_id=user_id, status=OrderSubscriptionItem.Status.COMPLETED, completed_at__isnull=False,
+        ).values_list('subscription__subscribe_id', 'completed_at', 'subscription__valid_until_days')
+    ]
+    return [(subscription_id, expires_at) for subscription_id, expires_at in held if expires_at >= now]
+
+
+def build_entitlements(user_id):
+    """
+    Collect what the user may watch as set members: `m:<movie id>` for accepted
+    purchases and `s:<subscriptions id>` for every subscription whose tier is
+    covered, so a check is a single membership test.
+    """
+    now = timezone.now()
+    members = {READY}
+    members.update(f'm:{movie_id}' for movie_id in PurchaseMovie.objects.filter(
+        purchase__user_id=user_id, status=PurchaseMovie.STATUS.ACCEPTED,
+    ).values_list('movie_id', flat=True))
+
+    held = _active_subscriptions(user_id, now)
+    names = dict(Subscriptions.objects.values_list('id', 'name'))
+    rank = max([tier_rank(User.objects.filter(pk=user_id).values_list('subscription', flat=True).first())]
+               + [tier_rank(names.get(subscription_id)) for subscription_id, _ in held])
+
+    members.update(f's:{subscription_id}' for subscription_id, _ in held)
+    members.update(f's:{subscription_id}' for subscription_id, name in names.items() if 0 < tier_rank(name) <= rank)
+
+    ttl = ENTITLEMENTS_TTL
+    for _, expires_at in held:
+        ttl = min(ttl, max(int((expires_at - now).total_seconds()), 1))
+    return members, ttl
+
+
+def _required_member(movie):
+    if movie.access_type == Movie.AccessType.PURCHASE:
+        return f'm:{movie.id}'
+    if movie.access_type == Movie.AccessType.SUBSCRIPTION and movie.subscribe_id is not None:
+        return f's:{movie.subscribe_id}'
+    return None
+
+
+def check_access(user, movies):
+    """
+    Map movie id -> whether `user` may watch it.
+
+    Warm users cost one round trip (the set's stamp, the global generation
+    and SMISMEMBER) for any number of movies; a cold user's set, or one built
+    before the global generation last moved, is rebuilt from the database first. The rebuild runs
+    under WATCH on the user's and the global generation, so an invalidate()
+    that lands between the database read and the write discards the stale
+    set instead of letting it live for ENTITLEMENTS_TTL.
+    """
+    access = {}
+    required = {}
+    for movie in movies:
+        if movie.access_type == Movie.AccessType.FREE:
+            access[movie.id] = True
+        elif not user.is_authenticated or (member := _required_member(movie)) is None:
+            access[movie.id] = False
+        else:
+            required[movie.id] = member
+    if not required:
+        return access
+
+    redis = get_redis_connection('default')
+    key = ENTITLEMENTS_KEY.format(user.pk)
+    stamp_key = ENTITLEMENTS_STAMP_KEY.format(user.pk)
+    generation_key = ENTITLEMENTS_GENERATION_KEY.format(ALL_USERS)
+    members = list(required.values())
+    with redis.pipeline(transaction=False) as pipe:
+        pipe.get(stamp_key)
+        pipe.get(generation_key)
+        pipe.smismember(key, [READY, *members])
+        stamp, generation, (ready, *found) = pipe.execute()
+
+    if not ready or stamp != (generation or b'0'):
+        with redis.pipeline() as pipe:
+            pipe.watch(ENTITLEMENTS_GENERATION_KEY.format(user.pk), generation_key)
+            generation = int(pipe.get(generation_key) or 0)
+            entitlements, ttl = build_entitlements(user.pk)
+            pipe.multi()
+            pipe.delete(key)
+            pipe.sadd(key, *entitlements)
+            pipe.expire(key, ttl)
+            pipe.set(stamp_key, generation, ex=ttl)
+            try:
+                pipe.execute()
+            except WatchError:
+                # Invalidated mid-build: answer from this read, leave the next request to rebuild.
+                pass
+        found = [member in entitlements for member in members]
+
+    access.update(zip(required, map(bool, found)))
+    return access
+
+
+def has_movie_access(user, movie):
+    return check_access(user, [movie])[movie.id]
+
+
+def invalidate(*user_ids):
+    """
+    Drop the users' cached sets. Runs after the commit that changed their
+    entitlements, so a Redis error must not surface to the request: it falls
+    back to invalidate_all(), which is a single INCR.
+    """
+    if not user_ids:
+        return
+    try:
+        pipe = get_redis_connection('default').pipeline(transaction=False)
+        for user_id in user_ids:
+            pipe.incr(ENTITLEMENTS_GENERATION_KEY.format(user_id))
+        pipe.delete(*(ENTITLEMENTS_KEY.format(user_id) for user_id in user_ids))
+        pipe.execute()
+    except RedisError:
+        logger.warning('Could not invalidate entitlements of users %s, invalidating all', user_ids, exc_info=True)
+        invalidate_all()
+
+
+def invalidate_all():
+    """
+    Make every cached set a miss, e.g. after a subscription tier was renamed:
+    sets stamped with an older global generation are rebuilt on their next check.
+    """
+    try:
+        get_redis_connection('default').incr(ENTITLEMENTS_GENERATION_KEY.format(ALL_USERS))
+    except RedisError:
+        logger.error('Could not invalidate entitlements; cached sets may be stale for up to %ss',
+                     ENTITLEMENTS_TTL, exc_info=True)
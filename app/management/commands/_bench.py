@@ -0,0 +1,94 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+from statistics import quantiles
+
+from django.db import connections
+
+from app.models.movie import Movie, Category, Countries, Language, Genre
+
+BENCH_PREFIX = 'bench'
+
+
+def seed_movies(count, prefix=BENCH_PREFIX, **extra):
+    """Insert `count` throwaway movies in one statement (slugs are set by hand, `save()` is skipped)."""
+    category, _ = Category.objects.get_or_create(name=f'{prefix}-category')
+    country, _ = Countries.objects.get_or_create(name=f'{prefix}-country')
+    language, _ = Language.objects.get_or_create(name=f'{prefix}-language')
+
+    movies = Movie.objects.bulk_create([
+        Movie(
+            category=category,
+            country=country,
+            language=language,
+            title=f'{prefix} movie {i}',
+            slug=f'{prefix}-movie-{i}',
+            description=f'{prefix} description {i}',
+            trailer_url='https://example.com/trailer',
+            picture=f'{prefix}-{i}.jpg',
+            release_date=date(2020, 1, 1),
+            **extra,
+        )
+        for i in range(count)
+    ])
+    return list(Movie.objects.filter(slug__in=[movie.slug for movie in movies]).order_by('id'))
+
+
+def cleanup(prefix=BENCH_PREFIX):
+    Category.objects.filter(name=f'{prefix}-category').delete()
+    Countries.objects.filter(name=f'{prefix}-country').delete()
+    Language.objects.filter(name=f'{prefix}-language').delete()
+    Genre.objects.filter(name__startswith=f'{prefix}-').delete()
+
+
+class Timing:
+
+    def __init__(self, elapsed, latencies, errors=0):
+        self.elapsed = elapsed
+        self.latencies = sorted(latencies)
+        self.errors = errors
+
+    @property
+    def throughput(self):
+        return len(self.latencies) / self.elapsed if self.elapsed else 0
+
+    def percentile(self, p):
+        if len(self.latencies) < 2:
+            return self.latencies[0] if self.latencies else 0
+        return quantiles(self.latencies, n=100, method='inclusive')[p - 1]
+
+    def __str__(self):
+        return (f'{len(self.latencies)} calls in {self.elapsed:.2f}s, {self.throughput:.1f}/s, '
+                f'p50={self.percentile(50) * 1000:.2f}ms p99={self.percentile(99) * 1000:.2f}ms, '
+                f'{self.errors} errors')
+
+
+def run_concurrently(func, total, workers):
+    """
+    Call `func(i)` for i in range(total) from `workers` threads and time every call.
+    Calls that raise are counted as errors instead of aborting the run.
+    """
+
+    def worker(indexes):
+        timings, errors = [], 0
+        try:
+            for i in indexes:
+                started = time.perf_counter()
+                try:
+                    func(i)
+                except Exception:  # noqa
+                    errors += 1
+                    continue
+                timings.append(time.perf_counter() - started)
+        finally:
+            connections.close_all()
+        return timings, errors
+
+    latencies, errors = [], 0
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for timings, failed in pool.map(worker, [range(w, total, workers) for w in range(workers)]):
+            latencies.extend(timings)
+            errors += failed
+
+    return Timing(time.perf_counter() - started, latencies, errors)
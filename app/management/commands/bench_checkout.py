@@ -0,0 +1,186 @@
+import json
+import logging
+import threading
+import uuid
+from urllib.error import HTTPError
+from urllib.request import Request, urlopen
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.core.servers.basehttp import ThreadedWSGIServer, WSGIRequestHandler
+from django.core.wsgi import get_wsgi_application
+from django.db import connection
+from django.db.models import Sum
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from app import wallet
+from app.management.commands._bench import seed_movies, cleanup, run_concurrently
+from app.models.movie import Subscriptions, SubscriptionItems, TranslateMovies, CollectedMoneyShard
+from app.models.orders import Purchase, PurchaseMovie, OrderSubscription, OrderSubscriptionItem, LedgerEntry, \
+    PaymentTranslateMovie
+from app.models.users import User
+
+SCENARIOS = ('movie', 'subscription', 'donation', 'fill')
+
+
+class QuietHandler(WSGIRequestHandler):
+
+    def log_message(self, format, *args):
+        pass
+
+
+class LockWaitSampler(threading.Thread):
+    """Poll pg_stat_activity and integrate the number of backends waiting on a lock over time."""
+
+    def __init__(self, interval=0.01):
+        super().__init__(daemon=True)
+        self.interval = interval
+        self.lock_wait = 0.0
+        self.peak = 0
+        self.stopped = threading.Event()
+
+    def run(self):
+        try:
+            with connection.cursor() as cursor:
+                while not self.stopped.wait(self.interval):
+                    cursor.execute("SELECT count(*) FROM pg_stat_activity "
+                                   "WHERE wait_event_type = 'Lock' AND datname = current_database()")
+                    waiting = cursor.fetchone()[0]
+                    self.lock_wait += waiting * self.interval
+                    self.peak = max(self.peak, waiting)
+        finally:
+            connection.close()
+
+
+class Command(BaseCommand):
+    help = ('Fire concurrent payment requests at one user or campaign row through a live server and report '
+            'throughput, latency, lock waits and balance drift.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scenario', choices=[*SCENARIOS, 'all'], default='all')
+        parser.add_argument('--requests', type=int, default=400)
+        parser.add_argument('--concurrency', type=int, default=32)
+        parser.add_argument('--price', type=int, default=100)
+        parser.add_argument('--url', help='Base URL of a running server; by default one is started in-process.')
+        parser.add_argument('--yes-i-know', action='store_true',
+                            help='Run even though DEBUG is off, i.e. against what may be a real database.')
+
+    def handle(self, *args, **options):
+        if not settings.DEBUG and not options['yes_i_know']:
+            raise CommandError('bench_checkout writes users, orders and ledger rows to the default database; '
+                               'run it with DEBUG on, or pass --yes-i-know.')
+        server = None
+        base_url = options['url']
+        if not base_url:
+            server = ThreadedWSGIServer(('127.0.0.1', 0), QuietHandler)
+            server.set_app(get_wsgi_application())
+            threading.Thread(target=server.serve_forever, daemon=True).start()
+            base_url = f'http://127.0.0.1:{server.server_port}'
+        self.base_url = base_url.rstrip('/')
+        # Rejected debits are expected; keep their 4xx warnings out of the report.
+        logging.getLogger('django.request').setLevel(logging.ERROR)
+        self.stdout.write(f'{connection.vendor} at {self.base_url}, {options["requests"]} requests, '
+                          f'{options["concurrency"]} workers')
+
+        try:
+            for scenario in SCENARIOS if options['scenario'] == 'all' else [options['scenario']]:
+                self.run_scenario(scenario, options)
+        finally:
+            if server is not None:
+                server.shutdown()
+                server.server_close()
+
+    def run_scenario(self, scenario, options):
+        total, price = options['requests'], options['price']
+        # A fresh user per run, so nothing that already exists is ever touched or deleted.
+        run_id = uuid.uuid4()
+        user = User.objects.create(username=f'bench-{run_id}', email=f'bench-{run_id}@example.com',
+                                   telegram_id=str(run_id.int)[:30])
+        # Enough money for half of the debits, so the overdraft guard is exercised.
+        funds = price * (total // 2)
+        wallet.credit(user.id, funds, LedgerEntry.Kind.FILL, reference='bench')
+        token = str(RefreshToken.for_user(user).access_token)
+
+        try:
+            path, payloads, campaign = getattr(self, f'seed_{scenario}')(user, total, price)
+            statuses = []
+
+            def call(i):
+                code = self.post(path, payloads[i], token)
+                statuses.append(code)
+                if code >= 500:
+                    raise RuntimeError(code)
+
+            sampler = LockWaitSampler() if connection.vendor == 'postgresql' else None
+            if sampler:
+                sampler.start()
+            timing = run_concurrently(call, total, options['concurrency'])
+            if sampler:
+                sampler.stopped.set()
+                sampler.join()
+
+            accepted = sum(200 <= code < 300 for code in statuses)
+            rejected = sum(400 <= code < 500 for code in statuses)
+            self.stdout.write(f'{scenario:>12}: {timing}')
+            lock_wait = f'{sampler.lock_wait:.2f}s waiting on locks (peak {sampler.peak} backends)' \
+                if sampler else 'lock waits not sampled on this backend'
+            self.stdout.write(f'{"":>12}  {accepted} accepted, {rejected} rejected, {lock_wait}')
+            self.report_drift(user, funds, price, accepted, scenario, campaign)
+        finally:
+            user.delete()
+            Subscriptions.objects.filter(name=f'bench-{run_id}').delete()
+            cleanup()
+
+    def post(self, path, payload, token):
+        request = Request(f'{self.base_url}/api/{path}', data=json.dumps(payload).encode(), method='POST', headers={
+            'Content-Type': 'application/json', 'Authorization': f'Bearer {token}',
+        })
+        try:
+            with urlopen(request, timeout=60) as response:
+                return response.status
+        except HTTPError as error:
+            return error.code
+
+    def seed_movie(self, user, total, price):
+        movies = seed_movies(total, price=price)
+        purchase = Purchase.objects.create(user=user)
+        items = PurchaseMovie.objects.bulk_create([
+            PurchaseMovie(purchase=purchase, movie=movie, status=PurchaseMovie.STATUS.PENDING) for movie in movies
+        ])
+        payloads = [{'purchase_movie': item.id, 'payment_method': 'BALANCE', 'status': 'PENDING'} for item in items]
+        return 'purchased-movie-payment/', payloads, None
+
+    def seed_subscription(self, user, total, price):
+        subscription = Subscriptions.objects.create(name=user.username, description='bench')
+        item = SubscriptionItems.objects.create(subscribe=subscription, valid_until_days=30, price=price)
+        order = OrderSubscription.objects.create(user=user)
+        orders = OrderSubscriptionItem.objects.bulk_create([
+            OrderSubscriptionItem(order=order, subscription=item, status=OrderSubscriptionItem.Status.PENDING)
+            for _ in range(total)
+        ])
+        payloads = [{'order': order.id, 'payment_method': 'BALANCE', 'status': 'PENDING'} for order in orders]
+        return 'order-subcription-payment/', payloads, None
+
+    def seed_donation(self, user, total, price):
+        campaign = TranslateMovies.objects.create(movie=seed_movies(1)[0], movie_fund=price * (total // 4))
+        payload = {'telegram_id': user.telegram_id, 'translate_movie': campaign.id, 'amount': price}
+        return 'translate-movie-payment/', [payload] * total, campaign
+
+    def seed_fill(self, user, total, price):
+        return 'user-fill-balance-telegram/', [{'telegram_id': user.telegram_id, 'amount': price}] * total, None
+
+    def report_drift(self, user, funds, price, accepted, scenario, campaign):
+        moved = accepted * price
+        expected = funds + moved if scenario == 'fill' else funds - moved
+        balance = wallet.balance(user.id)
+        ledger = LedgerEntry.objects.filter(user=user).aggregate(total=Sum('amount'))['total'] or 0
+        lines = [f'balance {balance} (expected {expected}, drift {balance - expected:+d}), '
+                 f'ledger {ledger} (drift {ledger - balance:+d})']
+        if campaign is not None:
+            collected = CollectedMoneyShard.objects.filter(translate_movie=campaign).aggregate(total=Sum('amount'))
+            donated = PaymentTranslateMovie.objects.filter(translate_movie=campaign).aggregate(total=Sum('amount'))
+            campaign.refresh_from_db(fields=['is_finish'])
+            lines.append(f'campaign collected {collected["total"] or 0} (expected {moved}, '
+                         f'payments {donated["total"] or 0}), finished {campaign.is_finish}')
+        for line in lines:
+            self.stdout.write(f'{"":>12}  {line}')
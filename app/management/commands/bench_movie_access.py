@@ -0,0 +1,67 @@
+import time
+import uuid
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from app.management.commands._bench import seed_movies, cleanup
+from app.models.movie import Movie, Subscriptions
+from app.models.orders import Purchase, PurchaseMovie
+from app.models.users import User
+
+
+class Command(BaseCommand):
+    help = 'Compare one movies/access/ call with a movie/<slug>/ request per card.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--movies', type=int, default=200)
+        parser.add_argument('--rounds', type=int, default=5)
+        parser.add_argument('--yes-i-know', action='store_true',
+                            help='Run even though DEBUG is off, i.e. against what may be a real database.')
+
+    def handle(self, *args, **options):
+        if not settings.DEBUG and not options['yes_i_know']:
+            raise CommandError('bench_movie_access writes movies, a user, a subscription tier and orders to the '
+                               'default database; run it with DEBUG on, or pass --yes-i-know.')
+        count = options['movies']
+        run_id = uuid.uuid4()
+
+        try:
+            movies = seed_movies(count)
+            # A tier of its own, so no real tier is reused or left behind.
+            tier = Subscriptions.objects.create(name=f'bench-{run_id}', description='bench')
+            Movie.objects.filter(id__in=[movie.id for movie in movies[::3]]).update(
+                access_type=Movie.AccessType.PURCHASE)
+            Movie.objects.filter(id__in=[movie.id for movie in movies[1::3]]).update(
+                access_type=Movie.AccessType.SUBSCRIPTION, subscribe=tier)
+
+            user = User.objects.create(username=f'bench-{run_id}', email=f'bench-{run_id}@example.com',
+                                       telegram_id=str(run_id.int)[:30])
+            purchase = Purchase.objects.create(user=user)
+            PurchaseMovie.objects.bulk_create([
+                PurchaseMovie(purchase=purchase, movie=movie, status=PurchaseMovie.STATUS.ACCEPTED)
+                for movie in movies[::6]
+            ])
+            client = APIClient()
+            client.force_authenticate(user)
+            ids = ','.join(str(movie.id) for movie in movies)
+
+            for label, run in (
+                ('per movie', lambda: [client.get(f'/api/movie/{movie.slug}/') for movie in movies]),
+                ('batch', lambda: client.get('/api/movies/access/', {'ids': ids})),
+            ):
+                run()
+                with CaptureQueriesContext(connection) as queries:
+                    started = time.perf_counter()
+                    for _ in range(options['rounds']):
+                        run()
+                    elapsed = (time.perf_counter() - started) / options['rounds']
+                self.stdout.write(f'{label:>10}: {elapsed * 1000:.1f}ms and '
+                                  f'{len(queries) / options["rounds"]:.0f} queries for {count} cards')
+        finally:
+            User.objects.filter(username=f'bench-{run_id}').delete()
+            Subscriptions.objects.filter(name=f'bench-{run_id}').delete()
+            cleanup()
@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand
+from django.test import Client, override_settings
+
+from app.counters import flush_movie_views
+from app.management.commands._bench import seed_movies, cleanup, run_concurrently
+
+
+class Command(BaseCommand):
+    help = 'Measure movie/<slug>/ throughput with synchronous and write-behind view counting.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=2000)
+        parser.add_argument('--concurrency', type=int, default=8)
+
+    def handle(self, *args, **options):
+        movie = seed_movies(10)[0]
+        url = f'/api/movie/{movie.slug}/'
+        client = Client()
+
+        def hit(_):
+            response = client.get(url)
+            assert response.status_code == 200, response.status_code
+
+        served = 0
+        try:
+            for write_behind in (False, True):
+                with override_settings(MOVIE_VIEWS_WRITE_BEHIND=write_behind):
+                    timing = run_concurrently(hit, options['requests'], options['concurrency'])
+                served += len(timing.latencies)
+                label = 'write-behind' if write_behind else 'synchronous'
+                self.stdout.write(f'{label:>12}: {timing}')
+
+            flush_movie_views()
+            movie.refresh_from_db(fields=['views'])
+            self.stdout.write(f'views recorded: {movie.views} (expected {served})')
+        finally:
+            cleanup()
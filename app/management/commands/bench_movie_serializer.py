@@ -0,0 +1,47 @@
+import time
+
+from django.core.management.base import BaseCommand
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIRequestFactory
+from rest_framework.request import Request
+
+from app.management.commands._bench import seed_movies, cleanup
+from app.models.movie import Movie
+from app.serializer import MovieModelSerializer
+from app.values_plan import ValuesPlan
+
+
+class Command(BaseCommand):
+    help = 'Compare MovieModelSerializer with the values() fast path on list-sized pages.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=100)
+        parser.add_argument('--rounds', type=int, default=200)
+
+    def handle(self, *args, **options):
+        rows, rounds = options['rows'], options['rounds']
+        movies = seed_movies(rows)
+        request = Request(APIRequestFactory().get('/api/movie-most-watched/'))
+        queryset = Movie.objects.filter(id__in=[movie.id for movie in movies]).order_by('-id')
+        plan = ValuesPlan(MovieModelSerializer)
+        renderer = JSONRenderer()
+
+        def serializer_page():
+            return MovieModelSerializer(list(queryset.all()), many=True, context={'request': request}).data
+
+        def values_page():
+            return plan.render(list(queryset.values(*plan.columns)), request)
+
+        try:
+            if renderer.render(serializer_page()) != renderer.render(values_page()):
+                self.stderr.write(self.style.ERROR('Rendered JSON differs between the two paths'))
+
+            for label, page in (('serializer', serializer_page), ('values plan', values_page)):
+                started = time.perf_counter()
+                for _ in range(rounds):
+                    renderer.render(page())
+                elapsed = time.perf_counter() - started
+                self.stdout.write(f'{label:>12}: {rows * rounds / elapsed:,.0f} rows/s '
+                                  f'({elapsed / rounds * 1000:.2f}ms per {rows}-row page)')
+        finally:
+            cleanup()
@@ -0,0 +1,67 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils.text import slugify
+
+from app.management.commands._bench import seed_movies, cleanup, run_concurrently
+from app.models.movie import Movie
+
+TITLE = 'bench same title'
+
+
+def legacy_slug(title):
+    """The allocator Movie.save used before: probe and append '-1' until free."""
+    slug, probes = slugify(title, allow_unicode=True), 1
+    while Movie.objects.filter(slug=slug).exists():
+        slug += '-1'
+        probes += 1
+    return slug, probes
+
+
+class Command(BaseCommand):
+    help = 'Insert thousands of same-titled movies and measure slug allocation cost.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--count', type=int, default=2000)
+        parser.add_argument('--concurrency', type=int, default=8)
+
+    def handle(self, *args, **options):
+        template = seed_movies(1)[0]
+        fields = {
+            'category_id': template.category_id, 'country_id': template.country_id,
+            'language_id': template.language_id, 'description': 'bench', 'picture': template.picture,
+            'trailer_url': template.trailer_url, 'release_date': template.release_date,
+        }
+        count = options['count']
+
+        try:
+            probes, started = 0, time.perf_counter()
+            max_length = Movie._meta.get_field('slug').max_length
+            for inserted in range(count):
+                slug, used = legacy_slug(TITLE)
+                if len(slug) > max_length:
+                    break
+                Movie.objects.bulk_create([Movie(title=TITLE, slug=slug, **fields)])
+                probes += used
+            self.stdout.write(f'legacy: {inserted} inserts in {time.perf_counter() - started:.2f}s, '
+                              f'{probes} probe queries, stopped at a {len(slug)}-char slug')
+            Movie.objects.filter(title=TITLE).delete()
+
+            with CaptureQueriesContext(connection) as queries:
+                started = time.perf_counter()
+                for _ in range(count):
+                    Movie(title=TITLE, **fields).save()
+            self.stdout.write(f'sequential: {count} inserts in {time.perf_counter() - started:.2f}s, '
+                              f'{len(queries) / count:.1f} queries per save, signal handlers included')
+
+            before = Movie.objects.filter(title=TITLE).count()
+            timing = run_concurrently(lambda _: Movie(title=TITLE, **fields).save(), count, options['concurrency'])
+            self.stdout.write(f'concurrent: {timing}')
+
+            slugs = list(Movie.objects.filter(title=TITLE).values_list('slug', flat=True))
+            self.stdout.write(f'rows: {len(slugs)} (expected {before + len(timing.latencies)}), '
+                              f'distinct slugs: {len(set(slugs))}')
+        finally:
+            cleanup()
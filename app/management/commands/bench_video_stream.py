@@ -0,0 +1,85 @@
+import random
+import time
+import tracemalloc
+
+from django.core.management.base import BaseCommand
+from django.test import Client, RequestFactory
+from django.views.static import serve
+
+from app.management.commands._bench import seed_movies, cleanup, Timing
+from app.signed_media import private_storage
+from app.streaming import open_session
+
+MB = 1024 * 1024
+
+
+def consume(response):
+    return sum(len(chunk) for chunk in response.streaming_content)
+
+
+class Command(BaseCommand):
+    help = 'Throughput and memory of the Range streaming endpoint against Django\'s static view, on a local file.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--size', type=int, default=512, help='File size in MiB.')
+        parser.add_argument('--seeks', type=int, default=200)
+        parser.add_argument('--range-size', type=int, default=1024, help='Bytes per seek in KiB.')
+
+    def handle(self, *args, **options):
+        size = options['size'] * MB
+        storage = private_storage()
+        name = storage.save('bench/stream.mp4', _Filler(size))
+        movie = seed_movies(1, video=name)[0]
+        client = Client()
+        url = f'/api/stream/{open_session("app.movie", movie.id)}/'
+        # Baseline only: video is never on a public static route.
+        static_request = RequestFactory().get(f'/{name}')
+
+        try:
+            for label, fetch in (
+                ('stream', lambda: client.get(url)),
+                ('static', lambda: serve(static_request, name, document_root=storage.location)),
+            ):
+                started = time.perf_counter()
+                sent = consume(fetch())
+                elapsed = time.perf_counter() - started
+
+                tracemalloc.start()
+                consume(fetch())
+                peak = tracemalloc.get_traced_memory()[1]
+                tracemalloc.stop()
+                self.stdout.write(f'{label:>7} full file: {sent / MB / elapsed:.0f} MiB/s, '
+                                  f'peak Python memory {peak / 1024:.0f} KiB for {size // MB} MiB')
+
+            span = options['range_size'] * 1024
+            offsets = [random.randrange(0, max(size - span, 1)) for _ in range(options['seeks'])]
+            latencies, sent = [], 0
+            started = time.perf_counter()
+            for offset in offsets:
+                request_started = time.perf_counter()
+                response = client.get(url, HTTP_RANGE=f'bytes={offset}-{offset + span - 1}')
+                sent += consume(response)
+                latencies.append(time.perf_counter() - request_started)
+            timing = Timing(time.perf_counter() - started, latencies)
+            self.stdout.write(f' stream seeks: {timing}, {sent / MB:.0f} MiB sent')
+            self.stdout.write(f' static seeks: no Range support, {len(offsets) * size / MB:.0f} MiB would be sent')
+        finally:
+            storage.delete(name)
+            cleanup()
+
+
+class _Filler:
+    """File-like source of `size` bytes so the fixture is written without holding it in memory."""
+
+    def __init__(self, size):
+        self.size = size
+        self.block = random.randbytes(MB)
+
+    def read(self, size=-1):
+        size = self.size if size is None or size < 0 else min(size, self.size)
+        self.size -= size
+        return (self.block * (size // MB + 1))[:size]
+
+    def chunks(self, chunk_size=MB):
+        while self.size:
+            yield self.read(chunk_size)
@@ -0,0 +1,54 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from django.apps import apps
+from django.core.management.base import BaseCommand
+from django.db import connections
+from PIL import UnidentifiedImageError
+
+from app.renditions import RENDITION_FIELDS, RENDITION_WIDTHS, render_width, store_renditions
+
+
+def render_all_widths(label, name):
+    return [(width, render_width(label, name, width)) for width in RENDITION_WIDTHS]
+
+
+class Command(BaseCommand):
+    help = 'Generate missing WebP/JPEG renditions for existing uploads in a process pool.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--model', choices=sorted(RENDITION_FIELDS), help='Only this model.')
+        parser.add_argument('--workers', type=int, default=os.cpu_count())
+
+    def pending(self, label):
+        file_field, renditions_field = RENDITION_FIELDS[label]
+        rows = apps.get_model(label).objects.exclude(**{file_field: ''}).values_list('pk', file_field, renditions_field)
+        for pk, name, renditions in rows.iterator(chunk_size=2000):
+            if (renditions or {}).get('source') != name:
+                yield pk, name
+
+    def handle(self, *args, **options):
+        labels = [options['model']] if options['model'] else list(RENDITION_FIELDS)
+        jobs = [(label, pk, name) for label in labels for pk, name in self.pending(label)]
+        self.stdout.write(f'{len(jobs)} uploads need renditions')
+
+        # Workers only touch storage; don't let them inherit open database sockets.
+        connections.close_all()
+        done = failed = 0
+        started = time.perf_counter()
+        with ProcessPoolExecutor(max_workers=options['workers']) as pool:
+            futures = [(job, pool.submit(render_all_widths, job[0], job[2])) for job in jobs]
+            for (label, pk, name), future in futures:
+                try:
+                    results = future.result()
+                except (OSError, UnidentifiedImageError) as error:
+                    failed += 1
+                    self.stderr.write(f'{label} #{pk} {name}: {error}')
+                    continue
+                store_renditions(label, pk, name, results)
+                done += 1
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Rendered {done} uploads ({failed} failed) in {time.perf_counter() - started:.1f}s'
+        ))
@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections, DEFAULT_DB_ALIAS
+
+from app.search import install_search_index, verify_search_index, supports_full_text
+
+
+class Command(BaseCommand):
+    help = 'Install the movie full-text/trigram search triggers and GIN indexes, then verify them.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--verify-only', action='store_true', help='Check the setup without changing it.')
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS)
+
+    def handle(self, *args, **options):
+        connection = connections[options['database']]
+
+        if not supports_full_text(connection):
+            self.stdout.write(f'{connection.vendor} has no full-text support; search uses the substring fallback.')
+            return
+
+        if not options['verify_only']:
+            install_search_index(connection)
+            self.stdout.write('Installed search triggers and indexes, refreshed search vectors.')
+
+        problems = verify_search_index(connection)
+        if problems:
+            raise CommandError('; '.join(problems))
+        self.stdout.write(self.style.SUCCESS('Search index OK'))
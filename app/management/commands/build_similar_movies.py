@@ -0,0 +1,19 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from app.similarity import rebuild_similar_movies, SIMILAR_MOVIES_LIMIT
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the precomputed similar-movies index for the whole catalog.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('-k', type=int, default=SIMILAR_MOVIES_LIMIT, help='Neighbours kept per movie.')
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        count = rebuild_similar_movies(options['k'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Indexed {count} movies in {time.perf_counter() - started:.2f}s'
+        ))
@@ -0,0 +1,263 @@
+import csv
+import json
+import time
+from decimal import Decimal, InvalidOperation
+from itertools import islice
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Q
+from django.utils.dateparse import parse_date, parse_duration
+from django.utils.text import slugify
+
+from app import autocomplete, response_cache, sampling
+from app.models.base import MAX_SLUG_SUFFIX_DIGITS
+from app.models.movie import Movie, Category, Genre, Countries, Language, Season, Episode
+from app.task import rebuild_similar_movies_task
+
+TRUE_VALUES = {'1', 'true', 'yes', 'y'}
+SLUG_BATCH = 500
+
+
+def read_csv(path):
+    with open(path, newline='', encoding='utf-8') as file:
+        for row in csv.DictReader(file):
+            row['genres'] = [name for name in (row.get('genres') or '').split('|') if name.strip()]
+            row['seasons'] = json.loads(row['seasons']) if row.get('seasons') else []
+            yield row
+
+
+def read_jsonl(path):
+    with open(path, encoding='utf-8') as file:
+        for line in file:
+            if line.strip():
+                yield json.loads(line)
+
+
+def parse_row(row):
+    """Validate one raw row and normalise it to the field values the importer needs."""
+    title = (row.get('title') or '').strip()
+    if not title:
+        raise ValueError('title is required')
+    for lookup in ('category', 'country', 'language'):
+        if not (row.get(lookup) or '').strip():
+            raise ValueError(f'{lookup} is required')
+
+    release_date = parse_date(str(row.get('release_date') or ''))
+    if release_date is None:
+        raise ValueError(f'bad release_date {row.get("release_date")!r}')
+
+    duration = row.get('duration')
+    if duration not in (None, ''):
+        duration = parse_duration(str(duration))
+        if duration is None:
+            raise ValueError(f'bad duration {row.get("duration")!r}')
+
+    access_type = (row.get('access_type') or Movie.AccessType.FREE).upper()
+    if access_type not in Movie.AccessType.values:
+        raise ValueError(f'bad access_type {access_type!r}')
+
+    try:
+        price = Decimal(str(row['price'])) if row.get('price') not in (None, '') else Decimal(0)
+    except InvalidOperation:
+        raise ValueError(f'bad price {row.get("price")!r}')
+
+    seasons = []
+    for season in row.get('seasons') or []:
+        episodes = []
+        for episode in season.get('episodes', []):
+            episode_duration = parse_duration(str(episode.get('duration', '')))
+            if episode_duration is None:
+                raise ValueError(f'bad episode duration {episode.get("duration")!r}')
+            episodes.append((episode['title'], episode.get('video', ''), episode_duration))
+        seasons.append((int(season['season_number']), episodes))
+
+    return {
+        'title': title[:100],
+        'description': row.get('description') or '',
+        'category': row['category'].strip(),
+        'country': row['country'].strip(),
+        'language': row['language'].strip(),
+        'genres': [name.strip() for name in row.get('genres') or []],
+        'release_date': release_date,
+        'duration': duration or None,
+        'trailer_url': row.get('trailer_url') or '',
+        'picture': row.get('picture') or '',
+        'video': row.get('video') or None,
+        'price': price,
+        'access_type': access_type,
+        'is_premier': str(row.get('is_premier', '')).lower() in TRUE_VALUES,
+        'seasons': seasons,
+    }
+
+
+def chunked(iterable, size):
+    iterator = iter(iterable)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
+def highest_suffixes(bases):
+    """
+    Highest numeric suffix already used for each slug base: 0 when only the bare
+    base exists, no entry when neither the base nor any `base-N` is taken.
+    SLUG_BATCH bases per query, each matched by exact slug or by prefix so the
+    slug indexes serve the lookup; suffixes are parsed here rather than with a
+    regex per base, which Postgres would recheck against every candidate row.
+    """
+    highest = {}
+    bases = sorted(set(bases))
+    for start in range(0, len(bases), SLUG_BATCH):
+        batch = set(bases[start:start + SLUG_BATCH])
+        query = Q(slug__in=batch)
+        for base in batch:
+            query |= Q(slug__startswith=f'{base}-')
+        for slug in Movie.objects.filter(query).order_by().values_list('slug', flat=True).iterator():
+            if slug in batch:
+                highest.setdefault(slug, 0)
+            base, _, suffix = slug.rpartition('-')
+            if base in batch and suffix.isascii() and suffix.isdigit() and len(suffix) <= MAX_SLUG_SUFFIX_DIGITS:
+                highest[base] = max(highest.get(base, 0), int(suffix))
+    return highest
+
+
+class LookupMap:
+    """Name -> id for one lookup model, loaded once; missing names are inserted in bulk."""
+
+    def __init__(self, model):
+        self.model = model
+        self.ids = {}
+        # Names are not unique; iterate newest first so the oldest row wins.
+        for pk, name in model.objects.order_by('-id').values_list('id', 'name'):
+            self.ids[name] = pk
+        self.created = 0
+
+    def resolve(self, names):
+        missing = {name for name in names if name not in self.ids}
+        if missing:
+            self.model.objects.bulk_create([self.model(name=name) for name in missing])
+            for pk, name in self.model.objects.filter(name__in=missing).values_list('id', 'name'):
+                self.ids.setdefault(name, pk)
+            self.created += len(missing)
+
+
+class Command(BaseCommand):
+    help = 'Stream movies (with genres, seasons and episodes) from a CSV or JSONL file into the catalog.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--format', choices=['csv', 'jsonl'], help='Defaults to the file extension.')
+        parser.add_argument('--chunk-size', type=int, default=1000)
+        parser.add_argument('--skip-invalid', action='store_true', help='Report bad rows and keep going.')
+
+    def handle(self, *args, **options):
+        path = Path(options['path'])
+        if not path.exists():
+            raise CommandError(f'{path} does not exist')
+        file_format = options['format'] or path.suffix.lstrip('.').lower()
+        readers = {'csv': read_csv, 'jsonl': read_jsonl, 'json': read_jsonl}
+        if file_format not in readers:
+            raise CommandError(f'Unknown format {file_format!r}, pass --format')
+
+        self.lookups = {
+            'category': LookupMap(Category),
+            'country': LookupMap(Countries),
+            'language': LookupMap(Language),
+            'genres': LookupMap(Genre),
+        }
+        self.skip_invalid = options['skip_invalid']
+        self.skipped = 0
+
+        imported, started = 0, time.perf_counter()
+        try:
+            for chunk in chunked(self.parse(readers[file_format](path)), options['chunk_size']):
+                with transaction.atomic():
+                    self.import_chunk(chunk)
+                imported += len(chunk)
+                elapsed = time.perf_counter() - started
+                self.stdout.write(f'{imported} movies, {imported / elapsed:.0f} rows/s')
+        finally:
+            if imported:
+                self.invalidate_derived_data()
+
+        created = ', '.join(f'{lookup.created} {name}' for name, lookup in self.lookups.items())
+        self.stdout.write(self.style.SUCCESS(
+            f'Imported {imported} movies in {time.perf_counter() - started:.1f}s '
+            f'(new lookups: {created}; skipped rows: {self.skipped})'
+        ))
+
+    def parse(self, rows):
+        for line, row in enumerate(rows, start=1):
+            try:
+                yield parse_row(row)
+            except (ValueError, KeyError, TypeError, AttributeError) as error:
+                if not self.skip_invalid:
+                    raise CommandError(f'Row {line}: {error}')
+                self.skipped += 1
+                self.stderr.write(f'Row {line} skipped: {error}')
+
+    def allocate_slugs(self, rows):
+        """
+        Give every row a free slug: one query per SLUG_BATCH distinct bases for
+        the bare bases and their `base-N` suffixes already taken, instead of a
+        lookup per row. Slugs handed out earlier in the chunk are skipped too.
+        """
+        bases = [slugify(row['title'], allow_unicode=True)[:89].strip('-') or 'movie' for row in rows]
+        last_suffix = highest_suffixes(bases)
+        assigned = set()
+
+        for row, base in zip(rows, bases):
+            suffix = last_suffix[base] + 1 if base in last_suffix else 0
+            while (slug := f'{base}-{suffix}' if suffix else base) in assigned:
+                suffix += 1
+            last_suffix[base] = suffix
+            assigned.add(slug)
+            row['slug'] = slug
+
+    def import_chunk(self, rows):
+        for name, lookup in self.lookups.items():
+            names = set()
+            for row in rows:
+                names.update(row[name] if name == 'genres' else [row[name]])
+            lookup.resolve(names)
+
+        self.allocate_slugs(rows)
+        movies = Movie.objects.bulk_create([
+            Movie(
+                title=row['title'], slug=row['slug'], description=row['description'],
+                category_id=self.lookups['category'].ids[row['category']],
+                country_id=self.lookups['country'].ids[row['country']],
+                language_id=self.lookups['language'].ids[row['language']],
+                release_date=row['release_date'], duration=row['duration'], trailer_url=row['trailer_url'],
+                picture=row['picture'], video=row['video'], price=row['price'],
+                access_type=row['access_type'], is_premier=row['is_premier'],
+            )
+            for row in rows
+        ])
+
+        genre_ids = self.lookups['genres'].ids
+        Movie.genre.through.objects.bulk_create([
+            Movie.genre.through(movie_id=movie.pk, genre_id=genre_ids[name])
+            for movie, row in zip(movies, rows)
+            for name in dict.fromkeys(row['genres'])
+        ])
+
+        seasons = Season.objects.bulk_create([
+            Season(movie_id=movie.pk, season_number=number)
+            for movie, row in zip(movies, rows)
+            for number, _ in row['seasons']
+        ])
+        season_episodes = [episodes for row in rows for _, episodes in row['seasons']]
+        Episode.objects.bulk_create([
+            Episode(season_id=season.pk, title=title, video=video, duration=duration)
+            for season, episodes in zip(seasons, season_episodes)
+            for title, video, duration in episodes
+        ])
+
+    def invalidate_derived_data(self):
+        """bulk_create skips the model signals, so refresh everything they would have kept in sync."""
+        sampling.reset_pools()
+        autocomplete.publish_reload()
+        response_cache.bump_tags('movie', 'genre', 'countries', 'category')
+        rebuild_similar_movies_task.delay()
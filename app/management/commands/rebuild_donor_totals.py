@@ -0,0 +1,15 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from app.donations import rebuild_totals
+
+
+class Command(BaseCommand):
+    help = 'Recompute the donor leaderboard totals from PaymentTranslateMovie history.'
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        rows = rebuild_totals()
+        self.stdout.write(self.style.SUCCESS(
+            f'Rebuilt {rows} donor totals in {time.perf_counter() - started:.2f}s'))
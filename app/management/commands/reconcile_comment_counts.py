@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from app.counters import drifted_comment_counts, reconcile_comment_counts
+
+
+class Command(BaseCommand):
+    help = 'Repair Movie.comment_count values that drifted from the comments table.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='Only report drifted movies.')
+
+    def handle(self, *args, **options):
+        if options['dry_run']:
+            for movie_id, stored, actual in drifted_comment_counts().values_list('id', 'comment_count', 'actual'):
+                self.stdout.write(f'movie #{movie_id}: stored {stored}, actual {actual}')
+            return
+
+        fixed = reconcile_comment_counts()
+        self.stdout.write(self.style.SUCCESS(f'Repaired comment_count on {fixed} movies'))
@@ -0,0 +1,29 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from app.response_cache import cache_stats, reset_stats
+
+
+class Command(BaseCommand):
+    help = 'Show response cache hits, misses and hit ratio per view.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--reset', action='store_true', help='Clear the counters after printing them.')
+
+    def handle(self, *args, **options):
+        stats = cache_stats()
+        rate = settings.RESPONSE_CACHE_STATS_SAMPLE_RATE
+        if rate <= 0:
+            self.stdout.write('Counters are off (RESPONSE_CACHE_STATS_SAMPLE_RATE = 0)')
+        elif rate < 1:
+            self.stdout.write(f'Estimated from {rate:.0%} of lookups')
+        if not stats:
+            self.stdout.write('No cached lookups recorded yet')
+        for view_name, counts in sorted(stats.items()):
+            self.stdout.write(
+                f'{view_name}: {counts["hit"]} hits, {counts["miss"]} misses, {counts["ratio"]:.1%} hit ratio'
+            )
+
+        if options['reset']:
+            reset_stats()
+            self.stdout.write(self.style.SUCCESS('Counters reset'))
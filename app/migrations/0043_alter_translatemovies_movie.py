@@ -0,0 +1,19 @@
+# Generated by Django 5.2 on 2026-10-18 16:47
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0042_alter_translatemovies_collected_money'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='translatemovies',
+            name='movie',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='app.movie', unique=True),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2 on 2026-10-18 16:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0043_similarmovie'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='moviecomment',
+            index=models.Index(fields=['movie', 'created_at', 'id'], name='moviecomment_movie_created_idx'),
+        ),
+    ]
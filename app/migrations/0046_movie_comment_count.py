@@ -0,0 +1,35 @@
+# Generated by Django 5.2 on 2026-10-18 16:49
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def backfill_comment_count(apps, schema_editor):
+    Movie = apps.get_model('app', 'Movie')
+    MovieComment = apps.get_model('app', 'MovieComment')
+    comments = (
+        MovieComment.objects.filter(movie=OuterRef('pk'))
+        .order_by().values('movie').annotate(total=Count('id')).values('total')
+    )
+    Movie.objects.update(comment_count=Coalesce(Subquery(comments), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0045_catalog_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='movie',
+            name='comment_count',
+            field=models.PositiveIntegerField(db_default=0, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='movie',
+            index=models.Index(fields=['-comment_count', '-id'], name='movie_comment_count_idx'),
+        ),
+        migrations.RunPython(backfill_comment_count, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.2 on 2026-10-18 16:51
+
+import django.contrib.postgres.search
+from django.db import migrations
+
+
+def install_search_index(apps, schema_editor):
+    from app.search import install_search_index
+
+    install_search_index(schema_editor.connection)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0046_movie_comment_count'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='movie',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.RunPython(install_search_index, migrations.RunPython.noop),
+    ]
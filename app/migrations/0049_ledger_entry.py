@@ -0,0 +1,41 @@
+# Generated by Django 5.2 on 2026-10-18 17:18
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def open_ledgers(apps, schema_editor):
+    # Existing balances predate the ledger; record them so entries sum to User.balance.
+    User = apps.get_model('app', 'User')
+    LedgerEntry = apps.get_model('app', 'LedgerEntry')
+    balances = User.objects.filter(balance__gt=0).values_list('id', 'balance').iterator()
+    LedgerEntry.objects.bulk_create(
+        (LedgerEntry(user_id=user_id, amount=balance, kind='OPENING') for user_id, balance in balances),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0048_picture_renditions'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LedgerEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('amount', models.BigIntegerField()),
+                ('kind', models.CharField(choices=[('OPENING', 'opening balance'), ('FILL', 'fill'), ('TELEGRAM_FILL', 'telegram fill'), ('MOVIE', 'movie purchase'), ('SUBSCRIPTION', 'subscription'), ('DONATION', 'translation donation')], max_length=20)),
+                ('reference', models.CharField(blank=True, max_length=64)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='ledger', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['user', '-id'], name='ledger_user_id_idx')],
+            },
+        ),
+        migrations.RunPython(open_ledgers, migrations.RunPython.noop),
+    ]
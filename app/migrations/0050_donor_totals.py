@@ -0,0 +1,41 @@
+# Generated by Django 5.2 on 2026-10-18 17:21
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Sum
+
+
+def backfill_donor_totals(apps, schema_editor):
+    PaymentTranslateMovie = apps.get_model('app', 'PaymentTranslateMovie')
+    DonorTotal = apps.get_model('app', 'DonorTotal')
+    donations = PaymentTranslateMovie.objects.order_by()
+    rows = [DonorTotal(user_id=user_id, total=total)
+            for user_id, total in donations.values_list('user').annotate(Sum('amount'))]
+    rows += [DonorTotal(user_id=user_id, translate_movie_id=campaign_id, total=total)
+             for user_id, campaign_id, total in donations.values_list('user', 'translate_movie').annotate(Sum('amount'))]
+    DonorTotal.objects.bulk_create(rows, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0049_ledger_entry'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DonorTotal',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('total', models.PositiveBigIntegerField(default=0)),
+                ('translate_movie', models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='donor_totals', to='app.translatemovies')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='donor_totals', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['translate_movie', '-total', 'id'], name='donor_total_rank_idx')],
+                'constraints': [models.UniqueConstraint(condition=models.Q(('translate_movie', None)), fields=('user',), name='donor_total_overall_unique'), models.UniqueConstraint(condition=models.Q(('translate_movie__isnull', False)), fields=('user', 'translate_movie'), name='donor_total_campaign_unique')],
+            },
+        ),
+        migrations.RunPython(backfill_donor_totals, migrations.RunPython.noop),
+    ]
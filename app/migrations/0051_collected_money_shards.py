@@ -0,0 +1,37 @@
+# Generated by Django 5.2 on 2026-10-18 17:23
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def seed_shards(apps, schema_editor):
+    # Whatever was collected so far becomes shard 0 of each campaign.
+    TranslateMovies = apps.get_model('app', 'TranslateMovies')
+    CollectedMoneyShard = apps.get_model('app', 'CollectedMoneyShard')
+    CollectedMoneyShard.objects.bulk_create([
+        CollectedMoneyShard(translate_movie_id=pk, shard=0, amount=collected)
+        for pk, collected in TranslateMovies.objects.filter(collected_money__gt=0).values_list('id', 'collected_money')
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0050_donor_totals'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CollectedMoneyShard',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('shard', models.PositiveSmallIntegerField()),
+                ('amount', models.PositiveBigIntegerField(default=0)),
+                ('translate_movie', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='money_shards', to='app.translatemovies')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('translate_movie', 'shard'), name='collected_money_shard_unique')],
+            },
+        ),
+        migrations.RunPython(seed_shards, migrations.RunPython.noop),
+    ]
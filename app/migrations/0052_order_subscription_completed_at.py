@@ -0,0 +1,26 @@
+# Generated by Django 5.2 on 2026-10-18 17:33
+
+from django.db import migrations, models
+from django.db.models import F
+
+
+def backfill_completed_at(apps, schema_editor):
+    # The best record of when existing orders were paid is their last update.
+    OrderSubscriptionItem = apps.get_model('app', 'OrderSubscriptionItem')
+    OrderSubscriptionItem.objects.filter(status='COMPLETED').update(completed_at=F('updated_at'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0051_collected_money_shards'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ordersubscriptionitem',
+            name='completed_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.RunPython(backfill_completed_at, migrations.RunPython.noop),
+    ]
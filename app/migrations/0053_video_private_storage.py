@@ -0,0 +1,46 @@
+# Generated by Django 5.2 on 2026-10-18 18:08
+
+import app.signed_media
+from django.core.files.storage import default_storage
+from django.db import migrations, models
+
+
+def _move(apps, source, target):
+    # Files already uploaded to MEDIA_ROOT must leave it, or the public route keeps serving them.
+    for model in ('Movie', 'Episode'):
+        names = apps.get_model('app', model).objects.exclude(video='').exclude(video=None)
+        for name in names.values_list('video', flat=True).iterator():
+            if not source.exists(name) or target.exists(name):
+                continue
+            with source.open(name, 'rb') as file:
+                target.save(name, file)
+            source.delete(name)
+
+
+def move_videos_to_private_storage(apps, schema_editor):
+    _move(apps, default_storage, app.signed_media.private_storage())
+
+
+def move_videos_to_media_root(apps, schema_editor):
+    _move(apps, app.signed_media.private_storage(), default_storage)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0052_order_subscription_completed_at'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='episode',
+            name='video',
+            field=models.FileField(storage=app.signed_media.private_storage, upload_to=''),
+        ),
+        migrations.AlterField(
+            model_name='movie',
+            name='video',
+            field=models.FileField(blank=True, null=True, storage=app.signed_media.private_storage, upload_to=''),
+        ),
+        migrations.RunPython(move_videos_to_private_storage, move_videos_to_media_root),
+    ]
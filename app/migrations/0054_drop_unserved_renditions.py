@@ -0,0 +1,21 @@
+# Generated by Django 5.2 on 2026-10-18 18:15
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0053_video_private_storage'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='castmembers',
+            name='picture_renditions',
+        ),
+        migrations.RemoveField(
+            model_name='user',
+            name='image_renditions',
+        ),
+    ]
@@ -1,4 +1,10 @@
-from django.db.models import DateTimeField, Model
+import random
+import re
+
+from django.db import IntegrityError, router, transaction
+from django.db.models import DateTimeField, Model, Q, Max, Case, When, Value, BigIntegerField
+from django.db.models.functions import Cast, Substr
+from django.utils.text import slugify
 from rest_framework.generics import ListAPIView
 
 
@@ -12,4 +18,94 @@ class TimeModelBase(Model):
 
 
 class NonePaginationListAPIView(ListAPIView):
-    pagination_class = None
\ No newline at end of file
+    pagination_class = None
+
+
+# Longer numeric tails are part of the title, not a suffix we allocated; 18 digits always fit a bigint.
+MAX_SLUG_SUFFIX_DIGITS = 18
+
+
+def allocate_slug(queryset, base, field='slug', spread=0):
+    """
+    Return `base`, or `base-N` with N one above the highest suffix already taken.
+
+    One query: an exact match on `base` or a prefix (LIKE 'base-%') match, both
+    served by the slug's indexes, and MAX() over the numeric suffix, instead of
+    probing candidates one by one. Suffixes longer than MAX_SLUG_SUFFIX_DIGITS
+    are ignored so the cast cannot overflow. A non-zero `spread` adds a random
+    gap of up to that many numbers, so writers that just collided on the same
+    suffix don't all pick the same next one again.
+    """
+    prefix = f'{base}-'
+    taken = queryset.filter(Q(**{field: base}) | Q(**{
+        f'{field}__startswith': prefix,
+        f'{field}__regex': rf'^{re.escape(prefix)}[0-9]{{1,{MAX_SLUG_SUFFIX_DIGITS}}}$',
+    })).aggregate(highest=Max(Case(
+        When(**{field: base}, then=Value(0)),
+        default=Cast(Substr(field, len(prefix) + 1), BigIntegerField()),
+        output_field=BigIntegerField(),
+    )))['highest']
+
+    if taken is None:
+        return base
+    return f'{base}-{taken + 1 + random.randint(0, spread)}'
+
+
+class UniqueSlugMixin(Model):
+    """
+    Fill `slug_field` from `slug_source` when the row is created or its source changes.
+
+    Plain saves (`save(update_fields=['views'])` and the like) keep the slug
+    untouched. A concurrent insert that grabs the same slug trips the unique
+    constraint; the save is then retried with a freshly allocated slug.
+    """
+    slug_source = 'title'
+    slug_field = 'slug'
+    slug_attempts = 8
+
+    class Meta:
+        abstract = True
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._saved_slug_source = instance.__dict__.get(cls.slug_source)
+        return instance
+
+    def slug_is_stale(self):
+        if self._state.adding or not getattr(self, self.slug_field):
+            return True
+        if self.slug_source not in self.__dict__:
+            return False
+        return self.__dict__[self.slug_source] != getattr(self, '_saved_slug_source', None)
+
+    def slug_base(self):
+        max_length = self._meta.get_field(self.slug_field).max_length
+        base = slugify(getattr(self, self.slug_source), allow_unicode=True) or self._meta.model_name
+        # Leave room for a "-<number>" suffix.
+        return base[:max_length - 11].strip('-') if len(base) > max_length - 11 else base
+
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get('update_fields')
+        if not self.slug_is_stale() or (update_fields is not None and self.slug_source not in update_fields):
+            return super().save(*args, **kwargs)
+
+        if update_fields is not None:
+            kwargs['update_fields'] = {*update_fields, self.slug_field}
+        using = kwargs.get('using') or router.db_for_write(type(self), instance=self)
+        others = type(self)._default_manager.using(using).exclude(pk=self.pk)
+        base = self.slug_base()
+
+        for attempt in range(self.slug_attempts):
+            slug = allocate_slug(others, base, self.slug_field, spread=2 ** attempt - 1)
+            setattr(self, self.slug_field, slug)
+            try:
+                with transaction.atomic(using=using):
+                    super().save(*args, **kwargs)
+            except IntegrityError:
+                if attempt + 1 == self.slug_attempts or not others.filter(**{self.slug_field: slug}).exists():
+                    raise
+                continue
+            break
+
+        self._saved_slug_source = getattr(self, self.slug_source)
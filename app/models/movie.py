@@ -1,13 +1,15 @@
 from datetime import timedelta
 
+from django.contrib.postgres.search import SearchVectorField
 from django.db.models import Model, CharField, TextField, ForeignKey, FileField, ImageField, \
     CASCADE, URLField, ManyToManyField, DecimalField, DateField, DurationField, SlugField, BooleanField, \
-    PositiveBigIntegerField, DateTimeField, PositiveSmallIntegerField, PositiveIntegerField, OneToOneField
-from django.db.models import TextChoices
+    PositiveBigIntegerField, DateTimeField, PositiveSmallIntegerField, PositiveIntegerField, OneToOneField, FloatField, \
+    JSONField
+from django.db.models import TextChoices, Index, UniqueConstraint
 from django.utils import timezone
-from django.utils.text import slugify
 
-from app.models.base import TimeModelBase
+from app.models.base import TimeModelBase, UniqueSlugMixin
+from app.signed_media import private_storage
 
 
 
@@ -86,7 +88,7 @@ class Subscribers(Model):
 
 
 
-class Movie(TimeModelBase):
+class Movie(UniqueSlugMixin, TimeModelBase):
     class AccessType(TextChoices):
         FREE = 'FREE', 'free'
         SUBSCRIPTION = 'SUBSCRIPTION', 'subscription'
@@ -99,9 +101,10 @@ class Movie(TimeModelBase):
     title = CharField(max_length=100)
     slug = SlugField(max_length=100, unique=True, editable=False)
     description = TextField(max_length=512)
-    video = FileField(blank=True, null=True)
+    video = FileField(blank=True, null=True, storage=private_storage)
     trailer_url = URLField()
     picture = ImageField()
+    picture_renditions = JSONField(default=dict, blank=True, editable=False)
     rate = PositiveBigIntegerField(db_default=0)
     genre = ManyToManyField('Genre')
     country = ForeignKey('Countries', on_delete=CASCADE)
@@ -113,25 +116,38 @@ class Movie(TimeModelBase):
     subscribe = ForeignKey('Subscriptions', on_delete=CASCADE, null=True, blank=True)
     is_premier = BooleanField(default=False)
     views = PositiveBigIntegerField(db_default=0)
+    comment_count = PositiveIntegerField(db_default=0, editable=False)
+    search_vector = SearchVectorField(null=True, editable=False)
 
     @property
     def get_cast(self):
         return self.cast.get_id
 
-    def save(self, force_insert=False, force_update=False, using=None, update_fields=None):  # noqa
-        title_slug = slugify(self.title, allow_unicode=True)
+    def __str__(self):
+        return self.title
 
-        self.slug = f"{title_slug}"
-        while self.__class__.objects.filter(slug=self.slug).exists():
-            self.slug += '-1'
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            Index(fields=['-created_at', '-id'], name='movie_created_idx'),
+            Index(fields=['-views', '-id'], name='movie_views_idx'),
+            Index(fields=['-rate', '-id'], name='movie_rate_idx'),
+            Index(fields=['-comment_count', '-id'], name='movie_comment_count_idx'),
+        ]
 
-        super().save(force_insert, force_update, using, update_fields)
+
+class SimilarMovie(Model):
+    movie = ForeignKey('Movie', on_delete=CASCADE, related_name='similar_movies')
+    similar = ForeignKey('Movie', on_delete=CASCADE, related_name='neighbour_of')
+    rank = PositiveSmallIntegerField()
+    score = FloatField()
 
     def __str__(self):
-        return self.title
+        return f"{self.movie_id} -> {self.similar_id} (#{self.rank})"
 
     class Meta:
-        ordering = ['-created_at']
+        ordering = ['rank']
+        unique_together = [('movie', 'rank')]
 
 
 class MovieCast(TimeModelBase):
@@ -168,7 +184,7 @@ class Season(Model):
 class Episode(Model):
     season = ForeignKey('Season', on_delete=CASCADE, related_name='episodes')
     title = CharField(max_length=100)
-    video = FileField()
+    video = FileField(storage=private_storage)
     duration = DurationField()
 
     def __str__(self):
@@ -186,6 +202,11 @@ class MovieComment(TimeModelBase):
     def __str__(self):
         return self.comment
 
+    class Meta:
+        indexes = [
+            Index(fields=['movie', 'created_at', 'id'], name='moviecomment_movie_created_idx'),
+        ]
+
 
 class Chat(TimeModelBase):
     user = ForeignKey('User', on_delete=CASCADE, related_name='user')
@@ -227,6 +248,9 @@ class News(TimeModelBase):
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            Index(fields=['-created_at', '-id'], name='news_created_idx'),
+        ]
 
 
 
@@ -266,6 +290,20 @@ class TranslateMovies(TimeModelBase):
 
 
 
+class CollectedMoneyShard(Model):
+    """
+    One slice of a campaign's collected money. Donations add to a random shard
+    so concurrent donors rarely wait on the same row; the total is the sum.
+    """
+    translate_movie = ForeignKey('TranslateMovies', on_delete=CASCADE, related_name='money_shards')
+    shard = PositiveSmallIntegerField()
+    amount = PositiveBigIntegerField(default=0)
+
+    class Meta:
+        constraints = [UniqueConstraint(fields=['translate_movie', 'shard'], name='collected_money_shard_unique')]
+
+
+
 class LastSearch(TimeModelBase):
     user = ForeignKey('User', on_delete=CASCADE)
     search = CharField(max_length=50)
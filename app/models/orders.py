@@ -1,6 +1,8 @@
 
 from django.db.models import Model, CharField, TextField, ForeignKey, DateField, DateTimeField, FileField, ImageField, \
-    CASCADE, URLField, ManyToManyField, BooleanField, DecimalField, TextChoices, PositiveIntegerField
+    CASCADE, URLField, ManyToManyField, BooleanField, DecimalField, TextChoices, PositiveIntegerField, BigIntegerField, \
+    Index, PositiveBigIntegerField, UniqueConstraint, Q
+from django.utils import timezone
 
 from app.models.users import User
 from app.models.base import TimeModelBase
@@ -98,11 +100,20 @@ class OrderSubscriptionItem(TimeModelBase):
     order = ForeignKey('OrderSubscription', related_name='items', on_delete=CASCADE)
     subscription = ForeignKey('SubscriptionItems', related_name='status', on_delete=CASCADE)
     status = CharField(max_length=25, choices=Status.choices, db_default=Status.PENDING)
+    # When the order was paid; the subscription runs from here. `updated_at` moves on any later save.
+    completed_at = DateTimeField(null=True, blank=True, editable=False)
 
     @property
     def get_price(self):
         return self.subscription.price
 
+    def save(self, *args, **kwargs):
+        if self.status == self.Status.COMPLETED and self.completed_at is None:
+            self.completed_at = timezone.now()
+            if kwargs.get('update_fields') is not None:
+                kwargs['update_fields'] = {*kwargs['update_fields'], 'completed_at'}
+        super().save(*args, **kwargs)
+
     def __str__(self):
         return f'Order #{self.id} Status: {self.status}'
 
@@ -143,3 +154,61 @@ class PaymentTranslateMovie(TimeModelBase):
         return f'Translate Movie #{self.translate_movie.id}'
 
 
+
+class DonorTotal(Model):
+    """
+    Running donation total per user: one row across all campaigns
+    (`translate_movie` is NULL) and one per campaign. Kept in step with
+    PaymentTranslateMovie by app.donations inside the donation's transaction.
+    """
+
+    user = ForeignKey('User', related_name='donor_totals', on_delete=CASCADE)
+    translate_movie = ForeignKey('TranslateMovies', related_name='donor_totals', on_delete=CASCADE, null=True)
+    total = PositiveBigIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            UniqueConstraint(fields=['user'], condition=Q(translate_movie=None), name='donor_total_overall_unique'),
+            UniqueConstraint(fields=['user', 'translate_movie'], condition=Q(translate_movie__isnull=False),
+                             name='donor_total_campaign_unique'),
+        ]
+        indexes = [Index(fields=['translate_movie', '-total', 'id'], name='donor_total_rank_idx')]
+
+    def __str__(self):
+        return f'{self.user_id}: {self.total}'
+
+
+
+class LedgerEntry(Model):
+    """
+    One balance movement: positive amounts are credits, negative are debits.
+    Rows are only ever inserted (see app.wallet); the sum per user equals User.balance.
+    """
+
+    class Kind(TextChoices):
+        OPENING = 'OPENING', 'opening balance'
+        FILL = 'FILL', 'fill'
+        TELEGRAM_FILL = 'TELEGRAM_FILL', 'telegram fill'
+        MOVIE = 'MOVIE', 'movie purchase'
+        SUBSCRIPTION = 'SUBSCRIPTION', 'subscription'
+        DONATION = 'DONATION', 'translation donation'
+
+    user = ForeignKey('User', related_name='ledger', on_delete=CASCADE)
+    amount = BigIntegerField()
+    kind = CharField(max_length=20, choices=Kind.choices)
+    reference = CharField(max_length=64, blank=True)
+    created_at = DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [Index(fields=['user', '-id'], name='ledger_user_id_idx')]
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding:
+            raise ValueError('Ledger entries are append-only')
+        super().save(*args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        raise ValueError('Ledger entries are append-only')
+
+    def __str__(self):
+        return f'{self.kind} {self.amount:+d} (user #{self.user_id})'
@@ -1,5 +1,17 @@
+import base64
+import binascii
+import hashlib
+import json
+
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.db import connections
+from django.db.models import Q
 from rest_framework import pagination
+from rest_framework.exceptions import NotFound
 from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
 
 
 class CustomPagination(pagination.PageNumberPagination):
@@ -15,3 +27,159 @@ class CustomPagination(pagination.PageNumberPagination):
             'count': self.page.paginator.count,
             'results': data
         })
+
+
+def _cursor_value(value):
+    # Not DjangoJSONEncoder: it truncates datetimes to milliseconds, and the
+    # cursor must round-trip the exact value we sort on.
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    return str(value)
+
+
+class KeysetPagination(pagination.BasePagination):
+    """
+    Cursor pagination keyed on one sort column plus `id`.
+
+    A page is a range scan `WHERE (column, id) < (last column, last id)` instead of
+    an OFFSET, so deep pages cost the same as the first one and rows inserted while
+    a client pages never shift or repeat items. The view's `ordering` attribute
+    ('-views', 'rate', ...) overrides the default sort column; it may name an
+    annotation as long as its values round-trip through JSON exactly.
+    """
+    page_size = 10
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    cursor_query_param = 'cursor'
+    ordering = '-created_at'
+    invalid_cursor_message = 'Invalid cursor'
+
+    base_url = None
+    next_position = None
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return min(page_size, self.max_page_size) if page_size > 0 else self.page_size
+
+    def get_ordering(self, view):
+        return getattr(view, 'ordering', None) or self.ordering
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.page_size = self.get_page_size(request)
+        cursor = request.query_params.get(self.cursor_query_param)
+        return self.paginate(queryset, self.get_ordering(view), cursor)
+
+    def paginate(self, queryset, ordering=None, cursor=None):
+        ordering = ordering or self.ordering
+        self.field = ordering.lstrip('-')
+        self.descending = ordering.startswith('-')
+
+        if self.descending:
+            queryset = queryset.order_by(f'-{self.field}', '-id')
+        else:
+            queryset = queryset.order_by(self.field, 'id')
+
+        if cursor:
+            queryset = queryset.filter(self.after(self.decode_cursor(cursor, queryset)))
+
+        page = list(queryset[:self.page_size + 1])
+        self.next_position = self.position(page[self.page_size - 1]) if len(page) > self.page_size else None
+        return page[:self.page_size]
+
+    def position(self, row):
+        if isinstance(row, dict):
+            return row[self.field], row['id']
+        return getattr(row, self.field), row.pk
+
+    def after(self, position):
+        value, pk = position
+        lookup = 'lt' if self.descending else 'gt'
+        return Q(**{f'{self.field}__{lookup}': value}) | Q(**{self.field: value, f'id__{lookup}': pk})
+
+    def encode_cursor(self, position):
+        raw = json.dumps(position, default=_cursor_value, separators=(',', ':'))
+        return base64.urlsafe_b64encode(raw.encode()).decode()
+
+    def decode_cursor(self, cursor, queryset):
+        # The sort column may be an annotation, e.g. the search rank.
+        annotation = queryset.query.annotations.get(self.field)
+        field = annotation.output_field if annotation is not None else queryset.model._meta.get_field(self.field)
+        try:
+            value, pk = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+            return field.to_python(value), int(pk)
+        except (binascii.Error, ValueError, TypeError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def get_next_link(self):
+        if self.next_position is None or self.base_url is None:
+            return None
+        return replace_query_param(self.base_url, self.cursor_query_param, self.encode_cursor(self.next_position))
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+
+class MovieCommentPagination(KeysetPagination):
+    page_size = 20
+
+
+def estimate_count(queryset, timeout=60):
+    """
+    Row count without a full `COUNT(*)` on every page.
+
+    PostgreSQL answers from the planner's row estimate; other databases pay for
+    an exact count once and reuse it for `timeout` seconds.
+    """
+    sql, params = queryset.order_by().query.sql_with_params()
+    connection = connections[queryset.db]
+
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+            plan = cursor.fetchone()[0]
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return int(plan[0]['Plan']['Plan Rows'])
+
+    key = 'count:' + hashlib.md5(f'{sql}{params}'.encode()).hexdigest()
+    return cache.get_or_set(key, queryset.count, timeout)
+
+
+class CatalogPagination(KeysetPagination):
+    """Keyset pagination for the movie catalog lists, with an approximate total."""
+    page_size = api_settings.PAGE_SIZE
+    count = None
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.count = estimate_count(queryset)
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'count': self.count,
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        response_schema = super().get_paginated_response_schema(schema)
+        response_schema['properties']['count'] = {'type': 'integer', 'example': 123}
+        return response_schema
@@ -0,0 +1,135 @@
+import io
+import os
+
+from django.apps import apps
+from django.db import transaction
+from django.utils import timezone
+from PIL import Image, ImageOps
+from rest_framework.fields import Field
+
+from app import response_cache
+
+RENDITION_WIDTHS = (160, 320, 640)
+RENDITION_FORMATS = {
+    'webp': ('WEBP', 'webp', {'quality': 80, 'method': 4}),
+    'jpeg': ('JPEG', 'jpg', {'quality': 82, 'optimize': True, 'progressive': True}),
+}
+
+# model label -> (uploaded file field, JSON field holding the rendition names).
+# Only models whose images some serializer renders through RenditionsField belong here.
+RENDITION_FIELDS = {
+    'app.movie': ('picture', 'picture_renditions'),
+}
+# model label -> response cache tag whose cached lists embed the renditions
+RENDITION_CACHE_TAGS = {'app.movie': 'movie'}
+
+
+def rendition_name(name, width, fmt):
+    """Deterministic storage name: media/foo/bar.png -> renditions/foo/bar/320.webp."""
+    stem = os.path.splitext(name)[0]
+    return f'renditions/{stem}/{width}.{RENDITION_FORMATS[fmt][1]}'
+
+
+def storage_for(label):
+    model = apps.get_model(label)
+    return model._meta.get_field(RENDITION_FIELDS[label][0]).storage
+
+
+def render_width(label, name, width):
+    """
+    Write every format of one width for the original `name`; existing files are kept.
+    Returns {format: rendition name}. Safe to run in worker processes: it only
+    touches storage, never the database.
+    """
+    storage = storage_for(label)
+    targets = {fmt: rendition_name(name, width, fmt) for fmt in RENDITION_FORMATS}
+    missing = {fmt: target for fmt, target in targets.items() if not storage.exists(target)}
+    if not missing:
+        return targets
+
+    with storage.open(name, 'rb') as original:
+        image = ImageOps.exif_transpose(Image.open(original))
+        image.load()
+    if image.width > width:
+        image = image.resize((width, round(image.height * width / image.width)), Image.Resampling.LANCZOS)
+
+    has_alpha = image.mode in ('RGBA', 'LA', 'PA') or 'transparency' in image.info
+    for fmt, target in missing.items():
+        pil_format, _, options = RENDITION_FORMATS[fmt]
+        if pil_format == 'JPEG':
+            frame = _flatten(image.convert('RGBA')) if has_alpha else image.convert('RGB')
+        else:
+            frame = image.convert('RGBA' if has_alpha else 'RGB')
+
+        buffer = io.BytesIO()
+        frame.save(buffer, pil_format, **options)
+        buffer.seek(0)
+        storage.save(target, buffer)
+    return targets
+
+
+def _flatten(image):
+    background = Image.new('RGB', image.size, (255, 255, 255))
+    background.paste(image, mask=image.getchannel('A'))
+    return background
+
+
+def store_renditions(label, pk, name, results):
+    """
+    Record finished renditions unless the file was replaced in the meantime.
+    The row's `updated_at` moves with them, so ETags built from it change,
+    and cached lists showing the row are invalidated once this commits.
+    """
+    file_field, renditions_field = RENDITION_FIELDS[label]
+    renditions = {'source': name}
+    for width, targets in results:
+        for fmt, target in targets.items():
+            renditions.setdefault(fmt, {})[str(width)] = target
+
+    model = apps.get_model(label)
+    changes = {renditions_field: renditions}
+    if any(field.name == 'updated_at' for field in model._meta.concrete_fields):
+        changes['updated_at'] = timezone.now()
+    with transaction.atomic():
+        updated = model.objects.filter(pk=pk, **{file_field: name}).update(**changes)
+        if updated and label in RENDITION_CACHE_TAGS:
+            transaction.on_commit(lambda: response_cache.bump_tags(RENDITION_CACHE_TAGS[label]))
+    return renditions
+
+
+def needs_renditions(instance):
+    file_field, renditions_field = RENDITION_FIELDS[instance._meta.label_lower]
+    name = getattr(instance, file_field).name
+    # A field default is a shared placeholder, not an upload, and may not be in storage.
+    if not name or name == instance._meta.get_field(file_field).default:
+        return False
+    return (getattr(instance, renditions_field) or {}).get('source') != name
+
+
+class RenditionsField(Field):
+    """
+    Read-only `{format: {width: url}}` map built from a renditions JSON column.
+    Empty until the rendition task for the current upload has finished.
+    """
+
+    def __init__(self, file_field, **kwargs):
+        kwargs['read_only'] = True
+        self.file_field = file_field
+        super().__init__(**kwargs)
+
+    def render(self, renditions, storage, build_url=None):
+        variants = {}
+        for fmt, names in (renditions or {}).items():
+            if fmt in RENDITION_FORMATS:
+                variants[fmt] = {
+                    width: build_url(storage.url(name)) if build_url else storage.url(name)
+                    for width, name in names.items()
+                }
+        return variants
+
+    def get_storage(self):
+        return self.parent.Meta.model._meta.get_field(self.file_field).storage
+
+    def to_representation(self, value):
+        request = self.context.get('request')
+        return self.render(value, self.get_storage(), request.build_absolute_uri if request is not None else None)
@@ -0,0 +1,103 @@
+import hashlib
+import logging
+import random
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.cache import patch_vary_headers
+from django_redis import get_redis_connection
+from redis.exceptions import RedisError
+from rest_framework.response import Response
+
+logger = logging.getLogger(__name__)
+
+TAG_VERSION_KEY = 'response:tag:{}'
+STATS_KEY = 'response:stats'
+
+
+def bump_tags(*tags):
+    """
+    Invalidate every cached response that depends on one of `tags`. Called
+    after commit, so a Redis error is logged, not raised.
+    """
+    try:
+        pipe = get_redis_connection('default').pipeline(transaction=False)
+        for tag in tags:
+            pipe.incr(TAG_VERSION_KEY.format(tag))
+        pipe.execute()
+    except RedisError:
+        logger.error('Could not bump response cache tags %s; cached responses may be stale until they expire',
+                     tags, exc_info=True)
+
+
+def tag_versions(tags):
+    versions = get_redis_connection('default').mget([TAG_VERSION_KEY.format(tag) for tag in tags])
+    return [int(version or 0) for version in versions]
+
+
+def record_lookup(view_name, hit):
+    """
+    Count a lookup for RESPONSE_CACHE_STATS_SAMPLE_RATE of requests, weighted so
+    the counters still estimate totals; 0 turns the extra Redis write off.
+    """
+    rate = settings.RESPONSE_CACHE_STATS_SAMPLE_RATE
+    if rate <= 0 or random.random() >= rate:
+        return
+    get_redis_connection('default').hincrby(STATS_KEY, f'{view_name}:{"hit" if hit else "miss"}', round(1 / rate))
+
+
+def cache_stats():
+    """Hits, misses and hit ratio per cached view, from the shared counters."""
+    stats = {}
+    for field, count in get_redis_connection('default').hgetall(STATS_KEY).items():
+        view_name, _, kind = field.decode().rpartition(':')
+        stats.setdefault(view_name, {'hit': 0, 'miss': 0})[kind] = int(count)
+    for counts in stats.values():
+        total = counts['hit'] + counts['miss']
+        counts['ratio'] = counts['hit'] / total if total else 0.0
+    return stats
+
+
+def reset_stats():
+    get_redis_connection('default').delete(STATS_KEY)
+
+
+class CachedResponseMixin:
+    """
+    Cache anonymous list responses until one of `cache_tags` changes.
+
+    The key is the absolute URL (path, query, cursor and page size included)
+    plus the current version of every tag, so bumping a tag makes the old
+    entries unreachable and they expire after `cache_timeout`. Authenticated
+    requests always bypass the cache, so nothing personalised is ever stored
+    or served to someone else.
+    """
+    cache_tags = ('movie',)
+    cache_timeout = 300
+
+    def get_cache_key(self, request):
+        versions = '.'.join(map(str, tag_versions(self.cache_tags)))
+        url = hashlib.md5(request.build_absolute_uri().encode()).hexdigest()
+        return f'response:{type(self).__name__}:{url}:{versions}'
+
+    def list(self, request, *args, **kwargs):
+        if not settings.RESPONSE_CACHE_ENABLED or request.user.is_authenticated or request.auth is not None:
+            response = super().list(request, *args, **kwargs)
+            return self.mark_response(response, 'BYPASS')
+
+        view_name = type(self).__name__
+        key = self.get_cache_key(request)
+        data = cache.get(key)
+        record_lookup(view_name, data is not None)
+        if data is not None:
+            return self.mark_response(Response(data), 'HIT')
+
+        response = super().list(request, *args, **kwargs)
+        if response.status_code == 200:
+            cache.set(key, response.data, self.cache_timeout)
+        return self.mark_response(response, 'MISS')
+
+    def mark_response(self, response, status):
+        response['X-Cache'] = status
+        patch_vary_headers(response, ['Authorization'])
+        return response
@@ -0,0 +1,159 @@
+import logging
+import random
+
+from django_redis import get_redis_connection
+from redis.exceptions import RedisError, WatchError
+
+from app.models.movie import Movie
+
+logger = logging.getLogger(__name__)
+
+POOL_KEY = 'movie:pool:{}'
+READY_POOLS_KEY = 'movie:pool:ready'
+# Bumped by every pool write; a rebuild only swaps in its snapshot if it did not move meanwhile.
+POOL_VERSION_KEY = 'movie:pool:version'
+POOL_BUILD_ATTEMPTS = 3
+
+
+def _pool_filter(name):
+    kind, _, value = name.partition(':')
+    if kind == 'genre':
+        return {'genre': int(value)}
+    if kind == 'access':
+        return {'access_type': value}
+    if kind == 'premier':
+        return {'is_premier': True}
+    return {}
+
+
+def pool_names(genre=None, access_type=None, premier=False):
+    names = []
+    if genre is not None:
+        names.append(f'genre:{genre}')
+    if access_type:
+        names.append(f'access:{access_type}')
+    if premier:
+        names.append('premier')
+    return names or ['all']
+
+
+def _build_pool(redis, name):
+    """
+    Load one pool from the database and swap it in atomically. Returns False
+    if it could not be installed.
+
+    POOL_VERSION_KEY is WATCHed before the read: writers bump it after their
+    commit, so a change the read may have missed aborts the swap, and the
+    read is redone instead of overwriting that change with a stale snapshot.
+    """
+    key = POOL_KEY.format(name)
+    tmp_key = POOL_KEY.format(f'{name}:building')
+    movies = Movie.objects.filter(**_pool_filter(name)).order_by()
+
+    for _ in range(POOL_BUILD_ATTEMPTS):
+        with redis.pipeline() as pipe:
+            pipe.watch(POOL_VERSION_KEY)
+            ids = list(movies.values_list('id', flat=True))
+            pipe.multi()
+            pipe.delete(tmp_key)
+            for start in range(0, len(ids), 10000):
+                pipe.sadd(tmp_key, *ids[start:start + 10000])
+            if ids:
+                pipe.rename(tmp_key, key)
+            else:
+                pipe.delete(key)
+            pipe.sadd(READY_POOLS_KEY, name)
+            try:
+                pipe.execute()
+                return True
+            except WatchError:
+                continue
+    return False
+
+
+def sample_movie_ids(k, genre=None, access_type=None, premier=False):
+    """
+    Draw up to `k` distinct random movie ids.
+
+    A single filter is one SRANDMEMBER on its pool, O(k). Combined filters
+    intersect their pools first, which is linear in the smallest pool.
+    """
+    redis = get_redis_connection('default')
+    names = pool_names(genre, access_type, premier)
+
+    missing = [name for name, ready in zip(names, redis.smismember(READY_POOLS_KEY, names)) if not ready]
+    if not all([_build_pool(redis, name) for name in missing]):
+        # Still racing with writes: answer from the database and let the next request build again.
+        filters = {}
+        for name in names:
+            filters.update(_pool_filter(name))
+        return list(Movie.objects.filter(**filters).order_by('?').values_list('id', flat=True)[:k])
+
+    keys = [POOL_KEY.format(name) for name in names]
+    if len(keys) == 1:
+        # SRANDMEMBER picks members at random but does not promise a random reply order.
+        ids = redis.srandmember(keys[0], k)
+        random.shuffle(ids)
+    else:
+        ids = list(redis.sinter(keys))
+        ids = random.sample(ids, min(k, len(ids)))
+    return [int(movie_id) for movie_id in ids]
+
+
+def _update_pools(update):
+    """
+    Run `update(pipe)` against the pools. Writers call this after their commit,
+    so a Redis error is logged, not raised, and every pool is marked for a
+    rebuild so the missed change is not lost.
+    """
+    try:
+        pipe = get_redis_connection('default').pipeline()
+        update(pipe)
+        pipe.incr(POOL_VERSION_KEY)
+        pipe.execute()
+    except RedisError:
+        logger.warning('Could not update random movie pools, rebuilding them', exc_info=True)
+        try:
+            reset_pools()
+        except RedisError:
+            logger.error('Could not reset random movie pools; they may be stale', exc_info=True)
+
+
+def add_movie(movie):
+    """Put a saved movie into the pools of its current access type and premier flag."""
+    def update(pipe):
+        pipe.sadd(POOL_KEY.format('all'), movie.id)
+        for access_type in Movie.AccessType.values:
+            pipe.srem(POOL_KEY.format(f'access:{access_type}'), movie.id)
+        pipe.sadd(POOL_KEY.format(f'access:{movie.access_type}'), movie.id)
+        if movie.is_premier:
+            pipe.sadd(POOL_KEY.format('premier'), movie.id)
+        else:
+            pipe.srem(POOL_KEY.format('premier'), movie.id)
+    _update_pools(update)
+
+
+def set_movie_genres(movie_ids, genre_ids, present):
+    def update(pipe):
+        for genre_id in genre_ids:
+            key = POOL_KEY.format(f'genre:{genre_id}')
+            if present:
+                pipe.sadd(key, *movie_ids)
+            else:
+                pipe.srem(key, *movie_ids)
+    _update_pools(update)
+
+
+def remove_movie(movie_id, genre_ids=()):
+    names = ['all', 'premier'] + [f'access:{value}' for value in Movie.AccessType.values]
+    names += [f'genre:{genre_id}' for genre_id in genre_ids]
+
+    def update(pipe):
+        for name in names:
+            pipe.srem(POOL_KEY.format(name), movie_id)
+    _update_pools(update)
+
+
+def reset_pools():
+    """Forget every pool so each is rebuilt from the database on next use."""
+    get_redis_connection('default').delete(READY_POOLS_KEY)
@@ -0,0 +1,181 @@
+from django.contrib.postgres.search import SearchQuery, SearchRank, TrigramSimilarity
+from django.db import connections
+from django.db.models import Q, F, Case, When, Value, FloatField
+from django.db.models.functions import Cast
+
+from app.models.movie import Movie, Genre, MovieCast, CastMembers
+
+SEARCH_CONFIG = 'simple'
+
+SEARCH_INDEXES = {
+    'movie_search_vector_idx': 'CREATE INDEX IF NOT EXISTS movie_search_vector_idx ON {movie} USING gin (search_vector)',
+    'movie_title_trgm_idx': 'CREATE INDEX IF NOT EXISTS movie_title_trgm_idx ON {movie} USING gin (title gin_trgm_ops)',
+}
+
+SEARCH_TRIGGERS = ('movie_search_vector_update', 'movie_genre_search_vector_update',
+                   'genre_search_vector_update', 'castmembers_search_vector_update')
+
+# Title, genre names, cast names and description, weighted A to D. The movie row
+# recomputes its own vector on write; rows it depends on refresh it through the
+# other triggers.
+INSTALL_SQL = """
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+CREATE OR REPLACE FUNCTION movie_search_document(p_movie_id bigint, p_title text, p_description text)
+RETURNS tsvector LANGUAGE sql STABLE AS $$
+    SELECT setweight(to_tsvector('{config}', coalesce(p_title, '')), 'A')
+        || setweight(to_tsvector('{config}', coalesce((
+               SELECT string_agg(g.name, ' ') FROM {movie_genre} mg
+               JOIN {genre} g ON g.id = mg.genre_id WHERE mg.movie_id = p_movie_id), '')), 'B')
+        || setweight(to_tsvector('{config}', coalesce((
+               SELECT string_agg(cm.name, ' ') FROM {moviecast} mc
+               JOIN {castmembers} cm ON cm.movie_cast_id = mc.id WHERE mc.movie_id = p_movie_id), '')), 'C')
+        || setweight(to_tsvector('{config}', coalesce(p_description, '')), 'D')
+$$;
+
+CREATE OR REPLACE FUNCTION movie_search_vector_trigger() RETURNS trigger LANGUAGE plpgsql AS $$
+BEGIN
+    NEW.search_vector := movie_search_document(NEW.id, NEW.title, NEW.description);
+    RETURN NEW;
+END $$;
+
+CREATE OR REPLACE FUNCTION movie_genre_search_vector_trigger() RETURNS trigger LANGUAGE plpgsql AS $$
+DECLARE
+    target bigint;
+BEGIN
+    IF TG_OP = 'DELETE' THEN target := OLD.movie_id; ELSE target := NEW.movie_id; END IF;
+    UPDATE {movie} SET search_vector = movie_search_document(id, title, description) WHERE id = target;
+    RETURN NULL;
+END $$;
+
+CREATE OR REPLACE FUNCTION genre_search_vector_trigger() RETURNS trigger LANGUAGE plpgsql AS $$
+BEGIN
+    UPDATE {movie} SET search_vector = movie_search_document(id, title, description)
+    WHERE id IN (SELECT movie_id FROM {movie_genre} WHERE genre_id = NEW.id);
+    RETURN NULL;
+END $$;
+
+CREATE OR REPLACE FUNCTION castmembers_search_vector_trigger() RETURNS trigger LANGUAGE plpgsql AS $$
+DECLARE
+    target bigint;
+BEGIN
+    IF TG_OP = 'DELETE' THEN target := OLD.movie_cast_id; ELSE target := NEW.movie_cast_id; END IF;
+    UPDATE {movie} SET search_vector = movie_search_document(id, title, description)
+    WHERE id = (SELECT movie_id FROM {moviecast} WHERE id = target);
+    RETURN NULL;
+END $$;
+
+DROP TRIGGER IF EXISTS movie_search_vector_update ON {movie};
+CREATE TRIGGER movie_search_vector_update BEFORE INSERT OR UPDATE OF title, description ON {movie}
+    FOR EACH ROW EXECUTE FUNCTION movie_search_vector_trigger();
+
+DROP TRIGGER IF EXISTS movie_genre_search_vector_update ON {movie_genre};
+CREATE TRIGGER movie_genre_search_vector_update AFTER INSERT OR DELETE ON {movie_genre}
+    FOR EACH ROW EXECUTE FUNCTION movie_genre_search_vector_trigger();
+
+DROP TRIGGER IF EXISTS genre_search_vector_update ON {genre};
+CREATE TRIGGER genre_search_vector_update AFTER UPDATE OF name ON {genre}
+    FOR EACH ROW EXECUTE FUNCTION genre_search_vector_trigger();
+
+DROP TRIGGER IF EXISTS castmembers_search_vector_update ON {castmembers};
+CREATE TRIGGER castmembers_search_vector_update AFTER INSERT OR UPDATE OR DELETE ON {castmembers}
+    FOR EACH ROW EXECUTE FUNCTION castmembers_search_vector_trigger();
+"""
+
+REFRESH_SQL = 'UPDATE {movie} SET search_vector = movie_search_document(id, title, description)'
+
+
+def _tables():
+    return {
+        'config': SEARCH_CONFIG,
+        'movie': Movie._meta.db_table,
+        'movie_genre': Movie.genre.through._meta.db_table,
+        'genre': Genre._meta.db_table,
+        'moviecast': MovieCast._meta.db_table,
+        'castmembers': CastMembers._meta.db_table,
+    }
+
+
+def supports_full_text(connection):
+    return connection.vendor == 'postgresql'
+
+
+def install_search_index(connection, refresh=True):
+    """Create the trigram extension, search triggers and GIN indexes. PostgreSQL only."""
+    if not supports_full_text(connection):
+        return False
+
+    tables = _tables()
+    with connection.cursor() as cursor:
+        cursor.execute(INSTALL_SQL.format(**tables))
+        for sql in SEARCH_INDEXES.values():
+            cursor.execute(sql.format(**tables))
+        if refresh:
+            cursor.execute(REFRESH_SQL.format(**tables))
+    return True
+
+
+def verify_search_index(connection):
+    """Return a list of problems with the search setup, empty when everything is in place."""
+    if not supports_full_text(connection):
+        return []
+
+    tables = _tables()
+    problems = []
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")
+        if cursor.fetchone() is None:
+            problems.append('extension pg_trgm is not installed')
+
+        cursor.execute('SELECT indexname FROM pg_indexes WHERE tablename = %s', [tables['movie']])
+        existing = {row[0] for row in cursor.fetchall()}
+        problems += [f'index {name} is missing' for name in SEARCH_INDEXES if name not in existing]
+
+        cursor.execute('SELECT tgname FROM pg_trigger WHERE NOT tgisinternal')
+        existing = {row[0] for row in cursor.fetchall()}
+        problems += [f'trigger {name} is missing' for name in SEARCH_TRIGGERS if name not in existing]
+
+        cursor.execute(f"SELECT count(*) FROM {tables['movie']} WHERE search_vector IS NULL")
+        stale = cursor.fetchone()[0]
+        if stale:
+            problems.append(f'{stale} movies have no search vector')
+    return problems
+
+
+def search_movies(queryset, query):
+    """
+    Filter `queryset` to movies matching `query`, annotated with `rank` and ordered best first.
+
+    PostgreSQL matches the weighted tsvector or trigram similarity on the title,
+    both served by GIN indexes. Other databases fall back to case-insensitive
+    substring matching so the endpoint still works in local setups.
+    """
+    query = query.strip()
+
+    if supports_full_text(connections[queryset.db]):
+        search_query = SearchQuery(query, config=SEARCH_CONFIG, search_type='websearch')
+        return (
+            queryset
+            .filter(Q(search_vector=search_query) | Q(title__trigram_similar=query))
+            # float8, not the real both functions return: keyset cursors compare the rank for equality,
+            # and a real does not survive the trip through a Python float.
+            .annotate(rank=Cast(SearchRank(F('search_vector'), search_query) + TrigramSimilarity('title', query),
+                                FloatField()))
+            .order_by('-rank', '-id')
+        )
+
+    related = Movie.objects.filter(
+        Q(genre__name__icontains=query) | Q(cast__members__name__icontains=query)
+    ).values('id')
+    return (
+        queryset
+        .filter(Q(title__icontains=query) | Q(description__icontains=query) | Q(id__in=related))
+        .annotate(rank=Case(
+            When(title__iexact=query, then=Value(4.0)),
+            When(title__istartswith=query, then=Value(3.0)),
+            When(title__icontains=query, then=Value(2.0)),
+            default=Value(1.0),
+            output_field=FloatField(),
+        ))
+        .order_by('-rank', '-id')
+    )
@@ -0,0 +1,147 @@
+import json
+from datetime import datetime, timezone as dt_timezone
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from django_redis import get_redis_connection
+
+from app.models.movie import LastSearch
+from app.utils import redis_lock
+
+SEARCH_EVENTS_KEY = 'search:history:queue'
+# Events being persisted; they leave Redis only once the database write committed.
+SEARCH_EVENTS_PROCESSING_KEY = 'search:history:processing'
+DRAIN_LOCK_KEY = 'search:history:drain-lock'
+DRAIN_LOCK_TIMEOUT = 5 * 60
+USER_HISTORY_KEY = 'search:history:user:{}'
+USER_HISTORY_LOADED_KEY = 'search:history:user:{}:loaded'
+USER_HISTORY_TTL = 7 * 24 * 60 * 60
+
+SEARCH_MAX_LENGTH = LastSearch._meta.get_field('search').max_length
+
+
+def _clean(query):
+    return ' '.join(query.split())[:SEARCH_MAX_LENGTH]
+
+
+def record_search(user_id, query):
+    """
+    Remember a search without touching the database.
+
+    The per-user sorted set (score = timestamp) collapses repeats and is capped
+    at SEARCH_HISTORY_LIMIT; the queued event is persisted later by
+    `drain_search_events`.
+    """
+    query = _clean(query)
+    if not query:
+        return
+
+    now = timezone.now()
+    key = USER_HISTORY_KEY.format(user_id)
+    pipe = get_redis_connection('default').pipeline(transaction=False)
+    pipe.rpush(SEARCH_EVENTS_KEY, json.dumps({'user': user_id, 'search': query, 'created_at': now.isoformat()}))
+    pipe.zadd(key, {query: now.timestamp()})
+    pipe.zremrangebyrank(key, 0, -settings.SEARCH_HISTORY_LIMIT - 1)
+    pipe.expire(key, USER_HISTORY_TTL)
+    pipe.execute()
+
+
+def recent_searches(user_id):
+    """The user's latest distinct searches, newest first, loading older ones from the database once."""
+    redis = get_redis_connection('default')
+    key = USER_HISTORY_KEY.format(user_id)
+    loaded_key = USER_HISTORY_LOADED_KEY.format(user_id)
+    limit = settings.SEARCH_HISTORY_LIMIT
+
+    if not redis.exists(loaded_key):
+        rows = (
+            LastSearch.objects.filter(user_id=user_id)
+            .order_by('-created_at', '-id').values_list('search', 'created_at')[:limit]
+        )
+        pipe = redis.pipeline()
+        history = {search: created_at.timestamp() for search, created_at in reversed(rows)}
+        if history:
+            pipe.zadd(key, history, nx=True)
+        pipe.zremrangebyrank(key, 0, -limit - 1)
+        pipe.expire(key, USER_HISTORY_TTL)
+        pipe.set(loaded_key, 1, ex=USER_HISTORY_TTL)
+        pipe.execute()
+
+    return [
+        {'user': user_id, 'search': search.decode(), 'created_at': datetime.fromtimestamp(score, dt_timezone.utc)}
+        for search, score in redis.zrevrange(key, 0, limit - 1, withscores=True)
+    ]
+
+
+def _claim_events(redis, batch_size):
+    """
+    The batch to persist: whatever an earlier, failed run left in the
+    processing list, else up to `batch_size` events moved there from the
+    queue in one transaction.
+    """
+    events = redis.lrange(SEARCH_EVENTS_PROCESSING_KEY, 0, -1)
+    if events:
+        return events
+    count = min(redis.llen(SEARCH_EVENTS_KEY), batch_size)
+    if not count:
+        return []
+    pipe = redis.pipeline(transaction=True)
+    for _ in range(count):
+        pipe.lmove(SEARCH_EVENTS_KEY, SEARCH_EVENTS_PROCESSING_KEY, 'LEFT', 'RIGHT')
+    return [event for event in pipe.execute() if event is not None]
+
+
+def drain_search_events(batch_size=1000):
+    """
+    Persist queued search events with one bulk insert.
+
+    Repeats of the same (user, search) collapse to the newest event and replace
+    the stored row, and each touched user is trimmed back to
+    SEARCH_HISTORY_LIMIT rows. Events are moved to a processing list first and
+    dropped from it only after the write commits, so a failed write is retried
+    by the next run; replaying a batch is harmless because repeats replace
+    their rows. One drain runs at a time.
+    """
+    redis = get_redis_connection('default')
+    with redis_lock(DRAIN_LOCK_KEY, DRAIN_LOCK_TIMEOUT) as acquired:
+        if not acquired:
+            return 0
+        events = _claim_events(redis, batch_size)
+        if not events:
+            return 0
+
+        latest = {}
+        for event in map(json.loads, events):
+            latest[(event['user'], event['search'])] = datetime.fromisoformat(event['created_at'])
+
+        by_user = {}
+        for user_id, search in latest:
+            by_user.setdefault(user_id, []).append(search)
+
+        duplicates = Q()
+        for user_id, searches in by_user.items():
+            duplicates |= Q(user_id=user_id, search__in=searches)
+
+        limit = settings.SEARCH_HISTORY_LIMIT
+        with transaction.atomic():
+            LastSearch.objects.filter(duplicates).delete()
+            rows = LastSearch.objects.bulk_create([
+                LastSearch(user_id=user_id, search=search)
+                for (user_id, search), _ in sorted(latest.items(), key=lambda item: item[1])
+            ])
+            # auto_now_add stamps the insert time; keep when each search actually happened.
+            for row in rows:
+                row.created_at = latest[(row.user_id, row.search)]
+            LastSearch.objects.bulk_update(rows, ['created_at'], batch_size=batch_size)
+            for user_id in by_user:
+                overflow = list(
+                    LastSearch.objects.filter(user_id=user_id)
+                    .order_by('-created_at', '-id').values_list('id', flat=True)[limit:]
+                )
+                if overflow:
+                    LastSearch.objects.filter(id__in=overflow).delete()
+
+        redis.delete(SEARCH_EVENTS_PROCESSING_KEY)
+        return len(latest)
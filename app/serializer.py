@@ -1,16 +1,24 @@
+from datetime import timedelta
+
 from django.contrib.auth.hashers import check_password
 from django.db.models import Q, PositiveIntegerField
+from django.urls import reverse, NoReverseMatch
+from django.utils.duration import duration_string
 from rest_framework.exceptions import ValidationError
-from rest_framework.fields import SerializerMethodField, CharField, EmailField
+from rest_framework.fields import SerializerMethodField, CharField, EmailField, DateTimeField
 from rest_framework.generics import CreateAPIView
 from rest_framework.serializers import ModelSerializer, IntegerField, Serializer
 
 from app.models.orders import Purchase, PurchaseMovie, Notification, Payment, OrderSubscription, \
     PaymentSubscription, OrderSubscriptionItem, PaymentTranslateMovie
 from app.models.movie import Movie, Category, CastMembers, Genre, MovieCast, Subscribers, LastSearch, \
-    SubscriptionItems, MovieComment, Message, AdminAnswer, News, FavouriteMovies, TranslateMovies
+    SubscriptionItems, MovieComment, Message, AdminAnswer, News, FavouriteMovies, TranslateMovies, Season, Episode
 
 from app.models.users import User
+from app.pagination import MovieCommentPagination
+from app.counters import collected_money_totals
+from app.renditions import RenditionsField
+from app.signed_media import SignedFileField
 
 
 
@@ -29,13 +37,22 @@ class CommentModelSerializer(ModelSerializer):
 
 
 
+class MovieCommentListModelSerializer(CommentModelSerializer):
+    username = CharField(source='user.username', read_only=True)
+
+    class Meta(CommentModelSerializer.Meta):
+        fields = ['id', 'movie', 'user', 'username', 'comment', 'created_at']
+
+
+
 class MovieModelSerializer(ModelSerializer):
 
-    total_comments = IntegerField(read_only=True)
+    total_comments = IntegerField(source='comment_count', read_only=True)
+    picture_variants = RenditionsField('picture', source='picture_renditions')
 
     class Meta:
         model = Movie
-        fields = ['id', 'picture', 'title', 'slug', 'views', 'rate', 'total_comments']
+        fields = ['id', 'picture', 'picture_variants', 'title', 'slug', 'views', 'rate', 'total_comments']
 
 
 
@@ -43,31 +60,69 @@ class MovieDetailModelSerializer(ModelSerializer):
     genre = GenreModelSerializer(many=True, read_only=True)
     similar_movies = SerializerMethodField()
     movie_comment = SerializerMethodField()
+    picture_variants = RenditionsField('picture', source='picture_renditions')
+    video = SignedFileField(read_only=True)
 
 
     class Meta:
         model = Movie
-        fields = ['id', 'picture', 'title', 'genre', 'country', 'release_date',
+        fields = ['id', 'picture', 'picture_variants', 'title', 'genre', 'country', 'release_date',
                   'language', 'duration', 'trailer_url', 'video', 'similar_movies', 'subscribe',
                   'movie_comment', 'views']
 
     def get_similar_movies(self, obj):
-        queryset = Movie.objects.exclude(id=obj.id)
-        genre_ids = obj.genre.values_list('id', flat=True)
-        genre_matches = queryset.filter(genre__in=genre_ids)
-
-        title_matches = queryset.filter(title__icontains=obj.title.split()[0])
-
-        similar = (genre_matches | title_matches).distinct()[:5]
+        similar = Movie.objects.filter(neighbour_of__movie=obj).order_by('neighbour_of__rank')
         return MovieModelSerializer(similar, many=True).data
 
 
     def get_movie_comment(self, obj):
-        queryset = MovieComment.objects.filter(movie=obj.id)
+        request = self.context.get('request')
+        paginator = MovieCommentPagination()
+        page = paginator.paginate(MovieComment.objects.filter(movie=obj.id).select_related('user'))
+
+        try:
+            paginator.base_url = reverse('movie-comments', kwargs={'slug': obj.slug})
+        except NoReverseMatch:
+            paginator.base_url = None
+        if request is not None and paginator.base_url:
+            paginator.base_url = request.build_absolute_uri(paginator.base_url)
+
+        return {
+            'next': paginator.get_next_link(),
+            'results': MovieCommentListModelSerializer(page, many=True).data,
+        }
+
+
+
+
+class EpisodeModelSerializer(ModelSerializer):
+    class Meta:
+        model = Episode
+        fields = ['id', 'title', 'duration']
 
-        return CommentModelSerializer(queryset, many=True).data
 
 
+class SeasonModelSerializer(ModelSerializer):
+    episodes = EpisodeModelSerializer(many=True, read_only=True)
+    runtime = SerializerMethodField()
+
+    class Meta:
+        model = Season
+        fields = ['id', 'season_number', 'runtime', 'episodes']
+
+    def get_runtime(self, obj):
+        return duration_string(sum((episode.duration for episode in obj.episodes.all()), timedelta()))
+
+
+
+class EpisodeDetailModelSerializer(ModelSerializer):
+    season_number = IntegerField(source='season.season_number', read_only=True)
+    video = SignedFileField(read_only=True)
+
+    class Meta:
+        model = Episode
+        fields = ['id', 'season_number', 'title', 'duration', 'video']
+
 
 
 class SubscriptionVariantsModelSerializer(ModelSerializer):
@@ -170,8 +225,9 @@ class UserFillBalanceWithTelegramModelSerializer(Serializer):
     amount = IntegerField(required=True)
 
     def validate_amount(self, value):
-        if value > 10000000 or value < 0:
-            raise ValidationError('invalid amount (amount must not negative and > 10000000)')
+        if value > 10000000 or value <= 0:
+            raise ValidationError('invalid amount (amount must be positive and not > 10000000)')
+        return value
 
 
 class UserCheckBalanceModelSerializer(ModelSerializer):
@@ -318,27 +374,36 @@ class FavouritesMoviesModelSerializer(ModelSerializer):
 
 
 class TranslateMovieDetailModelSerializer(ModelSerializer):
+    picture_variants = RenditionsField('picture', source='picture_renditions')
+
     class Meta:
         model = Movie
-        fields = ['id', 'picture', 'title', 'description']
+        fields = ['id', 'picture', 'picture_variants', 'title', 'description']
 
 
 class TranslateMovieModelSerializer(ModelSerializer):
 
     movie = TranslateMovieDetailModelSerializer(read_only=True, many=False)
+    collected_money = SerializerMethodField()
     left = SerializerMethodField()
 
     class Meta:
         model = TranslateMovies
         fields = ['id', 'movie', 'movie_fund', 'collected_money', 'left', 'is_finish', 'created_at']
 
+    def get_collected_money(self, obj):
+        totals = self.context.get('collected_money')
+        if totals is None or obj.id not in totals:
+            totals = collected_money_totals([obj.id])
+        return totals[obj.id]
 
     def get_left(self, obj):
-        return obj.left
+        return max(obj.movie_fund - self.get_collected_money(obj), 0)
 
 
 class PaymentTranslateMovieModelSerializer(ModelSerializer):
     telegram_id = CharField(write_only=True)
+    amount = IntegerField(min_value=1)
 
     class Meta:
         model = PaymentTranslateMovie
@@ -350,10 +415,10 @@ class PaymentTranslateMovieModelSerializer(ModelSerializer):
         return PaymentTranslateMovie.objects.create(**validated_data)
 
 
-class UserSearchModelSerializer(ModelSerializer):
-    class Meta:
-        model = LastSearch
-        fields = ['id', 'user', 'search', 'created_at']
+class UserSearchSerializer(Serializer):
+    user = IntegerField(read_only=True)
+    search = CharField(read_only=True)
+    created_at = DateTimeField(read_only=True)
 
 
 
@@ -0,0 +1,46 @@
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Prefetch
+from django.utils.duration import duration_string
+from django_redis.exceptions import ConnectionInterrupted
+
+from app.models.movie import Season, Episode
+from app.serializer import SeasonModelSerializer
+
+SERIES_TREE_KEY = 'series:tree:{}'
+
+logger = logging.getLogger(__name__)
+
+
+def build_tree(movie_id):
+    """
+    Seasons with their episodes in two queries (seasons, then one prefetch for
+    every episode). Runtimes are summed from the prefetched rows.
+    """
+    seasons = Season.objects.filter(movie_id=movie_id).order_by('season_number').prefetch_related(
+        Prefetch('episodes', queryset=Episode.objects.order_by('id').only('id', 'season_id', 'title', 'duration')),
+    )
+    data = SeasonModelSerializer(seasons, many=True).data
+    runtime = sum((episode.duration for season in seasons for episode in season.episodes.all()), timedelta())
+    return {'runtime': duration_string(runtime), 'seasons': data}
+
+
+def season_tree(movie_id):
+    key = SERIES_TREE_KEY.format(movie_id)
+    tree = cache.get(key)
+    if tree is None:
+        tree = build_tree(movie_id)
+        cache.set(key, tree, timeout=settings.SERIES_TREE_TIMEOUT)
+    return tree
+
+
+def invalidate_tree(*movie_ids):
+    """Drop the cached trees. Called after commit, so a cache error is logged, not raised."""
+    try:
+        cache.delete_many([SERIES_TREE_KEY.format(movie_id) for movie_id in movie_ids])
+    except ConnectionInterrupted:
+        logger.error('Could not invalidate series trees of movies %s; they may be stale for up to %ss',
+                     movie_ids, settings.SERIES_TREE_TIMEOUT, exc_info=True)
@@ -1,10 +1,16 @@
 
-from django.db.models.signals import post_save, pre_save
+from django.db import transaction
+from django.db.models import F
+from django.db.models.signals import post_save, pre_save, pre_delete, post_delete, m2m_changed
 from django.dispatch import receiver
+from django.utils import timezone
 
-from app.models import PurchaseMovie, Payment, SubscriptionItems, Subscribers, TranslateMovies, OrderSubscriptionItem, PaymentSubscription
+from app.models import PurchaseMovie, Payment, SubscriptionItems, Subscribers, TranslateMovies, OrderSubscriptionItem, PaymentSubscription, \
+    Movie, SimilarMovie, MovieComment, Genre, Countries, Category, News, Subscriptions, User, Season, Episode, \
+    PaymentTranslateMovie
+from app import sampling, autocomplete, response_cache, entitlements, renditions, series, donations, similarity
 from app.task import send_purchase_created_notification, send_purchase_accepted_notification, send_purchase_subscription_notification, \
-    send_purchase_subscription_accepted_notification
+    send_purchase_subscription_accepted_notification, generate_renditions_task
 
 
 
@@ -60,5 +66,231 @@ def update_subscription_status(sender, instance, **kwargs):
         Subscribers.objects.filter(subscribe_item=instance).update(is_active=False)
 
 
+def invalidate_entitlements(*user_ids):
+    transaction.on_commit(lambda: entitlements.invalidate(*user_ids))
 
 
+@receiver(post_save, sender=PurchaseMovie)
+@receiver(post_delete, sender=PurchaseMovie)
+def invalidate_entitlements_on_purchase(sender, instance, **kwargs):
+    invalidate_entitlements(instance.purchase.user_id)
+
+
+@receiver(post_save, sender=Subscribers)
+@receiver(post_delete, sender=Subscribers)
+def invalidate_entitlements_on_subscriber(sender, instance, **kwargs):
+    invalidate_entitlements(instance.user_id)
+
+
+@receiver(post_save, sender=OrderSubscriptionItem)
+@receiver(post_delete, sender=OrderSubscriptionItem)
+def invalidate_entitlements_on_subscription_order(sender, instance, **kwargs):
+    invalidate_entitlements(instance.order.user_id)
+
+
+@receiver(post_save, sender=PaymentSubscription)
+def invalidate_entitlements_on_subscription_payment(sender, instance, **kwargs):
+    invalidate_entitlements(instance.order.order.user_id)
+
+
+@receiver(post_save, sender=SubscriptionItems)
+def invalidate_entitlements_on_subscription_item(sender, instance, **kwargs):
+    user_ids = set(Subscribers.objects.filter(subscribe_item=instance).values_list('user_id', flat=True))
+    user_ids.update(OrderSubscriptionItem.objects.filter(subscription=instance).values_list('order__user_id', flat=True))
+    invalidate_entitlements(*user_ids)
+
+
+@receiver(post_save, sender=User)
+def invalidate_entitlements_on_tier_change(sender, instance, update_fields=None, **kwargs):
+    if update_fields is None or 'subscription' in update_fields:
+        invalidate_entitlements(instance.pk)
+
+
+@receiver(post_save, sender=Subscriptions)
+@receiver(post_delete, sender=Subscriptions)
+def invalidate_all_entitlements(sender, **kwargs):
+    transaction.on_commit(entitlements.invalidate_all)
+
+
+
+def schedule_similar_movies_update(movie_ids):
+    movie_ids = list(movie_ids)
+    if movie_ids:
+        transaction.on_commit(lambda: similarity.queue_similar_movies_update(movie_ids))
+
+
+@receiver(post_save, sender=Movie)
+def update_similar_movies_on_save(sender, instance, update_fields=None, **kwargs):
+    if update_fields is not None and not {'title', 'category', 'country', 'language'} & set(update_fields):
+        return
+    schedule_similar_movies_update([instance.id])
+
+
+@receiver(m2m_changed, sender=Movie.genre.through)
+def update_similar_movies_on_genre_change(sender, instance, action, reverse, pk_set, **kwargs):
+    if not reverse:
+        if action in ('post_add', 'post_remove', 'post_clear'):
+            schedule_similar_movies_update([instance.pk])
+    elif action in ('post_add', 'post_remove'):
+        schedule_similar_movies_update(pk_set)
+    elif action == 'pre_clear':
+        schedule_similar_movies_update(Movie.objects.filter(genre=instance).values_list('id', flat=True))
+
+
+@receiver(pre_delete, sender=Movie)
+def update_similar_movies_on_delete(sender, instance, **kwargs):
+    # The cascade removes this movie from other lists before the task runs.
+    schedule_similar_movies_update(
+        SimilarMovie.objects.filter(similar=instance).values_list('movie_id', flat=True)
+    )
+
+
+@receiver(post_save, sender=MovieComment)
+def increment_movie_comment_count(sender, instance, created, **kwargs):
+    if created:
+        Movie.objects.filter(pk=instance.movie_id).update(comment_count=F('comment_count') + 1)
+
+
+@receiver(post_delete, sender=MovieComment)
+def decrement_movie_comment_count(sender, instance, **kwargs):
+    Movie.objects.filter(pk=instance.movie_id, comment_count__gt=0).update(comment_count=F('comment_count') - 1)
+
+
+@receiver(post_save, sender=Movie)
+def update_random_pools_on_save(sender, instance, **kwargs):
+    transaction.on_commit(lambda: sampling.add_movie(instance))
+
+
+@receiver(m2m_changed, sender=Movie.genre.through)
+def update_random_pools_on_genre_change(sender, instance, action, reverse, pk_set, **kwargs):
+    if action == 'pre_clear':
+        if reverse:
+            movie_ids, genre_ids = list(Movie.objects.filter(genre=instance).values_list('id', flat=True)), [instance.pk]
+        else:
+            movie_ids, genre_ids = [instance.pk], list(instance.genre.values_list('id', flat=True))
+    elif action in ('post_add', 'post_remove') and pk_set:
+        movie_ids, genre_ids = (list(pk_set), [instance.pk]) if reverse else ([instance.pk], list(pk_set))
+    else:
+        return
+
+    present = action == 'post_add'
+    if movie_ids:
+        transaction.on_commit(lambda: sampling.set_movie_genres(movie_ids, genre_ids, present))
+
+
+@receiver(pre_delete, sender=Movie)
+def update_random_pools_on_delete(sender, instance, **kwargs):
+    movie_id, genre_ids = instance.pk, list(instance.genre.values_list('id', flat=True))
+    transaction.on_commit(lambda: sampling.remove_movie(movie_id, genre_ids))
+
+
+@receiver(post_save, sender=Movie)
+@receiver(post_delete, sender=Movie)
+def publish_autocomplete_change(sender, instance, **kwargs):
+    movie_id = instance.pk
+    transaction.on_commit(lambda: autocomplete.publish_change(movie_id))
+
+
+RESPONSE_CACHE_TAGS = {Movie: 'movie', Genre: 'genre', Countries: 'countries', Category: 'category', News: 'news'}
+
+
+def invalidate_response_cache(sender, **kwargs):
+    tag = RESPONSE_CACHE_TAGS[sender]
+    transaction.on_commit(lambda: response_cache.bump_tags(tag))
+
+
+for model in RESPONSE_CACHE_TAGS:
+    post_save.connect(invalidate_response_cache, sender=model, dispatch_uid=f'response_cache_save_{model.__name__}')
+    post_delete.connect(invalidate_response_cache, sender=model, dispatch_uid=f'response_cache_delete_{model.__name__}')
+
+
+@receiver(m2m_changed, sender=Movie.genre.through)
+def touch_movies_on_genre_change(sender, instance, action, reverse, pk_set, **kwargs):
+    # Genres are part of the detail payload, so they must move its ETag/Last-Modified.
+    if action == 'pre_clear' and reverse:
+        # post_clear carries no pk_set: remember which movies are losing the genre.
+        instance._cleared_movie_ids = list(Movie.objects.filter(genre=instance).values_list('id', flat=True))
+        return
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if not reverse:
+        movies = Movie.objects.filter(pk=instance.pk)
+    elif action == 'post_clear':
+        movies = Movie.objects.filter(pk__in=instance.__dict__.pop('_cleared_movie_ids', []))
+    elif pk_set:
+        movies = Movie.objects.filter(pk__in=pk_set)
+    else:
+        return
+    movies.update(updated_at=timezone.now())
+
+
+@receiver(m2m_changed, sender=Movie.genre.through)
+def invalidate_response_cache_on_genre_change(sender, action, **kwargs):
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        transaction.on_commit(lambda: response_cache.bump_tags('movie'))
+
+
+def schedule_renditions(sender, instance, **kwargs):
+    if renditions.needs_renditions(instance):
+        label, pk = instance._meta.label_lower, instance.pk
+        name = getattr(instance, renditions.RENDITION_FIELDS[label][0]).name
+        transaction.on_commit(lambda: generate_renditions_task.delay(label, pk, name))
+
+
+for label in renditions.RENDITION_FIELDS:
+    post_save.connect(schedule_renditions, sender=label, dispatch_uid=f'renditions_{label}')
+
+
+@receiver(post_save, sender=Season)
+@receiver(post_delete, sender=Season)
+def invalidate_series_tree_on_season(sender, instance, **kwargs):
+    movie_id = instance.movie_id
+    transaction.on_commit(lambda: series.invalidate_tree(movie_id))
+
+
+@receiver(post_save, sender=Episode)
+@receiver(post_delete, sender=Episode)
+def invalidate_series_tree_on_episode(sender, instance, **kwargs):
+    movie_id = Season.objects.filter(pk=instance.season_id).values_list('movie_id', flat=True).first()
+    if movie_id is not None:
+        transaction.on_commit(lambda: series.invalidate_tree(movie_id))
+
+
+@receiver(pre_save, sender=PaymentTranslateMovie)
+def remember_donation(sender, instance, **kwargs):
+    if instance.pk:
+        instance._previous_donation = PaymentTranslateMovie.objects.filter(pk=instance.pk).values_list(
+            'user_id', 'translate_movie_id', 'amount').first()
+
+
+@receiver(post_save, sender=PaymentTranslateMovie)
+def update_donor_totals_on_save(sender, instance, created, **kwargs):
+    previous = None if created else getattr(instance, '_previous_donation', None)
+    if previous is not None:
+        user_id, translate_movie_id, amount = previous
+        donations.add_to_totals(user_id, translate_movie_id, -amount)
+    donations.add_to_totals(instance.user_id, instance.translate_movie_id, instance.amount)
+
+
+@receiver(post_delete, sender=PaymentTranslateMovie)
+def update_donor_totals_on_delete(sender, instance, **kwargs):
+    donations.add_to_totals(instance.user_id, instance.translate_movie_id, -instance.amount)
+
+
+@receiver(post_save, sender=PaymentTranslateMovie)
+def update_recent_donations_on_save(sender, instance, created, **kwargs):
+    if created:
+        transaction.on_commit(lambda: donations.push_recent(instance))
+        return
+    campaigns = {instance.translate_movie_id}
+    previous = getattr(instance, '_previous_donation', None)
+    if previous is not None:
+        campaigns.add(previous[1])
+    for campaign_id in campaigns:
+        transaction.on_commit(lambda campaign_id=campaign_id: donations.forget_recent(campaign_id))
+
+
+@receiver(post_delete, sender=PaymentTranslateMovie)
+def update_recent_donations_on_delete(sender, instance, **kwargs):
+    translate_movie_id = instance.translate_movie_id
+    transaction.on_commit(lambda: donations.forget_recent(translate_movie_id))
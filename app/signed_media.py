@@ -0,0 +1,100 @@
+import base64
+import hmac
+import time
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.files.storage import FileSystemStorage
+from django.urls import reverse
+from django.utils.crypto import salted_hmac
+from django.utils.deconstruct import deconstructible
+from django.utils.functional import cached_property
+from rest_framework.fields import FileField
+
+SALT = 'app.signed_media'
+
+
+def _signature(kid, name, expires):
+    digest = salted_hmac(SALT, f'{name}:{expires}', settings.MEDIA_SIGNING_KEYS[kid], algorithm='sha256').digest()
+    return base64.urlsafe_b64encode(digest).rstrip(b'=').decode()
+
+
+def current_window(now=None):
+    """Start of the signing window; URLs signed inside one window are identical."""
+    now = int(time.time() if now is None else now)
+    return now - now % settings.MEDIA_URL_WINDOW
+
+
+def sign(name, now=None):
+    """
+    Query parameters granting access to `name` until the end of the current
+    window plus `MEDIA_URL_TTL`, signed with the active key.
+    """
+    kid = settings.MEDIA_SIGNING_KEY_ID
+    expires = current_window(now) + settings.MEDIA_URL_WINDOW + settings.MEDIA_URL_TTL
+    return {'exp': expires, 'kid': kid, 'sig': _signature(kid, name, expires)}
+
+
+def verify(name, params, now=None):
+    """
+    True when `params` carry a valid, unexpired signature for `name`. No I/O:
+    any key still listed in MEDIA_SIGNING_KEYS verifies, and the expiry is
+    checked with MEDIA_URL_CLOCK_SKEW of slack either way.
+    """
+    kid, signature = params.get('kid'), params.get('sig')
+    try:
+        expires = int(params.get('exp', ''))
+    except ValueError:
+        return False
+    if kid not in settings.MEDIA_SIGNING_KEYS or not signature:
+        return False
+
+    now = int(time.time() if now is None else now)
+    skew = settings.MEDIA_URL_CLOCK_SKEW
+    latest = now + settings.MEDIA_URL_WINDOW + settings.MEDIA_URL_TTL + skew
+    if not now - skew <= expires <= latest:
+        return False
+    return hmac.compare_digest(signature, _signature(kid, name, expires))
+
+
+def signed_url(name, request=None):
+    url = f'{reverse("signed-media", args=[name])}?{urlencode(sign(name))}'
+    return request.build_absolute_uri(url) if request is not None else url
+
+
+class SignedFileField(FileField):
+    """File field rendered as a signed, expiring `signed-media` URL instead of a public MEDIA_URL."""
+
+    def to_representation(self, value):
+        if not value:
+            return None
+        return signed_url(value.name, self.context.get('request'))
+
+
+@deconstructible(path='app.signed_media.PrivateMediaStorage')
+class PrivateMediaStorage(FileSystemStorage):
+    """
+    Files under PRIVATE_MEDIA_ROOT, outside MEDIA_ROOT, so the public media
+    route cannot serve them. `url()` is a signed `signed-media` URL.
+    """
+
+    @cached_property
+    def base_location(self):
+        return self._value_or_setting(self._location, settings.PRIVATE_MEDIA_ROOT)
+
+    def _clear_cached_properties(self, setting, **kwargs):
+        super()._clear_cached_properties(setting, **kwargs)
+        if setting == 'PRIVATE_MEDIA_ROOT':
+            self.__dict__.pop('base_location', None)
+            self.__dict__.pop('location', None)
+
+    def url(self, name):
+        return signed_url(name)
+
+
+_private_storage = PrivateMediaStorage()
+
+
+def private_storage():
+    """Storage for video files; a callable so migrations record the reference, not the instance."""
+    return _private_storage
@@ -0,0 +1,199 @@
+import logging
+import re
+import zlib
+
+import numpy as np
+from django.db import transaction
+from django_redis import get_redis_connection
+from redis.exceptions import RedisError, ResponseError
+
+from app.models.movie import Movie, SimilarMovie
+from app.utils import redis_lock
+
+SIMILAR_MOVIES_LIMIT = 5
+TITLE_DIMENSIONS = 512
+BLOCK_SIZE = 256
+
+WEIGHTS = {
+    'genre': 3.0,
+    'title': 2.0,
+    'category': 1.5,
+    'country': 1.0,
+    'language': 1.0,
+}
+
+TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+# Movies saved since the last refresh; one batched update_similar_movies() covers them all.
+PENDING_UPDATES_KEY = 'similar:pending'
+PROCESSING_UPDATES_KEY = 'similar:processing'
+FLUSH_LOCK_KEY = 'similar:flush-lock'
+FLUSH_LOCK_TIMEOUT = 10 * 60
+
+logger = logging.getLogger(__name__)
+
+
+def _normalize_rows(matrix):
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    np.divide(matrix, norms, out=matrix, where=norms > 0)
+    return matrix
+
+
+class MovieFeatures:
+    """
+    Dense feature matrices for the whole catalog.
+
+    Genres and hashed title tokens are L2-normalised multi-hot rows, so their dot
+    products are cosine similarities; category, country and language score on
+    equality.
+    """
+
+    def __init__(self):
+        rows = list(Movie.objects.order_by().values_list('id', 'title', 'category_id', 'country_id', 'language_id'))
+        size = len(rows)
+
+        self.ids = np.array([row[0] for row in rows], dtype=np.int64)
+        self.index = {movie_id: i for i, movie_id in enumerate(self.ids.tolist())}
+        self.category = np.array([row[2] for row in rows], dtype=np.int64)
+        self.country = np.array([row[3] for row in rows], dtype=np.int64)
+        self.language = np.array([row[4] for row in rows], dtype=np.int64)
+
+        genre_codes = {}
+        cells = [
+            (self.index[movie_id], genre_codes.setdefault(genre_id, len(genre_codes)))
+            for movie_id, genre_id in Movie.genre.through.objects.values_list('movie_id', 'genre_id')
+            if movie_id in self.index
+        ]
+        self.genres = np.zeros((size, max(len(genre_codes), 1)), dtype=np.float32)
+        if cells:
+            self.genres[tuple(np.array(cells).T)] = 1
+        _normalize_rows(self.genres)
+
+        self.titles = np.zeros((size, TITLE_DIMENSIONS), dtype=np.float32)
+        for i, row in enumerate(rows):
+            for token in TOKEN_RE.findall(row[1].lower()):
+                self.titles[i, zlib.crc32(token.encode()) % TITLE_DIMENSIONS] = 1
+        _normalize_rows(self.titles)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def scores(self, rows):
+        """Similarity of the movies at matrix positions `rows` against every movie, shape (len(rows), n)."""
+        rows = np.asarray(rows, dtype=np.int64)
+        scores = WEIGHTS['genre'] * (self.genres[rows] @ self.genres.T)
+        scores += WEIGHTS['title'] * (self.titles[rows] @ self.titles.T)
+        for name in ('category', 'country', 'language'):
+            codes = getattr(self, name)
+            scores += WEIGHTS[name] * (codes[rows, None] == codes[None, :])
+        scores[np.arange(len(rows)), rows] = 0
+        return scores
+
+    def top_k(self, rows, k=SIMILAR_MOVIES_LIMIT):
+        """Yield (movie_id, [(similar_id, score), ...]) best first, skipping zero scores."""
+        k = min(k, len(self) - 1)
+        for start in range(0, len(rows), BLOCK_SIZE):
+            block = rows[start:start + BLOCK_SIZE]
+            if k <= 0:
+                for row in block:
+                    yield int(self.ids[row]), []
+                continue
+
+            scores = self.scores(block)
+            best = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+            best_scores = np.take_along_axis(scores, best, axis=1)
+            order = np.argsort(-best_scores, axis=1, kind='stable')
+            best = np.take_along_axis(best, order, axis=1)
+            best_scores = np.take_along_axis(best_scores, order, axis=1)
+
+            for row, columns, values in zip(block, best, best_scores):
+                yield int(self.ids[row]), [
+                    (int(self.ids[column]), float(value)) for column, value in zip(columns, values) if value > 0
+                ]
+
+
+def _save_neighbours(neighbours, stale):
+    with transaction.atomic():
+        stale.delete()
+        SimilarMovie.objects.bulk_create([
+            SimilarMovie(movie_id=movie_id, similar_id=similar_id, rank=rank, score=score)
+            for movie_id, similar in neighbours
+            for rank, (similar_id, score) in enumerate(similar)
+        ], batch_size=1000)
+
+
+def rebuild_similar_movies(k=SIMILAR_MOVIES_LIMIT):
+    """Recompute the neighbour lists of the whole catalog."""
+    features = MovieFeatures()
+    neighbours = list(features.top_k(np.arange(len(features)), k))
+    _save_neighbours(neighbours, SimilarMovie.objects.all())
+    return len(neighbours)
+
+
+def update_similar_movies(movie_ids, k=SIMILAR_MOVIES_LIMIT):
+    """
+    Refresh the index after `movie_ids` were created, changed or deleted.
+
+    Besides the changed movies themselves, only movies whose lists mention one of
+    them, or whose k-th score is beaten by one of them, are recomputed.
+    """
+    features = MovieFeatures()
+    changed = [features.index[movie_id] for movie_id in set(movie_ids) if movie_id in features.index]
+
+    affected = set(
+        SimilarMovie.objects.filter(similar_id__in=movie_ids).values_list('movie_id', flat=True)
+    )
+
+    if changed:
+        threshold = np.zeros(len(features), dtype=np.float32)
+        for movie_id, score in SimilarMovie.objects.filter(rank=k - 1).values_list('movie_id', 'score'):
+            if movie_id in features.index:
+                threshold[features.index[movie_id]] = score
+
+        beaten = (features.scores(changed) > threshold[None, :]).any(axis=0)
+        affected.update(features.ids[beaten].tolist())
+        affected.update(features.ids[changed].tolist())
+
+    rows = sorted(features.index[movie_id] for movie_id in affected if movie_id in features.index)
+    neighbours = list(features.top_k(np.array(rows, dtype=np.int64), k))
+    _save_neighbours(neighbours, SimilarMovie.objects.filter(movie_id__in=[movie_id for movie_id, _ in neighbours]))
+    return len(rows)
+
+
+def queue_similar_movies_update(movie_ids):
+    """
+    Mark movies for the next batched refresh, so a burst of saves costs one
+    catalog pass. Called after commit, so a Redis error is logged, not raised.
+    """
+    if not movie_ids:
+        return
+    try:
+        get_redis_connection('default').sadd(PENDING_UPDATES_KEY, *movie_ids)
+    except RedisError:
+        logger.error('Could not queue similar movies refresh for %s', movie_ids, exc_info=True)
+
+
+def flush_similar_movies_updates(k=SIMILAR_MOVIES_LIMIT):
+    """
+    Run update_similar_movies() once for every movie queued since the last run.
+
+    Same hand-off as the view counters: the pending set is renamed away, so
+    saves during the refresh queue for the next run, and a set left behind by
+    a failed run is retried before new ones are taken.
+    """
+    redis = get_redis_connection('default')
+    with redis_lock(FLUSH_LOCK_KEY, FLUSH_LOCK_TIMEOUT) as acquired:
+        if not acquired:
+            return 0
+        try:
+            redis.renamenx(PENDING_UPDATES_KEY, PROCESSING_UPDATES_KEY)
+        except ResponseError:
+            # Nothing pending.
+            pass
+
+        movie_ids = [int(movie_id) for movie_id in redis.smembers(PROCESSING_UPDATES_KEY)]
+        if not movie_ids:
+            return 0
+        update_similar_movies(movie_ids, k)
+        redis.delete(PROCESSING_UPDATES_KEY)
+        return len(movie_ids)
@@ -0,0 +1,141 @@
+import mimetypes
+import re
+import secrets
+from urllib.parse import quote
+
+from django.apps import apps
+from django.conf import settings
+from django.http import FileResponse, HttpResponse, Http404
+from django.utils.http import http_date
+from django_redis import get_redis_connection
+
+from app.conditional import make_etag
+
+SESSION_KEY = 'stream:session:{}'
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+def open_session(label, pk, field='video'):
+    """
+    Remember which file a player may read and return the token for its URL.
+
+    The caller has already checked entitlement; every Range request of the
+    playback afterwards costs one Redis lookup instead of a new check.
+    """
+    name = apps.get_model(label).objects.filter(pk=pk).values_list(field, flat=True).first()
+    if not name:
+        return None
+    token = secrets.token_urlsafe(24)
+    get_redis_connection('default').set(
+        SESSION_KEY.format(token), f'{label}:{field}:{name}', ex=settings.STREAM_SESSION_TTL)
+    return token
+
+
+def resolve_session(token):
+    """(storage, name) for a live session, or None once it has expired."""
+    value = get_redis_connection('default').get(SESSION_KEY.format(token))
+    if value is None:
+        return None
+    label, field, name = value.decode().split(':', 2)
+    return apps.get_model(label)._meta.get_field(field).storage, name
+
+
+def parse_range(header, size):
+    """
+    (start, end) inclusive for a single `bytes=` range, None to send the whole
+    file, or False when the range cannot be satisfied. Multi-range requests are
+    answered with the whole file, which RFC 9110 allows.
+    """
+    match = RANGE_RE.match(header.strip()) if header else None
+    if match is None:
+        return None
+    first, last = match.groups()
+    if not first:
+        if not last:
+            return None
+        # Suffix range: the final N bytes.
+        length = int(last)
+        return (max(size - length, 0), size - 1) if length and size else False
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or end < start:
+        return False
+    return start, end
+
+
+class FileSlice:
+    """
+    Read-only view of `length` bytes of an open file from its current position.
+
+    `fileno()` is exposed so gunicorn's `wsgi.file_wrapper` can `sendfile()` the
+    slice (it stops at Content-Length); other servers iterate `read()` in
+    `block_size` chunks, so memory stays flat whatever the file size.
+    """
+
+    def __init__(self, file, length):
+        self.file = file
+        self.remaining = length
+
+    def read(self, size=-1):
+        if self.remaining <= 0:
+            return b''
+        size = self.remaining if size is None or size < 0 else min(size, self.remaining)
+        data = self.file.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def fileno(self):
+        return self.file.fileno()
+
+    def close(self):
+        self.file.close()
+
+
+def stream_response(request, storage, name):
+    """
+    Serve `name` with Range support: 206 for a satisfiable range, 416 for one
+    past the end, 200 otherwise. With `STREAM_ACCEL_REDIRECT_PREFIX` set the
+    bytes are left to nginx, which handles Range on internal locations itself.
+    """
+    content_type = mimetypes.guess_type(name)[0] or 'application/octet-stream'
+    if settings.STREAM_ACCEL_REDIRECT_PREFIX:
+        response = HttpResponse(content_type=content_type)
+        response['X-Accel-Redirect'] = settings.STREAM_ACCEL_REDIRECT_PREFIX + quote(name)
+        return response
+
+    try:
+        size = storage.size(name)
+        modified = storage.get_modified_time(name)
+    except (FileNotFoundError, NotImplementedError):
+        raise Http404('Video file is missing')
+    etag = make_etag((name, size, modified.timestamp()))
+
+    byte_range = parse_range(request.headers.get('Range'), size)
+    if_range = request.headers.get('If-Range')
+    if if_range and if_range != etag and if_range != http_date(modified.timestamp()):
+        # The file changed since the player cached its first bytes; start over.
+        byte_range = None
+
+    if byte_range is False:
+        response = HttpResponse(status=416, content_type=content_type)
+        response['Content-Range'] = f'bytes */{size}'
+    else:
+        start, end = byte_range or (0, size - 1)
+        length = end - start + 1 if size else 0
+        if request.method == 'HEAD':
+            response = HttpResponse(content_type=content_type)
+        else:
+            file = storage.open(name, 'rb')
+            file.seek(start)
+            response = FileResponse(FileSlice(file, length), content_type=content_type)
+            response.block_size = settings.STREAM_CHUNK_SIZE
+        response['Content-Length'] = length
+        if byte_range:
+            response.status_code = 206
+            response['Content-Range'] = f'bytes {start}-{end}/{size}'
+
+    response['Accept-Ranges'] = 'bytes'
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(modified.timestamp())
+    response['Cache-Control'] = 'private, no-transform'
+    return response
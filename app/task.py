@@ -1,7 +1,11 @@
 
-from celery import shared_task
+from celery import shared_task, chord
 from django.core.mail import send_mail, get_connection
 from root import settings
+from .counters import flush_movie_views, sync_collected_money
+from .search_history import drain_search_events
+from .similarity import update_similar_movies, rebuild_similar_movies, flush_similar_movies_updates
+from .renditions import RENDITION_WIDTHS, render_width, store_renditions
 from .models import PurchaseMovie, Notification, OrderSubscription, Subscribers, OrderSubscriptionItem
 
 
@@ -74,6 +78,53 @@ def send_purchase_subscription_accepted_notification(order_id):
 
 
 
+@shared_task
+def flush_movie_views_task():
+    return flush_movie_views()
+
+
+@shared_task
+def drain_search_events_task():
+    return drain_search_events()
+
+
+@shared_task
+def sync_collected_money_task():
+    return sync_collected_money()
+
+
+@shared_task
+def update_similar_movies_task(movie_ids):
+    return update_similar_movies(movie_ids)
+
+
+@shared_task
+def flush_similar_movies_updates_task():
+    return flush_similar_movies_updates()
+
+
+@shared_task
+def rebuild_similar_movies_task():
+    return rebuild_similar_movies()
+
+
+@shared_task
+def render_rendition_task(label, name, width):
+    return width, render_width(label, name, width)
+
+
+@shared_task
+def store_renditions_task(results, label, pk, name):
+    store_renditions(label, pk, name, results)
+
+
+@shared_task
+def generate_renditions_task(label, pk, name):
+    chord(render_rendition_task.s(label, name, width) for width in RENDITION_WIDTHS)(
+        store_renditions_task.s(label, pk, name)
+    )
+
+
 @shared_task
 def send_otp_email(email, code):
     print('123')
@@ -1,3 +1,809 @@
-from django.test import TestCase
+import os
+import shutil
+import tempfile
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.db import DatabaseError, connection, connections
+from django.db.models import Sum
+from django.http import Http404
+from django.test import RequestFactory, TestCase, TransactionTestCase, override_settings
+from django.views.static import serve
+from django_redis import get_redis_connection
+from django_redis.exceptions import ConnectionInterrupted
+from redis.client import Pipeline
+from redis.exceptions import RedisError
+from rest_framework.test import APIClient
+
+from app import (autocomplete, counters, donations, entitlements, response_cache, sampling, signed_media, similarity,
+                 wallet)
+from app.streaming import open_session, parse_range
+from app.management.commands._bench import seed_movies
+from app.models.movie import (CollectedMoneyShard, Episode, Genre, Movie, MovieComment, News, Season, SimilarMovie,
+                              TranslateMovies)
+from app.models.orders import LedgerEntry, PaymentTranslateMovie, Purchase, PurchaseMovie
+from app.models.base import allocate_slug
+from app.pagination import estimate_count
+from app.models.users import User
+
+
+def ledger_total(user):
+    return LedgerEntry.objects.filter(user=user).aggregate(total=Sum('amount'))['total'] or 0
+
+
+class WalletTests(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create(username='wallet', email='wallet@example.com')
+
+    def test_credit_and_debit_are_recorded_in_the_ledger(self):
+        wallet.credit(self.user.id, 500, LedgerEntry.Kind.FILL)
+        wallet.debit(self.user.id, 120, LedgerEntry.Kind.MOVIE, reference='purchase-movie:1')
+
+        self.assertEqual(wallet.balance(self.user.id), 380)
+        self.assertEqual(ledger_total(self.user), 380)
+        self.assertEqual(
+            list(LedgerEntry.objects.filter(user=self.user).order_by('id').values_list('kind', 'amount')),
+            [(LedgerEntry.Kind.FILL, 500), (LedgerEntry.Kind.MOVIE, -120)],
+        )
+
+    def test_overdraft_is_refused_and_leaves_no_trace(self):
+        wallet.credit(self.user.id, 100, LedgerEntry.Kind.FILL)
+
+        with self.assertRaises(wallet.InsufficientFunds):
+            wallet.debit(self.user.id, 101, LedgerEntry.Kind.MOVIE)
+
+        self.assertEqual(wallet.balance(self.user.id), 100)
+        self.assertEqual(LedgerEntry.objects.filter(user=self.user).count(), 1)
+
+    def test_zero_and_negative_amounts_are_rejected(self):
+        for amount in (0, -5):
+            with self.assertRaises(ValueError):
+                wallet.debit(self.user.id, amount, LedgerEntry.Kind.MOVIE)
+            with self.assertRaises(ValueError):
+                wallet.credit(self.user.id, amount, LedgerEntry.Kind.FILL)
+        self.assertFalse(LedgerEntry.objects.filter(user=self.user).exists())
+
+    def test_prices_must_be_converted_first(self):
+        with self.assertRaises(TypeError):
+            wallet.credit(self.user.id, Decimal('12.50'), LedgerEntry.Kind.FILL)
+
+    def test_to_amount(self):
+        self.assertEqual(wallet.to_amount(None), 0)
+        self.assertEqual(wallet.to_amount(Decimal('0.00')), 0)
+        self.assertEqual(wallet.to_amount(Decimal('12.49')), 12)
+        self.assertEqual(wallet.to_amount(Decimal('12.50')), 13)
+
+    def test_credit_to_unknown_user(self):
+        with self.assertRaises(User.DoesNotExist):
+            wallet.credit(0, 10, LedgerEntry.Kind.FILL)
+
+
+class MoviePaymentTests(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create(username='buyer', email='buyer@example.com')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.movie = seed_movies(1)[0]
+
+    def order(self, price):
+        self.movie.price = price
+        self.movie.save(update_fields=['price'])
+        return PurchaseMovie.objects.create(purchase=Purchase.objects.create(user=self.user), movie=self.movie)
+
+    def pay(self, purchase_movie):
+        return self.client.post('/api/purchased-movie-payment/', {
+            'purchase_movie': purchase_movie.id, 'payment_method': 'BALANCE', 'status': 'PENDING',
+        }, format='json')
+
+    def test_free_movies_are_accepted_without_a_debit(self):
+        for price in (Decimal('0'), None):
+            purchase_movie = self.order(price)
+
+            self.assertEqual(self.pay(purchase_movie).status_code, 201)
+            purchase_movie.refresh_from_db()
+            self.assertEqual(purchase_movie.status, PurchaseMovie.STATUS.ACCEPTED)
+        self.assertFalse(LedgerEntry.objects.filter(user=self.user).exists())
+
+    def test_fractional_price_keeps_ledger_and_balance_in_step(self):
+        wallet.credit(self.user.id, 100, LedgerEntry.Kind.FILL)
+
+        self.assertEqual(self.pay(self.order(Decimal('12.50'))).status_code, 201)
+        self.assertEqual(wallet.balance(self.user.id), 87)
+        self.assertEqual(ledger_total(self.user), 87)
+
+    def test_second_payment_for_the_same_order_is_not_charged(self):
+        wallet.credit(self.user.id, 100, LedgerEntry.Kind.FILL)
+        purchase_movie = self.order(Decimal('30'))
+
+        self.assertEqual(self.pay(purchase_movie).status_code, 201)
+        self.assertEqual(self.pay(purchase_movie).status_code, 400)
+        self.assertEqual(wallet.balance(self.user.id), 70)
+
+    def test_insufficient_funds_leave_the_order_pending(self):
+        purchase_movie = self.order(Decimal('30'))
+
+        self.assertEqual(self.pay(purchase_movie).status_code, 400)
+        purchase_movie.refresh_from_db()
+        self.assertEqual(purchase_movie.status, PurchaseMovie.STATUS.PENDING)
+
+
+@skipUnless(connection.vendor == 'postgresql', 'needs row-level locking between connections')
+class ConcurrentMoviePaymentTests(TransactionTestCase):
+
+    def test_concurrent_claims_of_one_order_charge_once(self):
+        user = User.objects.create(username='racer', email='racer@example.com')
+        wallet.credit(user.id, 1000, LedgerEntry.Kind.FILL)
+        movie = seed_movies(1, price=Decimal('40'))[0]
+        purchase_movie = PurchaseMovie.objects.create(purchase=Purchase.objects.create(user=user), movie=movie)
+
+        def pay(_):
+            client = APIClient()
+            client.force_authenticate(user)
+            try:
+                return client.post('/api/purchased-movie-payment/', {
+                    'purchase_movie': purchase_movie.id, 'payment_method': 'BALANCE', 'status': 'PENDING',
+                }, format='json').status_code
+            finally:
+                connections.close_all()
+
+        with ThreadPoolExecutor(8) as executor:
+            codes = list(executor.map(pay, range(8)))
+
+        self.assertEqual(sorted(codes), [201] + [400] * 7)
+        self.assertEqual(wallet.balance(user.id), 960)
+        self.assertEqual(ledger_total(user), 960)
+
+
+@override_settings(MEDIA_SIGNING_KEYS={'k1': 'first-key', 'k2': 'second-key'}, MEDIA_SIGNING_KEY_ID='k1')
+class SignedMediaTests(TestCase):
+
+    def setUp(self):
+        self.media_root, self.private_root = tempfile.mkdtemp(), tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root)
+        self.addCleanup(shutil.rmtree, self.private_root)
+        roots = self.settings(MEDIA_ROOT=self.media_root, PRIVATE_MEDIA_ROOT=self.private_root)
+        roots.enable()
+        self.addCleanup(roots.disable)
+
+        self.movie = seed_movies(1)[0]
+        self.movie.video.save('feature.mp4', ContentFile(b'0123456789'))
+        self.name = self.movie.video.name
+
+    def test_video_is_not_on_the_public_media_route(self):
+        self.assertTrue(os.path.isfile(os.path.join(self.private_root, self.name)))
+        self.assertFalse(os.path.exists(os.path.join(self.media_root, self.name)))
+        # What `static(MEDIA_URL, document_root=MEDIA_ROOT)` does for /media/<name>.
+        with self.assertRaises(Http404):
+            serve(RequestFactory().get(f'/media/{self.name}'), self.name, document_root=settings.MEDIA_ROOT)
+
+    def test_unsigned_and_tampered_requests_are_refused(self):
+        path = f'/api/media/{self.name}'
+        params = signed_media.sign(self.name)
+
+        self.assertEqual(self.client.get(path).status_code, 403)
+        self.assertEqual(self.client.get(path, {**params, 'sig': params['sig'][::-1]}).status_code, 403)
+        self.assertEqual(self.client.get(path, {**params, 'exp': params['exp'] + 1}).status_code, 403)
+        self.assertEqual(self.client.get('/api/media/other.mp4', params).status_code, 403)
+
+    def test_signed_url_streams_the_file(self):
+        response = self.client.get(self.movie.video.url)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), b'0123456789')
+
+    def test_signature_expires(self):
+        params = signed_media.sign(self.name)
+        skew = settings.MEDIA_URL_CLOCK_SKEW
+
+        self.assertTrue(signed_media.verify(self.name, params, now=params['exp'] + skew))
+        self.assertFalse(signed_media.verify(self.name, params, now=params['exp'] + skew + 1))
+        self.assertFalse(signed_media.verify(self.name, signed_media.sign(self.name, now=0)))
+
+    def test_key_rotation(self):
+        old = signed_media.sign(self.name)
+
+        with self.settings(MEDIA_SIGNING_KEY_ID='k2'):
+            self.assertEqual(signed_media.sign(self.name)['kid'], 'k2')
+            self.assertTrue(signed_media.verify(self.name, old))
+        with self.settings(MEDIA_SIGNING_KEYS={'k2': 'second-key'}, MEDIA_SIGNING_KEY_ID='k2'):
+            self.assertFalse(signed_media.verify(self.name, old))
+
+
+class ParseRangeTests(TestCase):
+
+    def test_single_ranges(self):
+        self.assertEqual(parse_range('bytes=0-99', 1000), (0, 99))
+        self.assertEqual(parse_range('bytes=900-', 1000), (900, 999))
+        self.assertEqual(parse_range('bytes=900-5000', 1000), (900, 999))
+
+    def test_suffix_ranges(self):
+        self.assertEqual(parse_range('bytes=-100', 1000), (900, 999))
+        self.assertEqual(parse_range('bytes=-5000', 1000), (0, 999))
+        self.assertFalse(parse_range('bytes=-0', 1000))
+        self.assertFalse(parse_range('bytes=-10', 0))
+
+    def test_unsatisfiable_ranges(self):
+        self.assertFalse(parse_range('bytes=1000-', 1000))
+        self.assertFalse(parse_range('bytes=500-100', 1000))
+
+    def test_whole_file(self):
+        for header in (None, '', 'bytes=-', 'bytes=0-9,20-29', 'items=0-9'):
+            self.assertIsNone(parse_range(header, 1000), header)
+
+
+class MediaStreamTests(TestCase):
+
+    def setUp(self):
+        private_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, private_root)
+        root = self.settings(PRIVATE_MEDIA_ROOT=private_root)
+        root.enable()
+        self.addCleanup(root.disable)
+
+        movie = seed_movies(1)[0]
+        movie.video.save('feature.mp4', ContentFile(b'0123456789'))
+        self.url = f'/api/stream/{open_session("app.movie", movie.id)}/'
+
+    def test_range_request(self):
+        response = self.client.get(self.url, HTTP_RANGE='bytes=2-5')
+
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response['Content-Range'], 'bytes 2-5/10')
+        self.assertEqual(b''.join(response.streaming_content), b'2345')
+
+    def test_unsatisfiable_range(self):
+        response = self.client.get(self.url, HTTP_RANGE='bytes=10-')
+
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response['Content-Range'], 'bytes */10')
+
+    def test_stale_if_range_sends_the_whole_file(self):
+        response = self.client.get(self.url, HTTP_RANGE='bytes=2-5', HTTP_IF_RANGE='"stale"')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), b'0123456789')
+
+    def test_unknown_session(self):
+        self.assertEqual(self.client.get('/api/stream/unknown/').status_code, 404)
+
+
+class EntitlementTests(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create(username='viewer', email='viewer@example.com')
+        self.movie = seed_movies(1, access_type=Movie.AccessType.PURCHASE)[0]
+        self.redis = get_redis_connection('default')
+        keys = [entitlements.ENTITLEMENTS_KEY.format(self.user.pk), entitlements.ENTITLEMENTS_STAMP_KEY.format(self.user.pk)]
+        self.redis.delete(*keys)
+        self.addCleanup(self.redis.delete, *keys)
+
+    def buy(self):
+        purchase = Purchase.objects.create(user=self.user)
+        with self.captureOnCommitCallbacks(execute=True):
+            PurchaseMovie.objects.create(purchase=purchase, movie=self.movie, status=PurchaseMovie.STATUS.ACCEPTED)
+
+    def test_purchase_invalidates_the_cached_set(self):
+        self.assertFalse(entitlements.has_movie_access(self.user, self.movie))
+        self.buy()
+        self.assertTrue(entitlements.has_movie_access(self.user, self.movie))
+
+    def test_failed_invalidation_falls_back_to_the_global_generation(self):
+        self.assertFalse(entitlements.has_movie_access(self.user, self.movie))
+
+        with mock.patch.object(Pipeline, 'execute', side_effect=RedisError), \
+                self.assertLogs('app.entitlements', 'WARNING'):
+            self.buy()
+
+        self.assertTrue(self.redis.exists(entitlements.ENTITLEMENTS_KEY.format(self.user.pk)))
+        self.assertTrue(entitlements.has_movie_access(self.user, self.movie))
+
+    def test_invalidate_all(self):
+        self.assertFalse(entitlements.has_movie_access(self.user, self.movie))
+        PurchaseMovie.objects.bulk_create([PurchaseMovie(
+            purchase=Purchase.objects.create(user=self.user), movie=self.movie, status=PurchaseMovie.STATUS.ACCEPTED)])
+
+        self.assertFalse(entitlements.has_movie_access(self.user, self.movie))
+        entitlements.invalidate_all()
+        self.assertTrue(entitlements.has_movie_access(self.user, self.movie))
+
+    def test_redis_outage_does_not_fail_the_write(self):
+        with mock.patch('app.entitlements.get_redis_connection', side_effect=RedisError), \
+                self.assertLogs('app.entitlements', 'ERROR'):
+            self.buy()
+
+
+class SimilarMoviesTests(TestCase):
+
+    def setUp(self):
+        self.redis = get_redis_connection('default')
+        keys = [similarity.PENDING_UPDATES_KEY, similarity.PROCESSING_UPDATES_KEY]
+        self.redis.delete(*keys)
+        self.addCleanup(self.redis.delete, *keys)
+        self.movies = seed_movies(4)
+        self.drama, self.comedy = Genre.objects.create(name='drama'), Genre.objects.create(name='comedy')
+
+    def neighbours(self):
+        return {(movie_id, similar_id) for movie_id, similar_id in SimilarMovie.objects.values_list('movie_id', 'similar_id')}
+
+    def test_saves_are_refreshed_in_one_batch(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            for movie in self.movies[:2]:
+                movie.genre.add(self.drama)
+            self.movies[2].genre.add(self.comedy)
+
+        self.assertEqual(similarity.flush_similar_movies_updates(), 3)
+        self.assertEqual(similarity.flush_similar_movies_updates(), 0)
+        batched = self.neighbours()
+
+        similarity.rebuild_similar_movies()
+        self.assertEqual(batched, self.neighbours())
+        first, second = self.movies[0].id, self.movies[1].id
+        self.assertEqual(SimilarMovie.objects.filter(movie_id=first, rank=0).get().similar_id, second)
+
+    def test_queue_failure_does_not_fail_the_write(self):
+        with mock.patch('app.similarity.get_redis_connection', side_effect=RedisError), \
+                self.assertLogs('app.similarity', 'ERROR'), self.captureOnCommitCallbacks(execute=True):
+            self.movies[0].genre.add(self.drama)
+
+
+class RandomPoolTests(TestCase):
+
+    def setUp(self):
+        self.redis = get_redis_connection('default')
+        keys = [sampling.READY_POOLS_KEY, sampling.POOL_KEY.format('all')]
+        self.redis.delete(*keys)
+        self.addCleanup(self.redis.delete, *keys)
+        self.movies = seed_movies(5)
+        self.ids = {movie.id for movie in self.movies}
+
+    def test_pool_is_built_once_and_follows_writes(self):
+        self.assertEqual(set(sampling.sample_movie_ids(10)), self.ids)
+
+        sampling.remove_movie(self.movies[0].id)
+        self.assertEqual(set(sampling.sample_movie_ids(10)), self.ids - {self.movies[0].id})
+        self.assertEqual(len(sampling.sample_movie_ids(2)), 2)
+
+    def test_write_during_a_rebuild_is_not_overwritten(self):
+        victim = self.movies[0].id
+        multi = Pipeline.multi
+
+        def delete_after_the_read(pipe):
+            if Movie.objects.filter(pk=victim).exists():
+                Movie.objects.filter(pk=victim).delete()
+                sampling.remove_movie(victim)
+            return multi(pipe)
+
+        with mock.patch.object(Pipeline, 'multi', delete_after_the_read):
+            self.assertEqual(set(sampling.sample_movie_ids(10)), self.ids - {victim})
+        self.assertNotIn(str(victim).encode(), self.redis.smembers(sampling.POOL_KEY.format('all')))
+
+    def test_failed_write_marks_pools_for_rebuild(self):
+        sampling.sample_movie_ids(1)
+
+        with mock.patch.object(Pipeline, 'execute', side_effect=RedisError), \
+                self.assertLogs('app.sampling', 'WARNING'):
+            sampling.add_movie(self.movies[0])
+
+        self.assertFalse(self.redis.sismember(sampling.READY_POOLS_KEY, 'all'))
+
+
+class AutocompleteTests(TestCase):
+
+    def setUp(self):
+        self.movies = seed_movies(3)
+        self.index = autocomplete.TitleIndex()
+        self.index.load()
+
+    def search(self, query):
+        self.index._synced_at = float('-inf')
+        return [movie['id'] for movie in self.index.search(query)]
+
+    def test_published_changes_are_replayed(self):
+        renamed, deleted = self.movies[0].id, self.movies[1].id
+        Movie.objects.filter(pk=renamed).update(title='Amélie')
+        Movie.objects.filter(pk=deleted).delete()
+        self.assertEqual(self.search('amelie'), [])
+
+        autocomplete.publish_change(renamed, deleted)
+
+        self.assertEqual(self.search('amelie'), [renamed])
+        self.assertEqual(self.search('Amélie!'), [renamed])
+        # The slug is unchanged, so the renamed movie still matches it.
+        self.assertEqual(set(self.search('bench movie')), {renamed, self.movies[2].id})
+
+    def test_failed_sync_keeps_serving_the_current_index(self):
+        Movie.objects.filter(pk=self.movies[0].id).update(title='Amélie')
+        autocomplete.publish_change(self.movies[0].id)
+
+        with mock.patch.object(autocomplete.TitleIndex, '_apply', side_effect=DatabaseError), \
+                self.assertLogs('app.autocomplete', 'WARNING'):
+            self.assertEqual(len(self.search('bench movie')), 3)
+
+
+class ResponseCacheTests(TestCase):
+
+    def setUp(self):
+        # Start from a version no earlier run has cached.
+        response_cache.bump_tags('news')
+
+    def get(self):
+        return self.client.get('/api/movie-news/')
+
+    def test_saving_a_tagged_model_invalidates_the_cached_list(self):
+        self.assertEqual(self.get()['X-Cache'], 'MISS')
+        self.assertEqual(self.get()['X-Cache'], 'HIT')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            News.objects.create(title='Premiere night', trailer_url='https://example.com/news', description='-')
+
+        response = self.get()
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertContains(response, 'Premiere night')
+        self.assertEqual(self.get()['X-Cache'], 'HIT')
+
+    def test_authenticated_requests_bypass_the_cache(self):
+        client = APIClient()
+        client.force_authenticate(User.objects.create(username='reader', email='reader@example.com'))
+        self.get()
+
+        self.assertEqual(client.get('/api/movie-news/')['X-Cache'], 'BYPASS')
+
+    def test_failed_bump_does_not_fail_the_write(self):
+        with mock.patch('app.response_cache.get_redis_connection', side_effect=RedisError), \
+                self.assertLogs('app.response_cache', 'ERROR'), self.captureOnCommitCallbacks(execute=True):
+            News.objects.create(title='Premiere night', trailer_url='https://example.com/news', description='-')
+
+
+class SeriesTreeTests(TestCase):
+
+    def setUp(self):
+        self.movie = seed_movies(1)[0]
+        self.url = f'/api/movie/{self.movie.slug}/seasons/'
+        with self.captureOnCommitCallbacks(execute=True):
+            first, second = (Season.objects.create(movie=self.movie, season_number=number) for number in (1, 2))
+            for season, minutes in ((first, 45), (first, 50), (second, 61)):
+                Episode.objects.create(season=season, title=f'{minutes} minutes', video='episode.mp4',
+                                       duration=timedelta(minutes=minutes))
+        self.second = second
+
+    def test_runtimes_are_summed_per_season_and_overall(self):
+        data = self.client.get(self.url).json()
+
+        self.assertEqual(data['runtime'], '02:36:00')
+        self.assertEqual([season['runtime'] for season in data['seasons']], ['01:35:00', '01:01:00'])
+        self.assertEqual([len(season['episodes']) for season in data['seasons']], [2, 1])
+
+    def test_new_episode_invalidates_the_cached_tree(self):
+        self.client.get(self.url)
+        with self.captureOnCommitCallbacks(execute=True):
+            Episode.objects.create(season=self.second, title='finale', video='finale.mp4', duration=timedelta(minutes=4))
+
+        self.assertEqual(self.client.get(self.url).json()['runtime'], '02:40:00')
+
+    def test_failed_invalidation_does_not_fail_the_write(self):
+        with mock.patch('app.series.cache.delete_many', side_effect=ConnectionInterrupted(None)), \
+                self.assertLogs('app.series', 'ERROR'), self.captureOnCommitCallbacks(execute=True):
+            Episode.objects.create(season=self.second, title='finale', video='finale.mp4', duration=timedelta(minutes=4))
+
+
+class MovieViewCountTests(TestCase):
+
+    def setUp(self):
+        self.movie = seed_movies(1)[0]
+        self.url = f'/api/movie/{self.movie.slug}/'
+
+    def views(self):
+        return Movie.objects.values_list('views', flat=True).get(pk=self.movie.pk)
+
+    @override_settings(MOVIE_VIEWS_WRITE_BEHIND=False)
+    def test_views_are_incremented_in_the_database(self):
+        self.assertEqual(self.client.get(self.url).json()['views'], 1)
+        self.assertEqual(self.client.get(self.url).json()['views'], 2)
+        self.assertEqual(self.views(), 2)
+
+    @override_settings(MOVIE_VIEWS_WRITE_BEHIND=True)
+    def test_write_behind_views_are_flushed(self):
+        # Views other tests left pending for a movie with the same id land first.
+        counters.flush_movie_views()
+        before = self.views()
+        self.assertEqual(self.client.get(self.url).json()['views'], before + 1)
+        self.assertEqual(self.views(), before)
+
+        counters.flush_movie_views()
+        self.assertEqual(self.views(), before + 1)
+
+
+class CatalogPaginationTests(TestCase):
+
+    def setUp(self):
+        self.movies = seed_movies(5)
+
+    def pages(self, **params):
+        ids, url = [], '/api/movies/'
+        while url:
+            data = self.client.get(url, {'page_size': 2, **params} if url == '/api/movies/' else None).json()
+            ids.extend(movie['id'] for movie in data['results'])
+            url = data['next']
+        return ids
+
+    def test_cursor_walks_the_catalog_newest_first(self):
+        expected = list(Movie.objects.order_by('-created_at', '-id').values_list('id', flat=True))
+        self.assertEqual(self.pages(), expected)
+
+    def test_cursor_walks_search_results_by_rank(self):
+        ids = self.pages(search='bench')
+        self.assertEqual(sorted(ids), sorted(movie.id for movie in self.movies))
+
+    def test_invalid_cursor(self):
+        self.assertEqual(self.client.get('/api/movies/', {'cursor': 'not-a-cursor'}).status_code, 404)
+
+
+class EstimateCountTests(TestCase):
+
+    def setUp(self):
+        self.prefix = f'count-{uuid.uuid4().hex[:8]}'
+        seed_movies(3, prefix=self.prefix)
+        self.queryset = Movie.objects.filter(slug__startswith=self.prefix)
+
+    @skipUnless(connection.vendor != 'postgresql', 'PostgreSQL answers from the planner estimate')
+    def test_exact_count_is_cached(self):
+        self.assertEqual(estimate_count(self.queryset), 3)
+        seed_movies(1, prefix=f'{self.prefix}-late')
+
+        self.assertEqual(estimate_count(self.queryset), 3)
+        self.assertEqual(estimate_count(Movie.objects.filter(slug__startswith=f'{self.prefix}-late')), 1)
+
+    @skipUnless(connection.vendor == 'postgresql', 'needs the planner')
+    def test_planner_estimate(self):
+        self.assertIsInstance(estimate_count(self.queryset), int)
+
+
+class ConditionalGetTests(TestCase):
+
+    def setUp(self):
+        self.movie = seed_movies(1)[0]
+        self.genre = Genre.objects.create(name='noir')
+        self.url = f'/api/movie/{self.movie.slug}/'
+
+    def etag(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        return response['ETag']
+
+    def assertNotModified(self, etag):
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+    def assertModified(self, etag):
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_unchanged_movie_is_not_modified(self):
+        self.assertNotModified(self.etag())
+
+    def test_comment_changes_the_etag(self):
+        etag = self.etag()
+        user = User.objects.create(username='critic', email='critic@example.com')
+        self.movie.comments.create(user=user, comment='Great')
+        self.assertModified(etag)
+
+    def test_genre_changes_from_either_side_change_the_etag(self):
+        for change in (lambda: self.movie.genre.add(self.genre),
+                       lambda: self.genre.movie_set.clear()):
+            etag = self.etag()
+            change()
+            self.assertModified(etag)
+
+    def test_list_etag_follows_its_cache_tags(self):
+        etag = self.client.get('/api/router/news/')['ETag']
+        self.assertEqual(self.client.get('/api/router/news/', HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        response_cache.bump_tags('news')
+        self.assertEqual(self.client.get('/api/router/news/', HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+
+class SlugAllocationTests(TestCase):
+
+    def setUp(self):
+        self.movies = seed_movies(6)
+        for movie, slug in zip(self.movies, ['noir', 'noir-2', 'noir-10', 'noir-abc', 'noir-' + '9' * 19, 'noirish-3']):
+            Movie.objects.filter(pk=movie.pk).update(slug=slug)
+
+    def new_movie(self, title):
+        template = self.movies[0]
+        return Movie(category_id=template.category_id, country_id=template.country_id,
+                     language_id=template.language_id, title=title, description='-',
+                     trailer_url='https://example.com/trailer', picture='noir.jpg', release_date=template.release_date)
+
+    def test_next_suffix_is_one_above_the_highest(self):
+        self.assertEqual(allocate_slug(Movie.objects.all(), 'noir'), 'noir-11')
+        self.assertEqual(allocate_slug(Movie.objects.all(), 'noirish'), 'noirish-4')
+        self.assertEqual(allocate_slug(Movie.objects.all(), 'western'), 'western')
+
+    def test_save_allocates_and_keeps_the_slug(self):
+        movie = self.new_movie('Noir')
+        movie.save()
+        self.assertEqual(movie.slug, 'noir-11')
+
+        movie.views = 5
+        movie.save(update_fields=['views'])
+        movie.save()
+        self.assertEqual(Movie.objects.get(pk=movie.pk).slug, 'noir-11')
+
+    def test_collision_is_retried_with_a_fresh_slug(self):
+        allocations = iter(['noir', 'noir-11'])
+
+        with mock.patch('app.models.base.allocate_slug', side_effect=lambda *args, **kwargs: next(allocations)):
+            movie = self.new_movie('Noir')
+            movie.save()
+
+        self.assertEqual(movie.slug, 'noir-11')
+
+
+class CommentCountTests(TestCase):
+
+    def setUp(self):
+        self.movie = seed_movies(1)[0]
+        self.user = User.objects.create(username='critic', email='critic@example.com')
+
+    def comment_count(self):
+        return Movie.objects.values_list('comment_count', flat=True).get(pk=self.movie.pk)
+
+    def test_count_follows_creates_edits_and_deletes(self):
+        first = MovieComment.objects.create(user=self.user, movie=self.movie, comment='first')
+        second = MovieComment.objects.create(user=self.user, movie=self.movie, comment='second')
+        self.assertEqual(self.comment_count(), 2)
+
+        first.comment = 'edited'
+        first.save()
+        self.assertEqual(self.comment_count(), 2)
+
+        first.delete()
+        self.assertEqual(self.comment_count(), 1)
+        second.delete()
+        self.assertEqual(self.comment_count(), 0)
+
+    def test_count_never_goes_negative(self):
+        comment = MovieComment.objects.create(user=self.user, movie=self.movie, comment='first')
+        Movie.objects.filter(pk=self.movie.pk).update(comment_count=0)
+
+        comment.delete()
+
+        self.assertEqual(self.comment_count(), 0)
+
+
+class MovieCommentListTests(TestCase):
+
+    def setUp(self):
+        self.movie = seed_movies(1)[0]
+        user = User.objects.create(username='reader', email='reader@example.com')
+        MovieComment.objects.create(user=user, movie=self.movie, comment='worth it')
+
+    def test_unknown_movie_is_404(self):
+        response = APIClient().get('/api/movie/no-such-movie/comments/')
+
+        self.assertEqual(response.status_code, 404)
+
+    def test_known_movie_lists_its_comments(self):
+        response = APIClient().get(f'/api/movie/{self.movie.slug}/comments/')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([row['comment'] for row in response.data['results']], ['worth it'])
+
+
+class CollectedMoneyTests(TestCase):
+
+    def setUp(self):
+        self.movie, self.other_movie = seed_movies(2)
+        self.campaign = TranslateMovies.objects.create(movie=self.movie, movie_fund=100)
+        self.addCleanup(cache.delete, counters.COLLECTED_MONEY_KEY.format(self.campaign.pk))
+        cache.delete(counters.COLLECTED_MONEY_KEY.format(self.campaign.pk))
+
+    def donate(self, amount):
+        with self.captureOnCommitCallbacks(execute=True):
+            counters.add_collected_money(self.campaign.pk, amount)
+        self.campaign.refresh_from_db()
+
+    @override_settings(COLLECTED_MONEY_SHARDS=4)
+    def test_totals_sum_every_shard(self):
+        for amount in (5, 10, 15, 20):
+            self.donate(amount)
+
+        self.assertLessEqual(CollectedMoneyShard.objects.filter(translate_movie=self.campaign).count(), 4)
+        self.assertEqual(counters.collected_money_totals([self.campaign.pk]), {self.campaign.pk: 50})
+        self.assertFalse(self.campaign.is_finish)
+
+    def test_totals_are_cached_and_default_to_zero(self):
+        other = TranslateMovies.objects.create(movie=self.other_movie)
+        self.addCleanup(cache.delete, counters.COLLECTED_MONEY_KEY.format(other.pk))
+        cache.delete(counters.COLLECTED_MONEY_KEY.format(other.pk))
+
+        self.donate(30)
+        self.assertEqual(counters.collected_money_totals([self.campaign.pk, other.pk]),
+                         {self.campaign.pk: 30, other.pk: 0})
+
+        self.donate(30)
+        self.assertEqual(counters.collected_money_totals([self.campaign.pk]), {self.campaign.pk: 30})
+
+    def test_campaign_finishes_once_funded(self):
+        self.donate(60)
+        self.assertFalse(self.campaign.is_finish)
+
+        self.donate(40)
+        self.assertTrue(self.campaign.is_finish)
+        self.assertEqual(self.campaign.collected_money, 100)
+
+        self.assertFalse(counters.finish_if_funded(self.campaign.pk))
+
+    def test_sync_copies_shard_sums(self):
+        self.donate(25)
+        self.assertEqual(self.campaign.collected_money, 0)
+
+        self.assertEqual(counters.sync_collected_money(), 1)
+        self.campaign.refresh_from_db()
+        self.assertEqual(self.campaign.collected_money, 25)
+        self.assertEqual(counters.sync_collected_money(), 0)
+
+
+class RecentDonationsTests(TestCase):
+
+    def setUp(self):
+        self.campaign = TranslateMovies.objects.create(movie=seed_movies(1)[0], movie_fund=1000)
+        self.user = User.objects.create(username='donor', email='donor@example.com')
+        self.redis = get_redis_connection('default')
+        donations.forget_recent(self.campaign.pk)
+        self.addCleanup(donations.forget_recent, self.campaign.pk)
+
+    def donate(self, amount):
+        with self.captureOnCommitCallbacks(execute=True):
+            return PaymentTranslateMovie.objects.create(user=self.user, translate_movie=self.campaign, amount=amount)
+
+    def recent_ids(self, translate_movie_id=None):
+        return [item['id'] for item in donations.recent_donations(translate_movie_id)]
+
+    def test_buffer_keeps_the_newest_donations(self):
+        made = [self.donate(amount) for amount in range(1, 4)]
+        self.assertEqual(self.recent_ids(self.campaign.pk), [donation.pk for donation in reversed(made)])
+        self.assertTrue(self.redis.exists(donations.RECENT_DONATIONS_LOADED_KEY.format(self.campaign.pk)))
+
+        made += [self.donate(amount) for amount in range(4, 4 + donations.RECENT_DONATIONS_SIZE)]
+
+        newest = [donation.pk for donation in reversed(made)][:donations.RECENT_DONATIONS_SIZE]
+        self.assertEqual(self.recent_ids(self.campaign.pk), newest)
+        self.assertEqual(self.recent_ids(), newest)
+        self.assertEqual(self.redis.llen(donations.RECENT_DONATIONS_KEY.format(self.campaign.pk)),
+                         donations.RECENT_DONATIONS_SIZE)
+
+    def test_unloaded_buffer_is_not_pushed_to(self):
+        donation = self.donate(5)
+
+        self.assertFalse(self.redis.exists(donations.RECENT_DONATIONS_KEY.format(self.campaign.pk)))
+        self.assertEqual(self.recent_ids(self.campaign.pk), [donation.pk])
+
+    def test_changed_and_deleted_donations_reload(self):
+        first, second = self.donate(5), self.donate(7)
+        self.assertEqual(self.recent_ids(self.campaign.pk), [second.pk, first.pk])
+
+        second.amount = 70
+        with self.captureOnCommitCallbacks(execute=True):
+            second.save()
+        self.assertEqual([item['amount'] for item in donations.recent_donations(self.campaign.pk)], [70, 5])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            second.delete()
+        self.assertEqual(self.recent_ids(self.campaign.pk), [first.pk])
+
+    def test_push_failure_is_logged(self):
+        self.recent_ids(self.campaign.pk)
+
+        with mock.patch.object(Pipeline, 'execute', side_effect=RedisError('down')), \
+                self.assertLogs('app.donations', 'WARNING'):
+            self.donate(5)
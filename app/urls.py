@@ -18,7 +18,9 @@ from app.views import MovieListAPIView, MovieDetailAPIView, MovieByTypeListAPIVi
     PurchaseSubscriptionDeleteAPIView, PaymentSubscriptionCreateAPIView, PaymentPurchasedMovieCreateAPIView, \
     UserCheckBalanceWithTelegramRetrieveAPIView, CreateOrderForMovieListCreateAPIView, \
     CreateOrderForSubscriptionCreateAPIView, NotificationDestroyAPIView, \
-    TranslateMoviesListAPIView, PaymentTranslateMoviesListCreateAPIView, TopDonatersListAPIView, LastDonatesListAPIView
+    TranslateMoviesListAPIView, PaymentTranslateMoviesListCreateAPIView, TopDonatersListAPIView, LastDonatesListAPIView, \
+    MovieCommentListAPIView, MovieAutocompleteAPIView, MovieAccessAPIView, MovieStreamAPIView, MediaStreamView, \
+    SignedMediaView, MovieSeasonsAPIView, EpisodeDetailAPIView
 
 router = DefaultRouter()
 
@@ -54,7 +56,15 @@ urlpatterns = [
     path('category/<str:category>/', MovieByTypeListAPIView.as_view(), name='movie-by-category'),
     path('movie-country/<str:country>/', MovieByCountriesListAPIView.as_view(), name='movie-by-country'),
     path('movies/', MovieListAPIView.as_view(), name='movie-list'),
+    path('movies/autocomplete/', MovieAutocompleteAPIView.as_view(), name='movie-autocomplete'),
+    path('movies/access/', MovieAccessAPIView.as_view(), name='movie-access'),
     path('movie/<slug:slug>/', MovieDetailAPIView.as_view(), name='movie-detail'),
+    path('movie/<slug:slug>/comments/', MovieCommentListAPIView.as_view(), name='movie-comments'),
+    path('movie/<slug:slug>/seasons/', MovieSeasonsAPIView.as_view(), name='movie-seasons'),
+    path('movie/<slug:slug>/episodes/<int:pk>/', EpisodeDetailAPIView.as_view(), name='episode-detail'),
+    path('movie/<slug:slug>/stream/', MovieStreamAPIView.as_view(), name='movie-stream'),
+    path('stream/<str:token>/', MediaStreamView.as_view(), name='media-stream'),
+    path('media/<path:name>', SignedMediaView.as_view(), name='signed-media'),
     path('movie-most-watched/', MovieMostWatchedListAPIView.as_view(), name='movie-most-watched'),
     path('movie-random/', RandomMovieListAPIView.as_view(), name='movie-random'),
     path('movie-most-liked/', MovieMostLikedListAPIView.as_view(), name='movie-most-liked'),
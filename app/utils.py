@@ -1,5 +1,10 @@
 import random
 import hashlib
+import secrets
+from contextlib import contextmanager
+
+from django_redis import get_redis_connection
+from redis.exceptions import WatchError
 
 
 def gen_ran_num():
@@ -11,4 +16,30 @@ def generate_device_id(request):
     user_agent = request.META.get('HTTP_USER_AGENT', '')
     ip = request.META.get('REMOTE_ADDR', '')
     raw = f"{user_agent}-{ip}"
-    return hashlib.sha256(raw.encode()).hexdigest()
\ No newline at end of file
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+
+@contextmanager
+def redis_lock(name, timeout):
+    """
+    Hold a Redis lock for the block, yielding whether it was acquired; callers
+    skip their work when it was not. The lock expires after `timeout` seconds
+    so a crashed holder cannot wedge it, and it is only released by the holder
+    whose token is still stored.
+    """
+    redis = get_redis_connection('default')
+    token = secrets.token_hex(16).encode()
+    acquired = bool(redis.set(name, token, nx=True, ex=timeout))
+    try:
+        yield acquired
+    finally:
+        if acquired:
+            with redis.pipeline() as pipe:
+                try:
+                    pipe.watch(name)
+                    if pipe.get(name) == token:
+                        pipe.multi()
+                        pipe.delete(name)
+                        pipe.execute()
+                except WatchError:
+                    pass
@@ -0,0 +1,110 @@
+from rest_framework import fields, relations
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+
+from app.renditions import RenditionsField
+
+
+class ValuesPlan:
+    """
+    Read-only rendering of a ModelSerializer from `values()` rows.
+
+    The serializer's readable fields are compiled once into (name, column,
+    converter) steps, so a row costs a dict lookup and one call per field
+    instead of a model instance plus DRF field machinery. Output matches
+    `serializer_class(..., many=True).data` key for key and value for value.
+    Only plain model fields, file/image fields, rendition maps, primary-key
+    relations and dotted sources are supported; anything else fails at compile time.
+    """
+
+    def __init__(self, serializer_class):
+        serializer = serializer_class()
+        model = serializer.Meta.model
+        self.steps = []
+        self.url_steps = []
+
+        for field in serializer._readable_fields:
+            if isinstance(field, (fields.SerializerMethodField, relations.ManyRelatedField)) \
+                    or field.source == '*' or hasattr(field, 'fields'):
+                raise ValueError(f'{serializer_class.__name__}.{field.field_name} cannot be rendered from values()')
+            column = field.source.replace('.', '__')
+
+            if isinstance(field, fields.FileField):
+                use_url = getattr(field, 'use_url', api_settings.UPLOADED_FILES_USE_URL)
+                storage = model._meta.get_field(column).storage
+                self.url_steps.append((field.field_name, column, self._file_url(storage, use_url)))
+                convert = None
+            elif isinstance(field, RenditionsField):
+                self.url_steps.append((field.field_name, column, self._renditions(field, model)))
+                convert = None
+            elif isinstance(field, relations.PrimaryKeyRelatedField):
+                convert = field.pk_field.to_representation if field.pk_field is not None else None
+            else:
+                convert = field.to_representation
+            self.steps.append((field.field_name, column, convert))
+
+        self.columns = [column for _, column, _ in self.steps]
+
+    def render(self, rows, request=None):
+        build_url = request.build_absolute_uri if request is not None else None
+        data = []
+        for row in rows:
+            item = {}
+            for name, column, convert in self.steps:
+                value = row[column]
+                item[name] = value if value is None or convert is None else convert(value)
+
+            for name, column, render in self.url_steps:
+                if item[name] is not None:
+                    item[name] = render(item[name], build_url)
+            data.append(item)
+        return data
+
+    @staticmethod
+    def _file_url(storage, use_url):
+        # Same rules as rest_framework.fields.FileField.to_representation.
+        def render(value, build_url):
+            if not value:
+                return None
+            if not use_url:
+                return value
+            url = storage.url(value)
+            return build_url(url) if build_url else url
+        return render
+
+    @staticmethod
+    def _renditions(field, model):
+        storage = model._meta.get_field(field.file_field).storage
+        return lambda value, build_url: field.render(value, storage, build_url)
+
+
+class ValuesListMixin:
+    """
+    Render list pages through a compiled `ValuesPlan` of `serializer_class`.
+
+    Set `values_plan_enabled = False` on a view to fall back to the serializer.
+    """
+    values_plan_enabled = True
+    _values_plans = {}
+
+    def get_values_plan(self):
+        serializer_class = self.get_serializer_class()
+        if serializer_class not in self._values_plans:
+            self._values_plans[serializer_class] = ValuesPlan(serializer_class)
+        return self._values_plans[serializer_class]
+
+    def list(self, request, *args, **kwargs):
+        if not self.values_plan_enabled:
+            return super().list(request, *args, **kwargs)
+
+        plan = self.get_values_plan()
+        columns = dict.fromkeys([*plan.columns, 'id'])
+        ordering = getattr(self, 'ordering', None)
+        if ordering:
+            columns[ordering.lstrip('-')] = None
+        queryset = self.filter_queryset(self.get_queryset()).values(*columns)
+
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(plan.render(page, request))
+        return Response(plan.render(queryset, request))
@@ -1,16 +1,20 @@
 
-from django.contrib.postgres.search import TrigramSimilarity
+from datetime import datetime, timezone as dt_timezone
+
+from django.conf import settings
 from django.core.cache import cache
 from django.db import transaction
-from django.db.models import Count, Sum
+from django.db.models import Max, OuterRef, Subquery, F, Case, When, Value
+from django.http import Http404, HttpResponseForbidden
 from django.shortcuts import get_object_or_404
+from django.urls import reverse
+from django.utils import timezone
+from django.views import View
 from drf_spectacular.utils import extend_schema
 from redis.commands.search import Search
 from rest_framework import status
-from rest_framework.filters import SearchFilter
 from rest_framework.generics import CreateAPIView, UpdateAPIView, GenericAPIView, DestroyAPIView, ListCreateAPIView
 from rest_framework.generics import ListAPIView, RetrieveAPIView
-from rest_framework.pagination import PageNumberPagination
 from rest_framework.permissions import IsAuthenticated, IsAdminUser, AllowAny
 from rest_framework.response import Response
 from rest_framework.views import APIView
@@ -18,12 +22,13 @@ from rest_framework.viewsets import ModelViewSet
 from rest_framework_simplejwt.tokens import RefreshToken
 from app.models.base import NonePaginationListAPIView
 from app.models.movie import Movie, Subscribers, Message, \
-    AdminAnswer, News, FavouriteMovies, MovieComment, Chat, LastSearch, TranslateMovies
+    AdminAnswer, News, FavouriteMovies, MovieComment, Chat, TranslateMovies, SimilarMovie, Episode
 
 from app.models.orders import Purchase, PurchaseMovie, Notification, OrderSubscription, Payment, PaymentSubscription, \
-    OrderSubscriptionItem, PaymentTranslateMovie
+    OrderSubscriptionItem, PaymentTranslateMovie, LedgerEntry
 
 from app.models.users import User, UserDevice
+from app.pagination import MovieCommentPagination, CatalogPagination
 from app.serializer import MovieModelSerializer, MovieDetailModelSerializer, PurchaseModelSerializer, \
     PurchaseMovieModelSerializer, NotificationModelSerializer, UserBalanceModelSerializer, \
     UserFillBalanceModelSerializer, PaymentModelSerializer, SubscribersModelSerializer, \
@@ -31,11 +36,26 @@ from app.serializer import MovieModelSerializer, MovieDetailModelSerializer, Pur
     UserCheckBalanceModelSerializer, OTPVerifySerializer, PreRegisterSerializer, UserLoginSerializer, \
     NewsModelSerializer, FavouritesMoviesModelSerializer, \
     CommentModelSerializer, UserMessageSerializer, AdminMessageSerializer, \
-    UserSearchModelSerializer, UpdateTranslateMovieStatusModelSerializer, PaymentMovieModelSerializer, \
+    UserSearchSerializer, UpdateTranslateMovieStatusModelSerializer, PaymentMovieModelSerializer, \
     PaymentSubscriptionModelSerializer, CreateOrderForMovieModelSerializer, OrderSubscriptionModelSerializer, \
     OrderSubscriptionItemModelSerializer, TranslateMovieModelSerializer, PaymentTranslateMovieModelSerializer, \
-    TopDonaterModelSerializer, LastDonatesModelSerializer
-
+    TopDonaterModelSerializer, LastDonatesModelSerializer, MovieCommentListModelSerializer, \
+    EpisodeDetailModelSerializer
+
+from app import wallet
+from app.autocomplete import title_index
+from app.conditional import ConditionalGetMixin
+from app.counters import incr_movie_views, add_collected_money, collected_money_totals
+from app.donations import leaderboard, recent_donations
+from app.entitlements import has_movie_access, check_access
+from app.sampling import sample_movie_ids
+from app.response_cache import CachedResponseMixin
+from app.search import search_movies
+from app.search_history import record_search, recent_searches
+from app.series import season_tree
+from app.signed_media import current_window, private_storage, verify
+from app.streaming import open_session, resolve_session, stream_response
+from app.values_plan import ValuesListMixin
 from app.task import send_otp_email
 from app.utils import gen_ran_num, generate_device_id
 
@@ -140,23 +160,25 @@ class UserLoginGenericAPIView(GenericAPIView):
 
 
 @extend_schema(tags=['movie'])
-class PremierMovies(ListAPIView):
-    queryset = Movie.objects.all().order_by('-created_at')
+class PremierMovies(ConditionalGetMixin, CachedResponseMixin, ValuesListMixin, ListAPIView):
+    queryset = Movie.objects.all()
     serializer_class = MovieModelSerializer
-    pagination_class = PageNumberPagination
-
-    # pagination_class.page_size = 10
+    pagination_class = CatalogPagination
+    ordering = '-created_at'
+    cache_tags = ('movie',)
+    weak_etag = True
 
     def get_queryset(self):
         return super().get_queryset().filter(is_premier=True)
 
 
 @extend_schema(tags=['movie'])
-class MovieByCountriesListAPIView(ListAPIView):
+class MovieByCountriesListAPIView(CachedResponseMixin, ValuesListMixin, ListAPIView):
     queryset = Movie.objects.all()
     serializer_class = MovieModelSerializer
-
-    pagination_class = PageNumberPagination
+    pagination_class = CatalogPagination
+    ordering = '-created_at'
+    cache_tags = ('movie', 'countries')
 
     def get_queryset(self):
         country = self.kwargs.get('country')
@@ -170,39 +192,63 @@ class MovieCommentsModelViewSet(ModelViewSet):
 
 
 @extend_schema(tags=['movie'])
-class MostCommentedMoviesListAPIView(NonePaginationListAPIView):
-
-    queryset = Movie.objects.annotate(
-        total_comments=Count('comments')
-    ).order_by('-total_comments')
+class MostCommentedMoviesListAPIView(ValuesListMixin, ListAPIView):
+    queryset = Movie.objects.all()
     serializer_class = MovieModelSerializer
     permission_classes = [AllowAny]
+    pagination_class = CatalogPagination
+    ordering = '-comment_count'
 
 
 @extend_schema(tags=['movie'])
-class MovieMostWatchedListAPIView(ListAPIView):
-    queryset = Movie.objects.order_by('-views')
+class MovieMostWatchedListAPIView(CachedResponseMixin, ValuesListMixin, ListAPIView):
+    queryset = Movie.objects.all()
     serializer_class = MovieModelSerializer
+    pagination_class = CatalogPagination
+    ordering = '-views'
+    cache_tags = ('movie',)
 
 
 @extend_schema(tags=['movie'])
-class MovieMostLikedListAPIView(ListAPIView):
-    queryset = Movie.objects.order_by('-rate')
+class MovieMostLikedListAPIView(CachedResponseMixin, ValuesListMixin, ListAPIView):
+    queryset = Movie.objects.all()
     serializer_class = MovieModelSerializer
+    pagination_class = CatalogPagination
+    ordering = '-rate'
+    cache_tags = ('movie',)
 
 
 @extend_schema(tags=['movie'])
-class RandomMovieListAPIView(ListAPIView):
+class RandomMovieListAPIView(NonePaginationListAPIView):
     serializer_class = MovieModelSerializer
+    sample_size = 5
 
     def get_queryset(self):
-        return Movie.objects.order_by('?')[:5]
+        params = self.request.query_params
+        access_type = params.get('access_type')
+        if access_type not in Movie.AccessType.values:
+            access_type = None
+
+        ids = sample_movie_ids(
+            self.sample_size,
+            genre=int(params['genre']) if params.get('genre', '').isdigit() else None,
+            access_type=access_type,
+            premier=params.get('premier') in ('1', 'true', 'True'),
+        )
+        if not ids:
+            return Movie.objects.none()
+        # Keep the sampled order; the model's default ordering would put the newest titles first every time.
+        position = Case(*[When(id=movie_id, then=Value(i)) for i, movie_id in enumerate(ids)])
+        return Movie.objects.filter(id__in=ids).order_by(position)
 
 
 @extend_schema(tags=['movie'])
-class MovieByTypeListAPIView(ListAPIView):
+class MovieByTypeListAPIView(CachedResponseMixin, ValuesListMixin, ListAPIView):
     queryset = Movie.objects.all()
     serializer_class = MovieModelSerializer
+    pagination_class = CatalogPagination
+    ordering = '-created_at'
+    cache_tags = ('movie', 'category')
 
     def get_queryset(self):
         category = self.kwargs.get('category', '')
@@ -210,55 +256,131 @@ class MovieByTypeListAPIView(ListAPIView):
 
 
 @extend_schema(tags=['movie'])
-class MovieByGenreListAPIView(ListAPIView):
+class MovieByGenreListAPIView(CachedResponseMixin, ValuesListMixin, ListAPIView):
     queryset = Movie.objects.all()
     serializer_class = MovieModelSerializer
-
+    pagination_class = CatalogPagination
+    ordering = '-created_at'
+    cache_tags = ('movie', 'genre')
 
     def get_queryset(self):
         genre_name = self.kwargs.get('genre', '')
-        return super().get_queryset().filter(genre__name__icontains=genre_name)
+        return super().get_queryset().filter(genre__name__icontains=genre_name).distinct()
 
 
 @extend_schema(tags=['movie'])
-class MovieListAPIView(ListAPIView):
+class MovieListAPIView(ValuesListMixin, ListAPIView):
     queryset = Movie.objects.all()
     serializer_class = MovieModelSerializer
-    pagination_class = None
-    filter_backends = [SearchFilter]
+    pagination_class = CatalogPagination
+
+    @property
+    def ordering(self):
+        # Search results page by rank; the cursor keeps deep pages as cheap as the first.
+        return '-rank' if self.request.query_params.get('search') is not None else '-created_at'
 
     def get_queryset(self):
         queryset = Movie.objects.all()
         query = self.request.query_params.get('search')
         if query is not None:
-            queryset = queryset.annotate(
-                similarity=TrigramSimilarity('title', query)
-            ).filter(similarity__gte=0.2).order_by('-similarity')
-
-
+            queryset = search_movies(queryset, query)
             if self.request.user.is_authenticated:
-                LastSearch.objects.create(
-                    user=self.request.user,
-                    search=query.strip(),
-                )
+                record_search(self.request.user.id, query)
 
         return queryset
 
 
 @extend_schema(tags=['movie'])
-class MovieDetailAPIView(RetrieveAPIView):
+class MovieAutocompleteAPIView(APIView):
+    authentication_classes = []
+    permission_classes = [AllowAny]
+    max_limit = 20
+
+    def get(self, request, *args, **kwargs):
+        try:
+            limit = min(int(request.query_params.get('limit', 10)), self.max_limit)
+        except ValueError:
+            limit = 10
+
+        return Response(title_index.search(request.query_params.get('q', ''), limit))
+
+
+@extend_schema(tags=['movie'])
+class MovieAccessAPIView(APIView):
+    permission_classes = [AllowAny]
+    max_ids = 300
+
+    def get(self, request, *args, **kwargs):
+        try:
+            ids = list(dict.fromkeys(int(pk) for pk in request.query_params.get('ids', '').split(',') if pk.strip()))
+        except ValueError:
+            return Response({'message': 'ids must be comma-separated integers'}, status=status.HTTP_400_BAD_REQUEST)
+        if len(ids) > self.max_ids:
+            return Response({'message': f'At most {self.max_ids} ids per request'}, status=status.HTTP_400_BAD_REQUEST)
+
+        movies = Movie.objects.filter(id__in=ids).only('id', 'access_type', 'subscribe_id')
+        access = check_access(request.user, movies)
+        return Response([{'id': pk, 'has_access': access[pk]} for pk in ids if pk in access])
+
+
+@extend_schema(tags=['movie'])
+class MovieDetailAPIView(ConditionalGetMixin, RetrieveAPIView):
     queryset = Movie.objects.all()
     serializer_class = MovieDetailModelSerializer
     lookup_field = 'slug'
+    # Deliberately not part of the ETag: the live view counters of the movie and
+    # of its similar-movie cards. Every request bumps them, 304s included, so an
+    # ETag carrying them would never match twice; a revalidated copy shows
+    # counters from when it was fetched. Everything else in the payload
+    # (comments and comment_count, the similar list and its cards, access and
+    # the signing window) is in the fingerprint.
+    weak_etag = True
+
+    def get_object_fingerprint(self, request):
+        comments = MovieComment.objects.filter(movie=OuterRef('pk')).order_by().values('movie')
+        similar = SimilarMovie.objects.filter(movie=OuterRef('pk')).order_by().values('movie')
+        row = Movie.objects.filter(slug=self.kwargs['slug']).values(
+            'id', 'updated_at', 'access_type', 'subscribe_id', 'comment_count',
+        ).annotate(
+            comments_at=Subquery(comments.annotate(last=Max('updated_at')).values('last')),
+            similar_version=Subquery(similar.annotate(last=Max('id')).values('last')),
+            similar_at=Subquery(similar.annotate(last=Max('similar__updated_at')).values('last')),
+        ).first()
+        if row is None:
+            return None
+
+        self.fingerprint_movie_id = row['id']
+        access = has_movie_access(request.user, Movie(
+            id=row['id'], access_type=row['access_type'], subscribe_id=row['subscribe_id']))
+        last_modified = max(filter(None, (row['updated_at'], row['comments_at'], row['similar_at'])))
+        # The signed video URL is re-issued every window; a cached copy must not outlive it.
+        window = current_window() if access else None
+        if window is not None:
+            last_modified = max(last_modified, datetime.fromtimestamp(window, dt_timezone.utc))
+        parts = (row['comment_count'], row['similar_version'], access, window)
+        return parts, last_modified
+
+    def on_not_modified(self, request):
+        if settings.MOVIE_VIEWS_WRITE_BEHIND:
+            incr_movie_views(self.fingerprint_movie_id)
+        else:
+            Movie.objects.filter(pk=self.fingerprint_movie_id).update(views=F('views') + 1)
 
     def retrieve(self, request, *args, **kwargs):
+        return self.conditional(self.get_object_fingerprint, self.render_movie, request, *args, **kwargs)
+
+    def render_movie(self, request, *args, **kwargs):
         user = request.user
         movie = self.get_object()
-        data = self.get_serializer(movie).data
 
-        with transaction.atomic():
+        if settings.MOVIE_VIEWS_WRITE_BEHIND:
+            movie.views += incr_movie_views(movie.id)
+        else:
+            # A conditional UPDATE, not save(): no lost increments and no post_save fan-out per view.
+            Movie.objects.filter(pk=movie.pk).update(views=F('views') + 1)
             movie.views += 1
-            movie.save(update_fields=['views'])
+
+        data = self.get_serializer(movie).data
 
         if self.has_video_access(user, movie) is False:
             data.pop('video', None)
@@ -266,36 +388,105 @@ class MovieDetailAPIView(RetrieveAPIView):
         return Response(data)
 
     def has_video_access(self, user, movie):
+        return has_movie_access(user, movie)
 
-        if movie.access_type == 'PURCHASE':
-            return self.has_purchased(user, movie)
 
-        elif movie.access_type == 'FREE':
-            return True
+@extend_schema(tags=['movie'])
+class MovieStreamAPIView(APIView):
+    """Check entitlement once and hand the player a session URL for Range requests (`?episode=<id>` for series)."""
+    permission_classes = [AllowAny]
 
-        if movie.subscribe == 'Lite' and movie.access_type == 'SUBSCRIPTION':
-            return user.subscription in ['LITE', 'PRO', 'PREMIUM']
+    def get(self, request, slug):
+        movie = get_object_or_404(Movie.objects.only('id', 'access_type', 'subscribe_id'), slug=slug)
+        if not has_movie_access(request.user, movie):
+            return Response({'message': 'You do not have access to this video'}, status=status.HTTP_403_FORBIDDEN)
 
-        elif movie.subscribe == 'Pro' and movie.access_type == 'SUBSCRIPTION':
-            return user.subscription in ['PRO', 'PREMIUM']
-        elif movie.subscribe == 'Premium' and movie.access_type == 'SUBSCRIPTION':
-            return user.subscription == 'PREMIUM'
+        episode = request.query_params.get('episode')
+        if episode:
+            if not episode.isdigit() or not Episode.objects.filter(pk=episode, season__movie=movie).exists():
+                return Response({'message': 'Episode not found'}, status=status.HTTP_404_NOT_FOUND)
+            token = open_session('app.episode', episode)
+        else:
+            token = open_session('app.movie', movie.id)
+        if token is None:
+            return Response({'message': 'Video is not uploaded yet'}, status=status.HTTP_404_NOT_FOUND)
 
-        return False
+        return Response({
+            'url': request.build_absolute_uri(reverse('media-stream', args=[token])),
+            'expires_in': settings.STREAM_SESSION_TTL,
+        })
 
-    def has_purchased(self, user, movie):
-        return PurchaseMovie.objects.filter(
-            purchase__user=user,
-            movie=movie,
-            status='ACCEPTED'
-        ).exists()
 
+@extend_schema(tags=['movie'])
+class MovieSeasonsAPIView(APIView):
+    """Seasons and episodes of a series with per-season and total runtime, cached per movie."""
+    permission_classes = [AllowAny]
+
+    def get(self, request, slug):
+        movie_id = Movie.objects.filter(slug=slug).values_list('id', flat=True).first()
+        if movie_id is None:
+            raise Http404
+        return Response(season_tree(movie_id))
+
+
+@extend_schema(tags=['movie'])
+class EpisodeDetailAPIView(RetrieveAPIView):
+    serializer_class = EpisodeDetailModelSerializer
+
+    def get_queryset(self):
+        return Episode.objects.filter(season__movie__slug=self.kwargs['slug']).select_related(
+            'season__movie').only('id', 'title', 'duration', 'video', 'season__season_number',
+                                  'season__movie__id', 'season__movie__access_type', 'season__movie__subscribe_id')
+
+    def retrieve(self, request, *args, **kwargs):
+        episode = self.get_object()
+        data = self.get_serializer(episode).data
+        if not has_movie_access(request.user, episode.season.movie):
+            data.pop('video', None)
+        return Response(data)
+
+
+class MediaStreamView(View):
+    """
+    Bytes for a stream session. A plain Django view: players send no JWT, and
+    every seek is a new request, so it skips DRF and costs one Redis lookup.
+    """
+
+    def get(self, request, token):
+        session = resolve_session(token)
+        if session is None:
+            raise Http404('Stream session expired')
+        return stream_response(request, *session)
+
+
+class SignedMediaView(View):
+    """Serve a media file (with Range support) to whoever holds a valid signed URL; no database access."""
+
+    def get(self, request, name):
+        if not verify(name, request.GET):
+            return HttpResponseForbidden('Invalid or expired signature')
+        return stream_response(request, private_storage(), name)
+
+
+
+@extend_schema(tags=['movie'])
+class MovieCommentListAPIView(ListAPIView):
+    serializer_class = MovieCommentListModelSerializer
+    pagination_class = MovieCommentPagination
+
+    def get_queryset(self):
+        # An unknown slug is a 404, not an empty page.
+        movie_id = get_object_or_404(Movie.objects.values_list('id', flat=True), slug=self.kwargs['slug'])
+        return MovieComment.objects.filter(movie_id=movie_id).select_related('user')
 
 
 @extend_schema(tags=['movie'])
-class MovieNewsListAPIView(ListAPIView):
+class MovieNewsListAPIView(CachedResponseMixin, ListAPIView):
     queryset = News.objects.all()
     serializer_class = NewsModelSerializer
+    pagination_class = CatalogPagination
+    ordering = '-created_at'
+    cache_tags = ('news',)
 
 
 @extend_schema(tags=['movie'])
@@ -450,17 +641,26 @@ class PaymentSubscriptionCreateAPIView(CreateAPIView):
             return Response({'message': 'You already have this Subscription!'}, status=status.HTTP_400_BAD_REQUEST)
 
         if payment_method == 'BALANCE' and order.status == 'PENDING':
-            if user.balance < 0 and user.balance < order.get_price:
+            amount = wallet.to_amount(order.get_price)
+            completed_at = timezone.now()
+            try:
+                with transaction.atomic():
+                    # Claim the order first so two concurrent payments cannot both be charged.
+                    if not OrderSubscriptionItem.objects.filter(pk=order.id, status='PENDING').update(
+                            status='COMPLETED', completed_at=completed_at):
+                        return Response({'message': 'You already have this Subscription!'},
+                                        status=status.HTTP_400_BAD_REQUEST)
+                    # Free items are claimed without touching the wallet.
+                    if amount:
+                        wallet.debit(user.id, amount, LedgerEntry.Kind.SUBSCRIPTION,
+                                     reference=f'order-subscription-item:{order.id}')
+                    order.status = "COMPLETED"
+                    order.completed_at = completed_at
+                    order.save(update_fields=['status', 'completed_at', 'updated_at'])
+                    serializer.save(order=order, status='COMPLETED')
+            except wallet.InsufficientFunds:
                 return Response({'message': 'Not enough funds!'}, status=status.HTTP_400_BAD_REQUEST)
-
-            with transaction.atomic():
-                user.balance -= order.get_price
-                print(user.balance)
-                user.save()
-                order.status = "COMPLETED"
-                order.save()
-                serializer.save(order=order, status='COMPLETED')
-                return Response({'message': 'Payment succeeded!'}, status=status.HTTP_200_OK)
+            return Response({'message': 'Payment succeeded!'}, status=status.HTTP_200_OK)
 
 
         serializer.save()
@@ -478,20 +678,24 @@ class PaymentPurchasedMovieCreateAPIView(CreateAPIView):
         pk = serializer.validated_data.get('purchase_movie')
         payment_method = serializer.validated_data.get('payment_method')
         purchase_movie = get_object_or_404(PurchaseMovie, pk=pk.id)
-        price = purchase_movie.movie.price
-
+        amount = wallet.to_amount(purchase_movie.movie.price)
 
         if payment_method == 'BALANCE':
-            if user.balance >= 0 and user.balance >= price:
-                user.balance -= price
-                user.save()
-                purchase_movie.status = 'ACCEPTED'
-                purchase_movie.save()
-
-                serializer.save(purchase_movie=purchase_movie)
-                return Response({'message': 'Payment successfully created!'}, status=status.HTTP_201_CREATED)
-
-            return Response({'message': 'Not enough money!'}, status=status.HTTP_400_BAD_REQUEST)
+            try:
+                with transaction.atomic():
+                    # Claim the purchase first so two concurrent payments cannot both be charged.
+                    if not PurchaseMovie.objects.filter(pk=purchase_movie.id, status='PENDING').update(status='ACCEPTED'):
+                        return Response({'message': 'Movie is already paid!'}, status=status.HTTP_400_BAD_REQUEST)
+                    # Free movies (price 0 or unset) are accepted without touching the wallet.
+                    if amount:
+                        wallet.debit(user.id, amount, LedgerEntry.Kind.MOVIE, reference=f'purchase-movie:{purchase_movie.id}')
+                    purchase_movie.status = 'ACCEPTED'
+                    purchase_movie.save(update_fields=['status', 'updated_at'])
+
+                    serializer.save(purchase_movie=purchase_movie)
+            except wallet.InsufficientFunds:
+                return Response({'message': 'Not enough money!'}, status=status.HTTP_400_BAD_REQUEST)
+            return Response({'message': 'Payment successfully created!'}, status=status.HTTP_201_CREATED)
 
         serializer.save()
         return Response({'message': 'Payment Successfully created!'}, status=status.HTTP_201_CREATED)
@@ -564,8 +768,7 @@ class UserFillBalanceAPIView(UpdateAPIView):
         amount = serializer.validated_data['amount']
 
         with transaction.atomic():
-            instance.balance += amount
-            instance.save()
+            wallet.credit(instance.id, amount, LedgerEntry.Kind.FILL)
 
             Notification.objects.create(
                 user=self.request.user,
@@ -575,7 +778,7 @@ class UserFillBalanceAPIView(UpdateAPIView):
 
         return Response({'status': 'success',
                          'Added amount': amount,
-                         'current_balance': instance.balance, }, status=status.HTTP_200_OK)
+                         'current_balance': wallet.balance(instance.id), }, status=status.HTTP_200_OK)
 
 
 @extend_schema(tags=['telegram'])
@@ -586,21 +789,19 @@ class FillBalanceWithTelegramAPIView(GenericAPIView):
 
         serializer.is_valid(raise_exception=True)
 
-        telegram_id = request.data.get('telegram_id')
-        amount = request.data.get('amount')
+        telegram_id = serializer.validated_data['telegram_id']
+        amount = serializer.validated_data['amount']
 
         with transaction.atomic():
 
-            try:
-                user = User.objects.select_for_update().get(telegram_id=telegram_id)
-            except User.DoesNotExist:
+            user_id = User.objects.filter(telegram_id=telegram_id).values_list('id', flat=True).first()
+            if user_id is None:
                 return Response({'message': 'User does not exist'}, status=status.HTTP_404_NOT_FOUND)
 
-            user.balance += amount
-            user.save()
+            wallet.credit(user_id, amount, LedgerEntry.Kind.TELEGRAM_FILL, reference=f'telegram:{telegram_id}')
 
             Notification.objects.create(
-                user=user,
+                user_id=user_id,
                 message=f"Your balance was filled by {amount}!",
                 notification_type='BALANCE_ADD'
             )
@@ -683,9 +884,12 @@ class AdminMessageModelViewSet(ModelViewSet):
 
 
 @extend_schema(tags=['news'])
-class NewsModelViewSet(ModelViewSet):
+class NewsModelViewSet(ConditionalGetMixin, ModelViewSet):
     queryset = News.objects.all()
     serializer_class = NewsModelSerializer
+    pagination_class = CatalogPagination
+    ordering = '-created_at'
+    fingerprint_tags = ('news',)
 
     def get_permissions(self):
         if self.action in ['list', 'retrieve']:
@@ -698,19 +902,25 @@ class NewsModelViewSet(ModelViewSet):
 
 @extend_schema(tags=['auth'])
 class UserLastSearchListView(ListAPIView):
-    queryset = LastSearch.objects.all()
-    serializer_class = UserSearchModelSerializer
+    serializer_class = UserSearchSerializer
     permission_classes = [IsAuthenticated]
 
     def get_queryset(self):
-        return super().get_queryset().filter(user=self.request.user)
+        return recent_searches(self.request.user.id)
 
 
 @extend_schema(tags=['Translate-Movies'])
 class TranslateMoviesListAPIView(NonePaginationListAPIView):
-    queryset = TranslateMovies.objects.all()
+    queryset = TranslateMovies.objects.select_related('movie')
     serializer_class = TranslateMovieModelSerializer
 
+    def list(self, request, *args, **kwargs):
+        campaigns = list(self.filter_queryset(self.get_queryset()))
+        # One cache round trip (and at most one shard query) for the whole page.
+        context = {**self.get_serializer_context(),
+                   'collected_money': collected_money_totals([campaign.id for campaign in campaigns])}
+        return Response(self.get_serializer_class()(campaigns, many=True, context=context).data)
+
 
 @extend_schema(tags=['Translate-Movies'])
 class PaymentTranslateMoviesListCreateAPIView(CreateAPIView):
@@ -726,23 +936,17 @@ class PaymentTranslateMoviesListCreateAPIView(CreateAPIView):
         translate_movie = serializer.validated_data.get('translate_movie')
 
         try:
-            user = User.objects.get(telegram_id=telegram_id)
+            user = User.objects.only('id').get(telegram_id=telegram_id)
         except User.DoesNotExist:
             return Response({'message': 'Telegram ID does not exist'}, status=status.HTTP_404_NOT_FOUND)
 
-        movie = get_object_or_404(TranslateMovies, id=translate_movie.id)
-
-        with transaction.atomic():
-            if user.balance < amount:
-                return Response({'message': 'Not Enough Money!'}, status=status.HTTP_400_BAD_REQUEST)
-
-            user.balance -= amount
-            movie.collected_money += amount
-
-            user.save(update_fields=['balance'])
-            movie.save(update_fields=['collected_money'])
-
-            serializer.save(user=user)
+        try:
+            with transaction.atomic():
+                wallet.debit(user.id, amount, LedgerEntry.Kind.DONATION, reference=f'translate-movie:{translate_movie.id}')
+                add_collected_money(translate_movie.id, amount)
+                serializer.save(user=user)
+        except wallet.InsufficientFunds:
+            return Response({'message': 'Not Enough Money!'}, status=status.HTTP_400_BAD_REQUEST)
 
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
@@ -752,18 +956,19 @@ class TopDonatersListAPIView(NonePaginationListAPIView):
     serializer_class = TopDonaterModelSerializer
 
     def get_queryset(self):
-        return (
-            PaymentTranslateMovie.objects
-            .values('user', 'user__username')
-            .annotate(donat=Sum('amount'))
-            .order_by('-donat')[:10]
-        )
+        # `?translate_movie=<id>` narrows the board to one campaign.
+        translate_movie = self.request.query_params.get('translate_movie')
+        return leaderboard(int(translate_movie) if translate_movie and translate_movie.isdigit() else None)
 
 
 @extend_schema(tags=['Donate'])
 class LastDonatesListAPIView(NonePaginationListAPIView):
-    queryset = PaymentTranslateMovie.objects.all().order_by('-created_at')[:10]
     serializer_class = LastDonatesModelSerializer
 
+    def list(self, request, *args, **kwargs):
+        # `?translate_movie=<id>` narrows the feed to one campaign.
+        translate_movie = request.query_params.get('translate_movie')
+        return Response(recent_donations(int(translate_movie) if translate_movie and translate_movie.isdigit() else None))
+
 
 
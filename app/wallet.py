@@ -0,0 +1,58 @@
+from decimal import Decimal, ROUND_HALF_UP
+
+from django.db import transaction
+from django.db.models import F
+
+from app.models.orders import LedgerEntry
+from app.models.users import User
+
+
+class InsufficientFunds(Exception):
+    pass
+
+
+def to_amount(price):
+    """
+    Whole balance units for a model price. Balances and ledger rows are
+    integers, so a price is converted exactly once, here, before it reaches
+    debit(); a missing price counts as free and fractions round half up.
+    """
+    if price is None:
+        return 0
+    return int(Decimal(price).quantize(Decimal(1), rounding=ROUND_HALF_UP))
+
+
+def _check_amount(amount):
+    if not isinstance(amount, int):
+        raise TypeError(f'amount must be an int, got {amount!r}; convert prices with to_amount()')
+    if amount <= 0:
+        raise ValueError(f'amount must be positive, got {amount}')
+
+
+def debit(user_id, amount, kind, reference=''):
+    """
+    Take `amount` from the user's balance and record it in the ledger.
+
+    The balance check and the decrement are one conditional UPDATE, so
+    concurrent debits can never overdraw or lose each other's writes, and no
+    other column of the user row is touched. Raises InsufficientFunds (rolling
+    back the caller's atomic block) when the balance is too low.
+    """
+    _check_amount(amount)
+    with transaction.atomic():
+        if not User.objects.filter(pk=user_id, balance__gte=amount).update(balance=F('balance') - amount):
+            raise InsufficientFunds(user_id)
+        return LedgerEntry.objects.create(user_id=user_id, amount=-amount, kind=kind, reference=reference)
+
+
+def credit(user_id, amount, kind, reference=''):
+    """Add `amount` to the user's balance and record it; raises User.DoesNotExist for an unknown user."""
+    _check_amount(amount)
+    with transaction.atomic():
+        if not User.objects.filter(pk=user_id).update(balance=F('balance') + amount):
+            raise User.DoesNotExist(user_id)
+        return LedgerEntry.objects.create(user_id=user_id, amount=amount, kind=kind, reference=reference)
+
+
+def balance(user_id):
+    return User.objects.filter(pk=user_id).values_list('balance', flat=True).get()
@@ -23,6 +23,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'app',
     'rest_framework',
     'django_redis',
@@ -168,6 +169,8 @@ STATIC_URL = 'static/'
 STATIC_ROOT = os.path.join(BASE_DIR / 'static')
 MEDIA_URL = 'media/'
 MEDIA_ROOT = os.path.join(BASE_DIR / 'media')
+# Video lives here, outside MEDIA_ROOT: only signed URLs and stream sessions reach it.
+PRIVATE_MEDIA_ROOT = os.path.join(BASE_DIR / 'private_media')
 
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.1/ref/settings/#default-auto-field
@@ -197,6 +200,57 @@ CELERY_TASK_TRACK_STARTED = True
 CELERY_TASK_TIME_LIMIT = 30 * 60
 CELERY_TASK_ALWAYS_EAGER = False
 
+CELERY_BEAT_SCHEDULE = {
+    'flush-movie-views': {
+        'task': 'app.task.flush_movie_views_task',
+        'schedule': 10.0,
+    },
+    'drain-search-events': {
+        'task': 'app.task.drain_search_events_task',
+        'schedule': 5.0,
+    },
+    'sync-collected-money': {
+        'task': 'app.task.sync_collected_money_task',
+        'schedule': 60.0,
+    },
+    'flush-similar-movies': {
+        'task': 'app.task.flush_similar_movies_updates_task',
+        'schedule': 30.0,
+    },
+}
+
+# Buffer detail-page views in Redis and let `flush-movie-views` write them in batches.
+MOVIE_VIEWS_WRITE_BEHIND = True
+
+# Distinct recent searches kept per user, in Redis and in the LastSearch table.
+SEARCH_HISTORY_LIMIT = 20
+
+# Cache anonymous catalog responses until a Movie/Genre/Countries/Category/News change.
+RESPONSE_CACHE_ENABLED = True
+# Share of cached-view lookups counted for `response_cache_stats`; 0 disables the counters.
+RESPONSE_CACHE_STATS_SAMPLE_RATE = 0.01
+
+# Donations land on one of N shard rows per campaign; totals are summed and cached briefly.
+COLLECTED_MONEY_SHARDS = 16
+COLLECTED_MONEY_CACHE_TIMEOUT = 5
+
+# Assembled season/episode trees; dropped on every Season or Episode change.
+SERIES_TREE_TIMEOUT = 24 * 60 * 60
+
+# Video playback: entitlement is checked when a stream session opens, Range requests only look the session up.
+STREAM_SESSION_TTL = 6 * 60 * 60
+STREAM_CHUNK_SIZE = 512 * 1024
+# e.g. '/protected-media/' (an nginx `internal` location aliased to PRIVATE_MEDIA_ROOT) to let nginx send the bytes.
+STREAM_ACCEL_REDIRECT_PREFIX = os.getenv('STREAM_ACCEL_REDIRECT_PREFIX')
+
+# Signed media URLs. To rotate, add a key, point MEDIA_SIGNING_KEY_ID at it and
+# drop the old one once MEDIA_URL_WINDOW + MEDIA_URL_TTL have passed.
+MEDIA_SIGNING_KEYS = {'k1': os.getenv('MEDIA_SIGNING_KEY', SECRET_KEY)}
+MEDIA_SIGNING_KEY_ID = 'k1'
+MEDIA_URL_TTL = 4 * 60 * 60
+MEDIA_URL_WINDOW = 15 * 60
+MEDIA_URL_CLOCK_SKEW = 60
+
 EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
 EMAIL_HOST = 'smtp.gmail.com'
 EMAIL_PORT = 587
@@ -207,4 +261,5 @@ EMAIL_HOST_PASSWORD = os.getenv('EMAIL_HOST_PASSWORD')
 
 """
 celery -A root worker -l INFO
+celery -A root beat -l INFO
 """
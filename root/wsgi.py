@@ -14,3 +14,7 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'root.settings')
 
 application = get_wsgi_application()
+
+from app.autocomplete import title_index  # noqa: E402
+
+title_index.warm()